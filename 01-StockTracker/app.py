@@ -1,3 +1,5 @@
+import os
+import sys
 import time
 from datetime import date
 
@@ -8,7 +10,14 @@ import pandas_datareader as dr
 import plotly.graph_objects as go
 from dash.dependencies import Input, Output
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import self_hosted_assets
+from common.datasets import cached_frame
+from common.encoding import compact_responses
+from common.jobs import JobManager
+from common.metrics import instrument, upstream
+
+app = Dash(__name__, external_stylesheets=[dbc.themes.LUX], background_callback_manager=JobManager())
 
 server = app.server
 
@@ -19,11 +28,14 @@ dates = pandas.date_range(start='2020-01-01', end=date.today())
 history = pandas.date_range(start=twenty_years_ago, end=date.today())
 
 # Data
-companies = pandas.read_csv("fortune_500.csv")
+companies = cached_frame(os.path.join(os.path.dirname(__file__), "fortune_500.csv"), pandas.read_csv)
 hq_states = companies.pivot_table(index=['Hqstate'], aggfunc='size')
 
+# Price history from Yahoo, timed in the upstream metrics
+read_prices = upstream('yahoo', dr.DataReader)
+
 
-# Update the graphs
+# Update the graphs in a background job, one ticker at a time; a new selection cancels the job fetching the old one
 @app.callback(
     [Output(component_id='close_graph', component_property='figure'),
      Output(component_id='change_graph', component_property='figure'),
@@ -33,19 +45,26 @@ hq_states = companies.pivot_table(index=['Hqstate'], aggfunc='size')
      Output(component_id='history_range', component_property='children'),
      Output(component_id='hq_location_graph', component_property='figure')],
     [Input(component_id='my_dropdown', component_property='value'),
-     Input(component_id='date_slider', component_property='value')])
-def update_graphs(dropdown_values, slider_value):
+     Input(component_id='date_slider', component_property='value')],
+    background=True,
+    interval=500,
+    progress=[Output(component_id='fetch_progress', component_property='value'),
+              Output(component_id='fetch_progress', component_property='max')],
+    running=[(Output(component_id='fetch_progress', component_property='style'),
+              {'visibility': 'visible'}, {'visibility': 'hidden'})])
+def update_graphs(set_progress, dropdown_values, slider_value):
     selected_values = dropdown_values
+    set_progress((0, len(selected_values)))
 
     close_figure = go.Figure()
     change_figure = go.Figure()
     historical_figure = go.Figure()
 
-    for value in selected_values:
+    for index, value in enumerate(selected_values):
         try:
-            df = dr.DataReader(value, data_source='yahoo',
-                               start=unix_to_datetime(slider_value[0]), end=unix_to_datetime(slider_value[1]))
-            history_df = dr.DataReader(value, data_source='yahoo', start=history.min(), end=history.max())
+            df = read_prices(value, data_source='yahoo',
+                             start=unix_to_datetime(slider_value[0]), end=unix_to_datetime(slider_value[1]))
+            history_df = read_prices(value, data_source='yahoo', start=history.min(), end=history.max())
 
             close_figure.add_trace(go.Scatter(x=df.index, y=df.Close, mode='lines', name=value))
             change_figure.add_trace(
@@ -53,6 +72,7 @@ def update_graphs(dropdown_values, slider_value):
             historical_figure.add_trace(go.Scatter(x=history_df.index, y=history_df.Close, mode='lines', name=value))
         except Exception:
             pass
+        set_progress((index + 1, len(selected_values)))
 
     date_range = str(unix_to_datetime(slider_value[0]).strftime('%b %d')) + " - " + str(
         unix_to_datetime(slider_value[1]).strftime('%b %d'))
@@ -118,6 +138,8 @@ app.layout = html.Div([
         placeholder="Select a Sector",
         style={'width': "40%", 'position': 'absolute', 'right': '6.75%', 'marginTop': '4px'}
     ),
+    html.Progress(id='fetch_progress', value=0, max=1,
+                  style={'visibility': 'hidden', 'width': "90%", 'margin': '0 auto', 'display': 'block'}),
     html.Div([
         html.Div([
             html.H4(children='Close Price', style={"margin": '20px 10px 0px', "position": 'relative', "zIndex": 10}),
@@ -148,5 +170,9 @@ app.layout = html.Div([
     dcc.Graph(id='hq_location_graph', config={'displayModeBar': False}),
 ])
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -1,3 +1,6 @@
+import os
+import sys
+
 import pandas as pd
 from dash import Dash, html, dcc
 from dash.dependencies import Input, Output
@@ -5,7 +8,13 @@ import dash_bootstrap_components as dbc
 import requests
 from datetime import datetime
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import asset_url, self_hosted_assets
+from common.encoding import compact_responses
+from common.jobs import JobManager
+from common.metrics import instrument, upstream
+
+app = Dash(__name__, external_stylesheets=[dbc.themes.LUX], background_callback_manager=JobManager())
 
 server = app.server
 
@@ -13,27 +22,29 @@ categories_left = ["wind_speed", "precip", "humidity", "observation_time"]
 categories_right = ["cloudcover", "uv_index", "visibility", "pressure"]
 units_left = [" kph", " mm", "%", ""]
 units_right = ["%", " of 10", " km", " mb"]
-icons_left = ["https://static.wixstatic.com/media/f94624_7336ef703df545be967ee2906e524f34~mv2.png",
-              "https://static.wixstatic.com/media/f94624_f3f07789afd742f58e22b0d6272825d0~mv2.png",
-              "https://static.wixstatic.com/media/f94624_16e38675e2a74ee9b6cd5c18ef0fdd35~mv2.png",
-              "https://static.wixstatic.com/media/f94624_5235c766dc2d410abee6d40633834022~mv2.png"]
-icons_right = ["https://static.wixstatic.com/media/f94624_8bdc3752dae149d4aace679a6510a743~mv2.png",
-               "https://static.wixstatic.com/media/f94624_0c612c07884f44ad976db329c93ad810~mv2.png",
-               "https://static.wixstatic.com/media/f94624_dc0932d2f06c4f728efa227e2da7c884~mv2.png",
-               "https://static.wixstatic.com/media/f94624_0680eec3fe3b4814901612d7b1f5272c~mv2.png"]
+icons_left = [asset_url(app, f"icons/{name.replace('_', '-')}.svg") for name in categories_left]
+icons_right = [asset_url(app, f"icons/{name.replace('_', '-')}.svg") for name in categories_right]
 
 
 def format_name(name):
     return name.replace("_", " ").replace("[", " ").replace("]", " ").replace("'", " ").title()
 
 
-def update_weather():
-    weather_requests = requests.get(
-        "http://api.weatherstack.com/current?access_key=0b506817103c31948c4eec22fee9c155&query=Boston"
+# Weatherstack requests, timed in the upstream metrics; a request gives up after WEATHER_TIMEOUT seconds
+get_weather = upstream('weatherstack', requests.get)
+timeout_seconds = float(os.environ.get('WEATHER_TIMEOUT', '10'))
+
+
+def fetch_weather():
+    weather_requests = get_weather(
+        "http://api.weatherstack.com/current?access_key=0b506817103c31948c4eec22fee9c155&query=Boston",
+        timeout=timeout_seconds
     )
-    json_data = weather_requests.json()
+    return weather_requests.json()
+
+
+def weather_children(json_data):
     df = pd.DataFrame(json_data)
-    print(df)
     return ([
         html.Div([" Weather Today in Boston, MA - " + datetime.now().strftime("%I:%M%p")],
                  style={'padding': '30px 20px 0px', 'textAlign': 'center', 'color': 'black', 'fontSize': 40,
@@ -101,16 +112,35 @@ app.layout = html.Div([
         interval=300 * 1000,
         max_intervals=100,
     ),
+    html.Div(id="weather_status", style={'position': 'absolute', 'top': '10px', 'right': '20px', 'color': 'black'}),
     html.Div([
-        html.Div(id="weather", children=update_weather())
+        # Filled by the background callback on the first tick, so the app starts without reaching weatherstack
+        html.Div(id="weather", children=html.Div("Loading the weather...",
+                                                 style={'padding': '30px 20px 0px', 'textAlign': 'center',
+                                                        'color': 'black', 'fontSize': 40, 'fontWeight': 'bold'}))
     ])
 ], style={'backgroundColor': '#97B6E4', 'height': '100vh'})
 
 
-@app.callback(Output("weather", "children"), [Input("my_interval", "n_intervals")])
-def update_weather_div(n):
-    return update_weather()
+# Refreshes the weather in a background job. The next tick cancels a job still waiting on weatherstack: the thread
+# cannot leave the request, which times out after WEATHER_TIMEOUT seconds, but the job stops once it returns and
+# its result is dropped.
+@app.callback(Output("weather", "children"), [Input("my_interval", "n_intervals")],
+              background=True,
+              interval=500,
+              progress=[Output("weather_status", "children")],
+              running=[(Output("weather_status", "style"), {'visibility': 'visible'}, {'visibility': 'hidden'})])
+def update_weather_div(set_progress, n):
+    set_progress("Updating the weather...")
+    json_data = fetch_weather()
+    # Stops here when the job was cancelled during the request
+    set_progress("")
+    return weather_children(json_data)
+
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
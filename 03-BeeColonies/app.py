@@ -1,17 +1,31 @@
+import os
+import sys
 import pandas as pd
 import plotly.express as px
 from dash import Dash, html, dcc
 from dash.dependencies import Input, Output
 import dash_bootstrap_components as dbc
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import self_hosted_assets
+from common.datasets import cached_frame
+from common.encoding import compact_responses
+from common.metrics import instrument
+
 app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
 
 server = app.server
 
+
+def load_colonies(path):
+    df = pd.read_csv(path)
+    df = df.groupby(['State', 'ANSI', 'Affected by', 'Year', 'state_code'])[['Pct of Colonies Impacted']].mean()
+    df.reset_index(inplace=True)
+    return df
+
+
 # Data
-df = pd.read_csv("intro_bees.csv")
-df = df.groupby(['State', 'ANSI', 'Affected by', 'Year', 'state_code'])[['Pct of Colonies Impacted']].mean()
-df.reset_index(inplace=True)
+df = cached_frame(os.path.join(os.path.dirname(__file__), "intro_bees.csv"), load_colonies)
 
 # Layout
 app.layout = html.Div([
@@ -100,5 +114,9 @@ def update_graph(year_slctd, affect_slctd):
     return container, fig, fig2, fig3
 
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
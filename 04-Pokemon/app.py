@@ -1,15 +1,31 @@
+import os
+import sys
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 import pandas
 import plotly.graph_objects as go
 from dash.dependencies import Input, Output
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import self_hosted_assets
+from common.datasets import cached_frame
+from common.encoding import compact_responses
+from common.figures import FigureCache
+from common.metrics import instrument
+
 app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
 
 server = app.server
 
-df = pandas.read_csv("pokemon.csv")
-df.loc[df['Name'].str.contains('Mega|Primal'), 'Name'] = df['Name'].str.split("Mega|Primal").str[1]
+
+def load_pokemon(path):
+    df = pandas.read_csv(path)
+    df.loc[df['Name'].str.contains('Mega|Primal'), 'Name'] = df['Name'].str.split("Mega|Primal").str[1]
+    return df
+
+
+data_file = os.path.join(os.path.dirname(__file__), "pokemon.csv")
+df = cached_frame(data_file, load_pokemon)
 # df.rename(columns={'SpAtk': 'Special Attack', 'SpDef': 'Special Defense'}, inplace=True)
 
 colors = ['#A6B91A', '#705746', '#6F35FC', '#F7D02C', '#D685AD', '#C22E28', '#EE8130', '#A98FF3', '#735797', '#7AC74C',
@@ -45,12 +61,17 @@ gen_colors_2 = list(map(lambda x: color_scale(x, 0.8), gen_colors))
 gen_colors_3 = list(map(lambda x: color_scale(x, 0.6), gen_colors))
 
 
+# Figures are rebuilt only when the data file changes, not on every interval tick of every client
+figure_cache = FigureCache(data_file)
+
+
 @app.callback(
     [Output(component_id='hp_graph', component_property='figure'),
      Output(component_id='attack_graph', component_property='figure'),
      Output(component_id='defense_graph', component_property='figure'),
      Output(component_id='legendary_graph', component_property='figure')],
     [Input("my_interval", "n_intervals")])
+@figure_cache.cached(ignore=['n'])
 def update_top_graph(n):
     hp_type1 = df.groupby(['Type1']).mean()['HP']
     hp_type2 = df.groupby(['Type2']).mean()['HP']
@@ -115,7 +136,6 @@ def update_top_graph(gens, types, stats):
         interval = 1
     domains = [{'x': [round(n / len(stats), 2) + 0.02, round(n / len(stats) + interval, 2) - 0.02], 'y': [0.0, 1.0]} for
                n, stat in enumerate(stats)]
-    print(compare_gen)
     for index, stat in enumerate(stats):
         compare_pie_fig.add_trace(go.Pie(labels=compare_gen.index.map('Generation {}'.format), values=compare_gen[stat],
                                          domain=domains[index], name=stat, title=stat, hole=.4))
@@ -200,5 +220,9 @@ app.layout = html.Div([
     ]),
 ])
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -1,3 +1,5 @@
+import os
+import sys
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 import pandas
@@ -6,16 +8,32 @@ from dash.dependencies import Input, Output
 from datetime import datetime
 import plotly.express as px
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import asset_url, self_hosted_assets
+from common.datasets import cached_frame
+from common.encoding import compact_responses
+from common.figures import FigureCache
+from common.metrics import instrument
+
 app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
 
 server = app.server
 
-dateparse = lambda x: datetime.strptime(x, '%m/%d/%Y')
-df = pandas.read_csv("superbowl_data.csv", parse_dates=['Date'], date_parser=dateparse)
+
+def load_superbowls(path):
+    dateparse = lambda x: datetime.strptime(x, '%m/%d/%Y')
+    return pandas.read_csv(path, parse_dates=['Date'], date_parser=dateparse)
+
+
+data_file = os.path.join(os.path.dirname(__file__), "superbowl_data.csv")
+df = cached_frame(data_file, load_superbowls)
 
 colors = ['#FFFFFF', '#4F99C8']
 colors2 = ['#E0ECF7', '#BBD6EA', '#8DC0DC', '#559ECA', '#2F7BB8', '#13579D']
 
+# Figures are rebuilt only when the data file changes, not on every interval tick of every client
+figure_cache = FigureCache(data_file)
+
 
 @app.callback(
     [Output(component_id='location_graph', component_property='figure'),
@@ -23,6 +41,7 @@ colors2 = ['#E0ECF7', '#BBD6EA', '#8DC0DC', '#559ECA', '#2F7BB8', '#13579D']
      Output(component_id='team_wins_graph', component_property='figure'),
      Output(component_id='mvp_graph', component_property='figure')],
     [Input("my_interval", "n_intervals")])
+@figure_cache.cached(ignore=['n'])
 def update_top_graph(n):
     map_data = df.groupby(['Abbreviation']).count()['State']
 
@@ -76,13 +95,13 @@ app.layout = html.Div([
     ),
     html.H1('Superbowls', style={'padding': '20px', 'textAlign': 'center', 'color': 'white', 'fontSize': 40}),
     html.Div([
-        html.Img(src='https://i.pinimg.com/originals/7f/45/c4/7f45c4af3a9aff4df87a4b6539c7466c.png',
+        html.Img(src=asset_url(app, 'images/football.svg'),
                  style={'-webkit-filter': 'invert(100%)', 'width': 20, "position": 'relative',
                         'zIndex': 10, 'margin': "0px 5px"}),
-        html.Img(src='https://i.pinimg.com/originals/7f/45/c4/7f45c4af3a9aff4df87a4b6539c7466c.png',
+        html.Img(src=asset_url(app, 'images/football.svg'),
                  style={'-webkit-filter': 'invert(100%)', 'width': 20, "position": 'relative',
                         'zIndex': 10, 'margin': "0px 5px"}),
-        html.Img(src='https://i.pinimg.com/originals/7f/45/c4/7f45c4af3a9aff4df87a4b6539c7466c.png',
+        html.Img(src=asset_url(app, 'images/football.svg'),
                  style={'-webkit-filter': 'invert(100%)', 'width': 20, "position": 'relative',
                         'zIndex': 10, 'margin': "0px 5px"}),
     ], style={'textAlign': 'center', 'margin': "-25px 0px 10px"}),
@@ -104,5 +123,9 @@ app.layout = html.Div([
     ], style={'marginTop': '-30px'})
 ], style={'backgroundColor': '#111111'})
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
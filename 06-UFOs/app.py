@@ -1,3 +1,5 @@
+import os
+import sys
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 import pandas
@@ -5,20 +7,38 @@ import plotly.graph_objects as go
 from dash.dependencies import Input, Output
 import plotly.express as px
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import asset_url, self_hosted_assets
+from common.datasets import cached_frame
+from common.encoding import compact_responses
+from common.figures import FigureCache
+from common.metrics import instrument
+
 app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
 
 server = app.server
 
-df = pandas.read_csv("ufo_data.csv", dtype={'datetime': str, 'city': str, 'state': str,
-                                            'shape': str, 'duration (seconds)': str, 'duration (hours/min)': str,
-                                            'comments': str, 'date posted': str, 'latitude': str, 'longitude': str})
-df['datetime'] = df['datetime'].str.replace('24:00', '0:00')
-df['datetime'] = pandas.to_datetime(df['datetime'], format='%m/%d/%Y %H:%M')
-df['date posted'] = pandas.to_datetime(df['date posted'], format='%m/%d/%Y')
-df['year'] = pandas.DatetimeIndex(df['datetime']).year
 
-di = {"au": "AUS", "ca": "CAN", "de": "DEU", "gb": "GBR", "us": "USA"}
-df.replace({"country": di}, inplace=True)
+# The string date parsing below only runs when ufo_data.csv changes; other starts load the cached result
+def load_sightings(path):
+    df = pandas.read_csv(path, dtype={'datetime': str, 'city': str, 'state': str,
+                                      'shape': str, 'duration (seconds)': str, 'duration (hours/min)': str,
+                                      'comments': str, 'date posted': str, 'latitude': str, 'longitude': str})
+    df['datetime'] = df['datetime'].str.replace('24:00', '0:00')
+    df['datetime'] = pandas.to_datetime(df['datetime'], format='%m/%d/%Y %H:%M')
+    df['date posted'] = pandas.to_datetime(df['date posted'], format='%m/%d/%Y')
+    df['year'] = pandas.DatetimeIndex(df['datetime']).year
+
+    di = {"au": "AUS", "ca": "CAN", "de": "DEU", "gb": "GBR", "us": "USA"}
+    df.replace({"country": di}, inplace=True)
+    return df
+
+
+data_file = os.path.join(os.path.dirname(__file__), "ufo_data.csv")
+df = cached_frame(data_file, load_sightings)
+
+# Figures are rebuilt only when the data file changes, not on every interval tick of every client
+figure_cache = FigureCache(data_file)
 
 
 @app.callback(
@@ -27,6 +47,7 @@ df.replace({"country": di}, inplace=True)
      Output(component_id='us_year_chart', component_property='figure')],
     [Input("my_interval", "n_intervals"),
      Input(component_id='date_slider', component_property='value')])
+@figure_cache.cached(ignore=['n'])
 def update_top_graph(n, year):
     usa_data = df.copy()
     usa_data = usa_data[usa_data["year"].between(df["year"].min(), year, inclusive=True)]
@@ -40,7 +61,6 @@ def update_top_graph(n, year):
     usa_by_year = usa_by_year[usa_by_year["country"] == "USA"]
     usa_by_year = usa_by_year.groupby(['year']).count()[['datetime','country']]
     usa_by_year['sightings'] = usa_by_year['datetime']
-    print(usa_by_year)
 
     fig = go.Figure(data=go.Choropleth(
         locations=usa_data.index.str.upper(),
@@ -87,7 +107,7 @@ app.layout = html.Div([
     ),
     html.H1('UFO Sightings', style={'padding': '20px', 'textAlign': 'center', 'color': 'black', 'fontSize': 40}),
     html.Div([
-        html.Img(src='https://static.wixstatic.com/media/f94624_2bbdaaf1395e4965859f9e9944bb8f60~mv2.png',
+        html.Img(src=asset_url(app, 'images/ufo-sightings.svg'),
                  style={'width': 100})
     ], style={'textAlign': 'center', 'margin': "-25px 0px 40px"}),
     dbc.Row([
@@ -111,5 +131,9 @@ app.layout = html.Div([
     dcc.Graph(id='us_year_chart', config={'displayModeBar': False}),
 ])
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
@@ -1,3 +1,5 @@
+import os
+import sys
 
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
@@ -6,19 +8,31 @@ import plotly.graph_objects as go
 from dash.dependencies import Input, Output
 from plotly.subplots import make_subplots
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import asset_url, self_hosted_assets
+from common.datasets import cached_frame
+from common.encoding import compact_responses
+from common.figures import FigureCache
+from common.metrics import instrument
+
 app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
 
 server = app.server
 
-starships = pandas.read_csv("star_wars_data/starships.csv", index_col=0,
-                            dtype={'cost_in_credits': float, 'length': float, 'max_atmosphering_speed': float,
-                                   'crew': float, 'passengers': float, 'cargo_capacity': float,
-                                   'hyperdrive_rating': float})
-vehicles = pandas.read_csv("star_wars_data/vehicles.csv", index_col=0,
-                           dtype={'cost_in_credits': float, 'length': float, 'max_atmosphering_speed': float,
-                                  'crew': float, 'passengers': float, 'cargo_capacity': float})
-planets = pandas.read_csv("star_wars_data/planets.csv", index_col=0)
-characters = pandas.read_csv("star_wars_data/characters.csv", index_col=0)
+data_folder = os.path.join(os.path.dirname(__file__), "star_wars_data")
+starships = cached_frame(os.path.join(data_folder, "starships.csv"), pandas.read_csv, index_col=0,
+                         dtype={'cost_in_credits': float, 'length': float, 'max_atmosphering_speed': float,
+                                'crew': float, 'passengers': float, 'cargo_capacity': float,
+                                'hyperdrive_rating': float})
+vehicles = cached_frame(os.path.join(data_folder, "vehicles.csv"), pandas.read_csv, index_col=0,
+                        dtype={'cost_in_credits': float, 'length': float, 'max_atmosphering_speed': float,
+                               'crew': float, 'passengers': float, 'cargo_capacity': float})
+planets = cached_frame(os.path.join(data_folder, "planets.csv"), pandas.read_csv, index_col=0)
+characters = cached_frame(os.path.join(data_folder, "characters.csv"), pandas.read_csv, index_col=0)
+
+# Figures are rebuilt only when a data file changes, not on every interval tick of every client
+figure_cache = FigureCache(*(os.path.join(data_folder, name)
+                             for name in ["starships.csv", "vehicles.csv", "planets.csv", "characters.csv"]))
 
 all = [starships, vehicles, planets, characters]
 all_class = ["starship_class", "vehicle_class"]
@@ -86,6 +100,7 @@ def count_occurences(type, ):
                Input(component_id='slct_ship', component_property='value'),
                Input(component_id='slct_planet', component_property='value'),
                Input(component_id='slct_character', component_property='value')])
+@figure_cache.cached(ignore=['n'])
 def update_weather_div(n, type, ship, planet, character):
     type_class = all[type].loc[ship, all_class[type]]
     same_class = all[type][all[type][all_class[type]] == type_class]
@@ -231,18 +246,18 @@ app.layout = html.Div([
     dbc.Row([
         html.Div([
             html.Img(
-                src='https://static.wixstatic.com/media/f94624_7cd22cb4e9b343b99b0b182dfd2ca815~mv2.png',
+                src=asset_url(app, 'images/star-wars-left.svg'),
                 style={'width': 300, "position": 'relative', 'zIndex': 10, 'margin': "0px 5px"}),
         ], style={'textAlign': 'right', 'margin': "48px 0px 10px", "width": '40%'}),
         html.Div([
             html.Img(
-                src='https://upload.wikimedia.org/wikipedia/commons/thumb/c/ce/Star_wars2.svg/1200px-Star_wars2.svg.png',
+                src=asset_url(app, 'images/star-wars-logo.svg'),
                 style={'-webkit-filter': 'invert(100%)', 'width': 250, "position": 'relative',
                        'zIndex': 10, 'margin': "0px 5px"}),
         ], style={'textAlign': 'center', 'margin': "0px 0px 10px", "width": '20%'}),
         html.Div([
             html.Img(
-                src='https://static.wixstatic.com/media/f94624_0d521d1e904d4e32adca369f4a172e12~mv2.png',
+                src=asset_url(app, 'images/star-wars-right.svg'),
                 style={'width': 300, "position": 'relative', 'zIndex': 10, 'margin': "0px 5px"}),
         ], style={'textAlign': 'left', 'margin': "48px 0px 10px", "width": '40%'})
     ]),
@@ -328,5 +343,9 @@ app.layout = html.Div([
     ])
 ], style={'backgroundColor': '#111111'})
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -1,46 +1,249 @@
-import pandas
-
-# Link: https://www.kaggle.com/gregorut/videogamesales
-
-df = pandas.read_csv("08-VideoGames/vgsales.csv", index_col=0)
-
-# The total worldwide sales in millions by each genre
-genre_sales = df.groupby('Genre').sum().sort_values('Global_Sales', ascending=False)['Global_Sales']
-
-# The top five companies who have the highest total sales (in millions fo dollars)
-company_sales = df.groupby('Publisher').sum().sort_values('Global_Sales', ascending=False)['Global_Sales'].head(5)
+import os
+import sys
+import time
 
-# The total sales by year in millions of dollars
-year_sales = df.groupby('Year').sum()['Global_Sales']
-
-# Most popular platform by year
-platform_sales_with_year = df.groupby(['Year', 'Platform']).sum()['Global_Sales'].reset_index().groupby('Year').max()['Platform']
-
-# Games per genre
-games_per_genre = df.groupby('Genre').count().sort_values('Global_Sales', ascending=False)['Global_Sales']
-
-# Company with the most sales for each platform
-platform_company = df.groupby(['Platform', 'Publisher']).sum()['Global_Sales'].reset_index().groupby('Platform').max()['Publisher']
-
-# Total sales for game regardless of platform
-total_sales = df.groupby('Name').sum().sort_values('Global_Sales', ascending=False)['Global_Sales'].head(5)
+from dash import Dash, html, dcc, ctx
+import dash_bootstrap_components as dbc
+import pandas
+import plotly.graph_objects as go
+from dash.dependencies import Input, Output, State
 
-# All pokemon games
-pokemon_games = df.loc[df['Name'].str.contains('Pokemon')]
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import self_hosted_assets
+from common.datasets import cached_frame
+from common.encoding import compact_responses
+from common.metrics import instrument
 
-# First Nintendo game
-first_nintendo = df.loc[df['Publisher'] == 'Nintendo'].sort_values(by='Year', ascending=True)[['Name', 'Year']].head(1)
+from cube import SalesCube
+from title_index import TitleIndex, titles_containing
+from topk import top_k_per_group
 
-# North America top 10 sellers
-na_top_seller = df.sort_values(by='NA_Sales', ascending=False)[['Name', 'Publisher', 'NA_Sales']].head(10)
+app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
 
-# What genre sells the best (ie highest avg sales)
-genre_avg_sales = df.groupby('Genre').mean().sort_values('Global_Sales', ascending=False)['Global_Sales']
+server = app.server
 
-# Number of entries where the platform name is in the name of the game
-platform_not_in_name = len(df.loc[df.apply(lambda x: x.Platform in x.Name, axis=1)])
+colors = ['#E60012', '#0070D1', '#107C10', '#FFB300', '#8E44AD']
+regions = ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales']
+drill_order = ['Genre', 'Platform', 'Publisher']
 
-# All super mario bros games
-mario_games = df.loc[df['Name'].str.contains('Super Mario Bros')].sort_values(by='Year').reset_index()[['Year', 'Name', 'Global_Sales']]
+# Link: https://www.kaggle.com/gregorut/videogamesales
 
-print(mario_games)
+df = cached_frame(os.path.join(os.path.dirname(__file__), "vgsales.csv"), pandas.read_csv, index_col=0)
+
+# Rollup cube behind every dashboard interaction
+cube = SalesCube(df)
+
+# Title search index behind the franchise search, built once (case-insensitive)
+title_index = TitleIndex(df['Name'])
+search_limit = 50
+
+
+def format_measure(measure):
+    return measure.replace('_Sales', '').replace('Other', 'Other Regions') + " Sales (millions)"
+
+
+# Cube filters for the dropdowns, the year range and the members picked along the drill path
+def selection_filters(genres, platforms, publishers, years, drill_path):
+    filters = {'Genre': list(genres or []), 'Platform': list(platforms or []), 'Publisher': list(publishers or [])}
+    known_years = [year for year in cube.members['Year'] if year > 0]
+    if years and (years[0] > known_years[0] or years[1] < known_years[-1]):
+        filters['Year'] = [year for year in known_years if years[0] <= year <= years[1]]
+    for dim, member in drill_path:
+        filters[dim] = [member]
+    return filters
+
+
+@app.callback(Output('drill_path', 'data'),
+              [Input('drill_graph', 'clickData'),
+               Input('drill_back', 'n_clicks')],
+              [State('drill_path', 'data')],
+              prevent_initial_call=True)
+def update_drill_path(click, back, drill_path):
+    if ctx.triggered_id == 'drill_back':
+        return drill_path[:-1]
+    if click is None or len(drill_path) >= len(drill_order) - 1:
+        return drill_path
+    return drill_path + [[drill_order[len(drill_path)], click['points'][0]['x']]]
+
+
+@app.callback([Output('drill_graph', 'figure'),
+               Output('year_graph', 'figure'),
+               Output('region_graph', 'figure'),
+               Output('drill_title', 'children'),
+               Output('cube_status', 'children')],
+              [Input('slct_measure', 'value'),
+               Input('slct_genre', 'value'),
+               Input('slct_platform', 'value'),
+               Input('slct_publisher', 'value'),
+               Input('year_slider', 'value'),
+               Input('drill_path', 'data')])
+def update_graphs(measure, genres, platforms, publishers, years, drill_path):
+    start = time.perf_counter()
+    filters = selection_filters(genres, platforms, publishers, years, drill_path)
+    level = drill_order[len(drill_path)]
+
+    by_level = cube.query([level], filters).sort_values(measure, ascending=False).head(30)
+    by_year = cube.query(['Year'], filters)
+    by_year = by_year.loc[by_year.index > 0]
+    totals = cube.query([], filters)
+    query_ms = (time.perf_counter() - start) * 1000
+
+    drill_fig = go.Figure(data=[
+        go.Bar(x=by_level.index, y=by_level[measure], marker_color=colors[len(drill_path)],
+               hovertext=by_level['Games'].map('{:,} games'.format))
+    ])
+    drill_fig.update_layout(title=f"{format_measure(measure)} by {level}", template="plotly_dark", height=450)
+
+    year_fig = go.Figure(data=[
+        go.Scatter(x=by_year.index, y=by_year[measure], mode='lines+markers', line_color=colors[1])
+    ])
+    year_fig.update_layout(title=f"{format_measure(measure)} by Year", template="plotly_dark", height=350)
+
+    region_fig = go.Figure(data=[
+        go.Pie(labels=[region.replace('_Sales', '') for region in regions],
+               values=[totals[region].iloc[0] if len(totals) else 0 for region in regions],
+               title="Regions", marker=dict(colors=colors))
+    ])
+    region_fig.update_layout(template="plotly_dark", height=350)
+
+    path = " > ".join(["All"] + [str(member) for _, member in drill_path])
+    status = f"Cube: {cube.describe()} | answered in {query_ms:.1f} ms, " \
+             f"rendered in {(time.perf_counter() - start) * 1000:.1f} ms"
+    return drill_fig, year_fig, region_fig, path, status
+
+
+# Group totals of the selection over two dimensions, reduced to the best-selling member of the second one per
+# member of the first
+def leaders(group, member, measure, filters):
+    totals = cube.query([group, member], filters).reset_index()
+    totals = totals.loc[(totals['Year'] > 0) if 'Year' in (group, member) else slice(None)]
+    return top_k_per_group(totals, group, value=measure).reset_index(drop=True)
+
+
+@app.callback([Output('platform_year_graph', 'figure'),
+               Output('publisher_platform_graph', 'figure')],
+              [Input('slct_measure', 'value'),
+               Input('slct_genre', 'value'),
+               Input('slct_platform', 'value'),
+               Input('slct_publisher', 'value'),
+               Input('year_slider', 'value'),
+               Input('drill_path', 'data')])
+def update_leaders(measure, genres, platforms, publishers, years, drill_path):
+    filters = selection_filters(genres, platforms, publishers, years, drill_path)
+    platform_year = leaders('Year', 'Platform', measure, filters)
+    publisher_platform = leaders('Platform', 'Publisher', measure, filters)\
+        .sort_values(measure, ascending=False, kind='stable')
+
+    platform_fig = go.Figure(data=[
+        go.Bar(x=platform_year['Year'], y=platform_year[measure], text=platform_year['Platform'],
+               marker_color=colors[2])
+    ])
+    platform_fig.update_layout(title="Best-Selling Platform by Year", template="plotly_dark", height=400,
+                               yaxis_title=format_measure(measure))
+
+    publisher_fig = go.Figure(data=[
+        go.Bar(x=publisher_platform['Platform'], y=publisher_platform[measure],
+               hovertext=publisher_platform['Publisher'], marker_color=colors[3])
+    ])
+    publisher_fig.update_layout(title="Top Publisher per Platform", template="plotly_dark", height=400,
+                                yaxis_title=format_measure(measure))
+    return platform_fig, publisher_fig
+
+
+# Every release of the titles containing the searched text, oldest first
+@app.callback([Output('search_results', 'children'),
+               Output('search_status', 'children')],
+              [Input('title_search', 'value'),
+               Input('slct_measure', 'value')])
+def update_search(text, measure):
+    text = (text or '').strip()
+    if not text:
+        return [], "Search titles, e.g. Super Mario Bros or Pokemon"
+    start = time.perf_counter()
+    games = titles_containing(df, title_index, text).sort_values(by=['Year', 'Name'], kind='stable')
+    search_ms = (time.perf_counter() - start) * 1000
+
+    header = html.Tr([html.Th(column) for column in ['Year', 'Name', 'Platform', 'Publisher',
+                                                      format_measure(measure)]])
+    rows = [html.Tr([html.Td('' if pandas.isna(game.Year) else int(game.Year)), html.Td(game.Name),
+                     html.Td(game.Platform), html.Td(game.Publisher), html.Td(f'{getattr(game, measure):.2f}')])
+            for game in games.head(search_limit).itertuples()]
+    table = html.Table([header] + rows, style={'width': '90%', 'margin': 'auto', 'color': 'white'})
+    shown = f", first {search_limit} shown" if len(games) > search_limit else ""
+    return table, f"{len(games):,} releases, {games[measure].sum():.2f} million in total{shown} " \
+                  f"(found in {search_ms:.1f} ms)"
+
+
+known_years = [year for year in cube.members['Year'] if year > 0]
+
+app.layout = html.Div([
+    dcc.Store(id='drill_path', data=[]),
+    html.H1('Video Game Sales', style={'paddingTop': '20px', 'textAlign': 'center', 'color': 'white',
+                                       'fontSize': 40, 'font-family': 'Arial, Helvetica, sans-serif'}),
+    dbc.Row([
+        html.Div([
+            dcc.Dropdown(
+                id='slct_measure',
+                options=[{'label': format_measure(measure), 'value': measure} for measure in cube.measures],
+                value='Global_Sales',
+                clearable=False)
+        ], style={'width': '20%'}),
+        html.Div([
+            dcc.Dropdown(id='slct_genre', options=[{'label': g, 'value': g} for g in cube.members['Genre']],
+                         placeholder="Genre(s)", multi=True)
+        ], style={'width': '25%'}),
+        html.Div([
+            dcc.Dropdown(id='slct_platform', options=[{'label': p, 'value': p} for p in cube.members['Platform']],
+                         placeholder="Platform(s)", multi=True)
+        ], style={'width': '25%'}),
+        html.Div([
+            dcc.Dropdown(id='slct_publisher', options=[{'label': p, 'value': p} for p in cube.members['Publisher']],
+                         placeholder="Publisher(s)", multi=True)
+        ], style={'width': '30%'}),
+    ], style={'width': '90%', 'margin': '0 auto'}),
+    html.Div([
+        dcc.RangeSlider(
+            id='year_slider',
+            min=known_years[0],
+            max=known_years[-1],
+            value=[known_years[0], known_years[-1]],
+            marks={str(year): str(year) for year in range(known_years[0], known_years[-1] + 1, 5)},
+        )
+    ], style={'width': "80%", 'margin': '20px auto 0px'}),
+    dbc.Row([
+        html.Button('Back', id='drill_back', n_clicks=0, style={'margin': '0px 20px'}),
+        html.H5(id='drill_title', style={'color': 'white', 'margin': '5px 0px'}),
+    ], style={'marginLeft': '40px', 'marginTop': '10px'}),
+    dcc.Graph(id='drill_graph', config={'displayModeBar': False}),
+    dbc.Row([
+        html.Div([
+            dcc.Graph(id='year_graph', config={'displayModeBar': False})
+        ], style={"width": '65%'}),
+        html.Div([
+            dcc.Graph(id='region_graph', config={'displayModeBar': False})
+        ], style={"width": '35%'}),
+    ]),
+    html.Div(id='cube_status', style={'color': '#888888', 'textAlign': 'center', 'padding': '10px'}),
+    dbc.Row([
+        html.Div([
+            dcc.Graph(id='platform_year_graph', config={'displayModeBar': False})
+        ], style={"width": '50%'}),
+        html.Div([
+            dcc.Graph(id='publisher_platform_graph', config={'displayModeBar': False})
+        ], style={"width": '50%'}),
+    ]),
+    html.H3('Franchise Search', style={'textAlign': 'center', 'color': 'white', 'paddingTop': '20px'}),
+    html.Div([
+        dcc.Input(id='title_search', type='text', value='Super Mario Bros', debounce=True,
+                  placeholder="Title contains...", style={'width': '100%'})
+    ], style={'width': '40%', 'margin': '0 auto'}),
+    html.Div(id='search_status', style={'color': '#888888', 'textAlign': 'center', 'padding': '10px'}),
+    html.Div(id='search_results', style={'paddingBottom': '30px'})
+], style={'backgroundColor': '#111111'})
+
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
+if __name__ == '__main__':
+    app.run_server(debug=True)
@@ -0,0 +1,64 @@
+import time
+from itertools import combinations
+
+CUBE_DIMENSIONS = ['Genre', 'Platform', 'Year', 'Publisher']
+CUBE_MEASURES = ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales', 'Global_Sales']
+
+
+# Pre-materialized rollup cube: one aggregate table (cuboid) for every subset of the dimensions.
+# Each cuboid is indexed by its dimensions and holds the summed measures and the number of games, so any slice, dice or
+# drill-down is answered from the smallest cuboid that covers it instead of regrouping the raw rows.
+class SalesCube:
+    def __init__(self, df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES):
+        start = time.perf_counter()
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+
+        # Missing years and publishers become their own members so every game is counted in every cuboid
+        base = df[self.dimensions + self.measures].copy()
+        base['Year'] = base['Year'].fillna(0).astype(int)
+        base['Publisher'] = base['Publisher'].fillna('Unknown')
+        base['Games'] = 1
+        self.members = {dim: sorted(base[dim].unique()) for dim in self.dimensions}
+
+        # The finest cuboid comes from the raw rows, every coarser one is rolled up from its smallest parent
+        finest = tuple(self.dimensions)
+        self.cuboids = {finest: base.groupby(list(finest), sort=True)[self.measures + ['Games']].sum()}
+        for size in range(len(self.dimensions) - 1, -1, -1):
+            for dims in combinations(self.dimensions, size):
+                parent = min((key for key in self.cuboids if len(key) == size + 1 and set(dims) <= set(key)),
+                             key=lambda key: len(self.cuboids[key]))
+                self.cuboids[dims] = self._rollup(self.cuboids[parent], dims)
+
+        self.build_seconds = time.perf_counter() - start
+        self.memory_bytes = sum(int(cuboid.memory_usage(deep=True).sum() + cuboid.index.memory_usage(deep=True))
+                                for cuboid in self.cuboids.values())
+
+    @staticmethod
+    def _rollup(cuboid, dims):
+        if not dims:
+            return cuboid.sum().to_frame().T
+        return cuboid.groupby(level=list(dims), sort=True).sum()
+
+    # Smallest cuboid holding all the given dimensions
+    def cuboid_for(self, dims):
+        key = tuple(dim for dim in self.dimensions if dim in set(dims))
+        return self.cuboids[key]
+
+    # Measures grouped by the requested dimensions for the rows matching the filters ({dimension: [members]})
+    def query(self, group_by=(), filters=None):
+        filters = {dim: values for dim, values in (filters or {}).items() if values}
+        group_by = [dim for dim in self.dimensions if dim in set(group_by)]
+        cuboid = self.cuboid_for(set(group_by) | set(filters))
+
+        for dim, values in filters.items():
+            cuboid = cuboid[cuboid.index.get_level_values(dim).isin(values)]
+        if set(cuboid.index.names) != set(group_by):
+            cuboid = self._rollup(cuboid, group_by)
+        return cuboid
+
+    # Human readable build statistics
+    def describe(self):
+        rows = sum(len(cuboid) for cuboid in self.cuboids.values())
+        return f"{len(self.cuboids)} cuboids, {rows:,} cells, {self.memory_bytes / 2 ** 20:.1f} MB, " \
+               f"built in {self.build_seconds * 1000:.0f} ms"
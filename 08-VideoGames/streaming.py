@@ -0,0 +1,97 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas
+
+from topk import top_k_per_group
+
+# Only the columns the reports use are parsed, with compact dtypes for the repeated strings and the sales figures
+SALES_MEASURES = ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales', 'Global_Sales']
+SALES_DTYPES = {'Name': str, 'Platform': 'category', 'Year': 'float32', 'Genre': 'category',
+                'Publisher': 'category', **{measure: 'float32' for measure in SALES_MEASURES}}
+
+
+# Reads the csv lazily, one projected chunk at a time
+def read_sales_chunks(path, chunksize=250_000, columns=None):
+    columns = list(columns or SALES_DTYPES)
+    return pandas.read_csv(path, usecols=columns, dtype={c: SALES_DTYPES[c] for c in columns}, chunksize=chunksize)
+
+
+# Partial aggregate of one chunk: per-group sums and row counts plus the chunk's own top-k rows per group.
+# Sums, counts and top-k lists are all mergeable, so chunks can be reduced in any order.
+def aggregate_chunk(chunk, by='Genre', value='Global_Sales', k=5):
+    grouped = chunk.groupby(by, observed=True)
+    totals = grouped[SALES_MEASURES].sum().astype('float64')
+    totals['count'] = grouped.size()
+    top = top_k_per_group(chunk.dropna(subset=[by]), by, value, k)
+
+    # Each chunk has its own category set, so group keys leave the chunk as plain values
+    if isinstance(chunk[by].dtype, pandas.CategoricalDtype):
+        totals.index = totals.index.astype(object)
+        top = top.astype({by: object})
+    return totals, top
+
+
+# Combines partial aggregates into one partial aggregate
+def merge_partials(partials, by='Genre', value='Global_Sales', k=5):
+    partials = list(partials)
+    totals = pandas.concat([totals for totals, _ in partials]).groupby(level=0).sum()
+    top = top_k_per_group(pandas.concat([top for _, top in partials], ignore_index=True), by, value, k)
+    return totals, top.reset_index(drop=True)
+
+
+# Final report: sums, counts and means per group, and the top-k rows per group
+def finalize(partial):
+    totals, top = partial
+    report = totals.copy()
+    for measure in SALES_MEASURES:
+        report[measure.replace('_Sales', '_Mean')] = report[measure] / report['count']
+    return report.sort_values('Global_Sales', ascending=False), top
+
+
+# Streams the csv and aggregates it chunk by chunk, keeping at most one running partial in memory.
+# With workers > 1 the chunks are aggregated in a process pool; only a bounded window of chunks is in flight at once
+# so peak memory stays proportional to chunksize * workers rather than to the file size.
+def stream_sales(path, by='Genre', value='Global_Sales', k=5, chunksize=250_000, workers=1):
+    columns = set(SALES_DTYPES) & ({by, value, 'Name'} | set(SALES_MEASURES))
+    chunks = read_sales_chunks(path, chunksize, [c for c in SALES_DTYPES if c in columns])
+
+    running = None
+
+    def fold(partial):
+        nonlocal running
+        running = partial if running is None else merge_partials([running, partial], by, value, k)
+
+    if workers <= 1:
+        for chunk in chunks:
+            fold(aggregate_chunk(chunk, by, value, k))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(aggregate_chunk, chunk, by, value, k))
+                if len(pending) >= 2 * workers:
+                    fold(pending.popleft().result())
+            while pending:
+                fold(pending.popleft().result())
+
+    if running is None:
+        raise ValueError(f"No rows found in {path}")
+    return finalize(running)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Aggregate a video game sales csv without loading it into memory')
+    parser.add_argument('path', nargs='?', default=os.path.join(os.path.dirname(__file__), 'vgsales.csv'))
+    parser.add_argument('--by', default='Genre')
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--chunksize', type=int, default=250_000)
+    parser.add_argument('--workers', type=int, default=1, help='processes to spread chunks across (0 = all cores)')
+    args = parser.parse_args()
+
+    report, top = stream_sales(args.path, by=args.by, k=args.top, chunksize=args.chunksize,
+                               workers=args.workers or os.cpu_count())
+    print(report)
+    print(top[[args.by, 'Name', 'Global_Sales']])
@@ -0,0 +1,65 @@
+from collections import defaultdict
+
+import numpy
+import pandas
+
+
+# Overlapping three character windows of a title
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# Trigram inverted index over a column of titles.
+# Each distinct title is indexed once; a posting list holds the ids of the distinct titles containing the trigram and
+# the rows for each title are kept in a compressed lookup, so repeated titles (one per platform) cost nothing extra.
+class TitleIndex:
+    def __init__(self, names, case_fold=True):
+        self.case_fold = case_fold
+        codes, titles = pandas.factorize(pandas.Series(names).fillna(''))
+        self.titles = [self._normalize(title) for title in titles]
+
+        postings = defaultdict(list)
+        for title_id, title in enumerate(self.titles):
+            for gram in trigrams(title):
+                postings[gram].append(title_id)
+        self.postings = {gram: numpy.array(ids, dtype=numpy.int32) for gram, ids in postings.items()}
+
+        # Rows of title i are row_order[row_starts[i]:row_starts[i + 1]]
+        self.row_order = numpy.argsort(codes, kind='stable')
+        self.row_starts = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(codes, minlength=len(titles)))])
+
+    def _normalize(self, text):
+        return text.casefold() if self.case_fold else text
+
+    # Ids of the distinct titles that contain the text
+    def title_ids(self, text):
+        text = self._normalize(text)
+        grams = trigrams(text)
+        if not grams:
+            # Too short to use the index, fall back to checking every distinct title
+            return numpy.array([i for i, title in enumerate(self.titles) if text in title], dtype=numpy.int32)
+
+        lists = sorted((self.postings.get(gram) for gram in grams), key=lambda ids: 0 if ids is None else len(ids))
+        if lists[0] is None:
+            return numpy.empty(0, dtype=numpy.int32)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            candidates = numpy.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                break
+
+        # Sharing every trigram does not guarantee the trigrams are adjacent, so candidates are verified
+        return numpy.array([i for i in candidates if text in self.titles[i]], dtype=numpy.int32)
+
+    # Row positions (in the order the names were given) whose title contains the text
+    def search(self, text):
+        ids = self.title_ids(text)
+        if len(ids) == 0:
+            return numpy.empty(0, dtype=numpy.intp)
+        rows = [self.row_order[self.row_starts[i]:self.row_starts[i + 1]] for i in ids]
+        return numpy.sort(numpy.concatenate(rows))
+
+
+# Rows of the frame whose name contains the text, answered from a prebuilt index
+def titles_containing(df, index, text):
+    return df.iloc[index.search(text)]
@@ -0,0 +1,52 @@
+import numpy
+import pandas
+
+
+# Integer group code for every row, numbered in sorted key order (-1 where a key is missing)
+def group_codes(df, by):
+    if isinstance(by, str):
+        return pandas.factorize(df[by], sort=True)[0]
+    return df.groupby(by, sort=True).ngroup().fillna(-1).to_numpy(dtype=numpy.intp)
+
+
+# Row positions of the k largest values in each group.
+# Rows are bucketed by group with a counting pass and each bucket is reduced with argpartition, so the values are
+# never sorted as a whole. Groups that are already k rows or smaller are taken as-is without visiting them one by one.
+def top_k_positions(codes, values, k=1):
+    keep = codes >= 0
+    rows = numpy.flatnonzero(keep)
+    codes = codes[keep]
+    values = numpy.where(numpy.isnan(values[keep]), -numpy.inf, values[keep])
+    if len(rows) == 0 or k < 1:
+        return numpy.empty(0, dtype=numpy.intp)
+
+    if k == 1:
+        # Single pass: the first row reaching its group maximum wins (idxmax semantics)
+        best = pandas.Series(values).groupby(codes).transform('max').to_numpy()
+        hit = numpy.flatnonzero(values == best)
+        winners = hit[~pandas.Series(codes[hit]).duplicated().to_numpy()]
+        return rows[winners[numpy.argsort(codes[winners])]]
+
+    sizes = numpy.bincount(codes)
+    starts = numpy.concatenate([[0], numpy.cumsum(sizes)[:-1]])
+    within = pandas.Series(codes).groupby(codes).cumcount().to_numpy()
+    order = numpy.empty(len(codes), dtype=numpy.intp)
+    order[starts[codes] + within] = numpy.arange(len(codes))
+
+    small = sizes[codes[order]] <= k
+    picked = [order[small]]
+    for group in numpy.flatnonzero(sizes > k):
+        bucket = order[starts[group]:starts[group] + sizes[group]]
+        picked.append(bucket[numpy.argpartition(-values[bucket], k - 1)[:k]])
+    positions = numpy.concatenate(picked)
+
+    # Only the selected rows are ordered: by group, then by value descending
+    positions = positions[numpy.lexsort((-values[positions], codes[positions]))]
+    return rows[positions]
+
+
+# The k rows with the highest value in each group, ordered by group and then by value descending
+def top_k_per_group(df, by, value='Global_Sales', k=1):
+    codes = group_codes(df, by)
+    positions = top_k_positions(codes, df[value].to_numpy(dtype=float), k)
+    return df.iloc[positions]
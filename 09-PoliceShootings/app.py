@@ -1,11 +1,19 @@
-from dash import Dash, html, dcc
+import os
+import sys
+from dash import Dash, html, dcc, ctx, no_update
 import dash_bootstrap_components as dbc
+from dash.dependencies import Input, Output, State
 import pandas
-import math
-import plotly.graph_objects as go
-from dash.dependencies import Input, Output
 import plotly.express as px
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import self_hosted_assets
+from common import charts
+from common.encoding import compact_responses
+from common.figures import FigureCache
+from common.metrics import instrument
+from shootings import ShootingsFeed
+
 # https://www.kaggle.com/ahsen1330/us-police-shootings
 
 # colors = ['#2E9D80','#1A877F','#50B37C','#1A6E76','#AADA6E','#7BC875','#E8EC69']
@@ -16,45 +24,53 @@ app = Dash(__name__, external_stylesheets=external_stylesheets)
 
 server = app.server
 
-df = pandas.read_csv("police_shootings_data.csv", index_col=0)
-df['date'] = pandas.to_datetime(df['date'])
-df['year'] = pandas.DatetimeIndex(df['date']).year
-df['month'] = pandas.DatetimeIndex(df['date']).month
+# Incident counts are kept up to date from the csv; rows appended to it are folded in on the next interval tick
+feed = ShootingsFeed(os.path.join(os.path.dirname(__file__), "police_shootings_data.csv"))
+feed.refresh()
+
+# Figures for a selection are rebuilt only after rows are appended to the csv, not on every tick of every client
+figure_cache = FigureCache(feed.path)
 
-# Month data
-month_data = df.groupby(['year', 'month']).count()['name'].reset_index()
-month_data['day'] = 1
-month_data['label'] = pandas.to_datetime(month_data[['year', 'month', 'day']]).apply(lambda x: x.strftime('%b %Y'))
 
-# States
-state_data = df.groupby('state').count()['name'].reset_index()
+# Charts that filter the others when clicked, with the cube dimension behind each one
+filter_charts = {'us_map': 'state', 'race_graph': 'race', 'age_graph': 'age range', 'gender_graph': 'gender',
+                 'armed_graph': 'armed', 'mental_illness_chart': 'signs_of_mental_illness'}
 
-# Armed
-armed_data = df.groupby('armed').count()['name'].reset_index()
-over_three = armed_data.loc[armed_data['name'] > 100]
-under_three = armed_data.loc[armed_data['name'] <= 100]
-under_three['armed'] = 'other'
-under_three = under_three.groupby('armed').count()['name'].reset_index()
-armed_data = pandas.concat([over_three, under_three])
 
-# Mental
-mental_data = df.groupby('signs_of_mental_illness').count()['name'].reset_index()
-mental_data['signs_of_mental_illness'] = mental_data['signs_of_mental_illness'].astype(str)
+# Cube member for a clicked point
+def clicked_member(dim, point):
+    if dim == 'state':
+        return point['location']
+    if dim == 'gender':
+        return 'F' if point['x'] == 'Female' else 'M'
+    if dim == 'armed':
+        return next(member for member in feed.cube.members['armed'] if member.title() == point['label'])
+    if dim == 'signs_of_mental_illness':
+        return point['label'] == 'True'
+    return point['x']
 
-# Cities
-city_data = df.groupby('city').count()['name'].reset_index().sort_values(by='name').tail(20).sort_values(by='city')
 
-# Race
-race_data = df.groupby('race').count()['name'].reset_index()
+# First and last month covered by a box selection on the month chart
+def brushed_months(selected):
+    if not selected or not selected.get('points'):
+        return None
+    months = sorted(point['customdata'] for point in selected['points'])
+    return months[0], months[-1]
 
-# Age
-df['age range'] = df['age'].apply(lambda age: f"{math.floor(age / 10) * 10}'s")
-age_data = df.groupby('age range').count()['name'].reset_index()
 
-# Gender
-gender_data = df.groupby('gender').count()['name'].reset_index()
-gender_data['gender'] = gender_data['gender'].apply(lambda x: 'Female' if x == 'F' else 'Male')
-print(gender_data)
+@app.callback(Output('filters', 'data'),
+              [Input(chart, 'clickData') for chart in filter_charts] + [Input('clear_filters', 'n_clicks')],
+              [State('filters', 'data')],
+              prevent_initial_call=True)
+def update_filters(*args):
+    filters = dict(args[-1])
+    if ctx.triggered_id == 'clear_filters':
+        return {}
+    dim = filter_charts[ctx.triggered_id]
+    member = clicked_member(dim, ctx.triggered[0]['value']['points'][0])
+    selected = filters.get(dim, [])
+    filters[dim] = [value for value in selected if value != member] if member in selected else selected + [member]
+    return filters
 
 
 @app.callback([Output(component_id='date_graph', component_property='figure'),
@@ -64,54 +80,72 @@ print(gender_data)
                Output(component_id='city_graph', component_property='figure'),
                Output(component_id='race_graph', component_property='figure'),
                Output(component_id='age_graph', component_property='figure'),
-               Output(component_id='gender_graph', component_property='figure')],
-              [Input("my_interval", "n_intervals")])
-def update(n):
-    month_fig = go.Figure(data=[
-        go.Bar(x=month_data['label'], y=month_data['name'], marker_color=colors[5])
-    ])
-    month_fig.update_layout(height=370, title="Month Breakdown", template="plotly_dark")
-
-    state_fig = go.Figure(data=go.Choropleth(
-        locations=state_data['state'],
-        z=state_data['name'],
-        locationmode='USA-states',
-        colorscale=px.colors.sequential.Aggrnyl,
-        showscale=False,
-    ))
-    state_fig.update_layout(title_text='State Breakdown', geo_scope='usa', dragmode=False, template="plotly_dark",
-                            margin={"r": 0, "t": 0, "l": 0, "b": 0})
-
-    armed_fig = go.Figure(data=[go.Pie(labels=armed_data['armed'].str.title(), values=armed_data['name'],
-                                       title="Armed", marker=dict(colors=colors))])
-    armed_fig.update_layout(template="plotly_dark")
-
-    mental_fig = go.Figure(
-        data=[go.Pie(labels=mental_data['signs_of_mental_illness'].str.title(), values=mental_data['name'],
-                     title="Mental Illness", marker=dict(colors=colors))])
-    mental_fig.update_layout(template="plotly_dark")
-
-    city_fig = go.Figure(data=[
-        go.Bar(x=city_data['city'], y=city_data['name'], marker_color=colors[6])
-    ])
-    city_fig.update_layout(title="Top 20 Most Impacted Cities", template="plotly_dark")
-
-    race_fig = go.Figure(data=[
-        go.Bar(x=race_data['race'], y=race_data['name'], marker_color=colors[3])
-    ])
-    race_fig.update_layout(title="Race", height=310, template="plotly_dark")
-
-    age_fig = go.Figure(data=[
-        go.Bar(x=age_data['age range'], y=age_data['name'], marker_color=colors[2])
-    ])
-    age_fig.update_layout(title="Age", height=310, template="plotly_dark")
-
-    gender_fig = go.Figure(data=[
-        go.Bar(x=gender_data['gender'], y=gender_data['name'], marker_color=colors[4])
-    ])
-    gender_fig.update_layout(title="Gender", height=310, template="plotly_dark")
-
-    return month_fig, state_fig, armed_fig, mental_fig, city_fig, race_fig, age_fig, gender_fig
+               Output(component_id='gender_graph', component_property='figure'),
+               Output(component_id='filter_summary', component_property='children')],
+              [Input("my_interval", "n_intervals"),
+               Input('filters', 'data'),
+               Input('date_graph', 'selectedData')])
+def update(n, filters, selected_months):
+    figures = selection_figures(filters, selected_months)
+    # Brushing the month chart only changes the other charts
+    if ctx.triggered_id == 'date_graph':
+        return (no_update, *figures[1:])
+    return figures
+
+
+# Every figure for one selection. It is cached apart from the callback, as its result does not depend on which
+# input fired.
+@figure_cache.cached()
+def selection_figures(filters, selected_months):
+    feed.refresh()
+    months = brushed_months(selected_months)
+    filters = {dim: values for dim, values in (filters or {}).items() if values}
+    # Without any selection the plain counts answer, otherwise the count cube does
+    tables = feed.cube.tables(filters, months) if filters or months else feed.tables()
+    month_data, state_data, armed_data, mental_data = tables['month'], tables['state'], tables['armed'], tables['mental']
+    city_data, race_data, age_data, gender_data = tables['city'], tables['race'], tables['age'], tables['gender']
+
+    month_fig = charts.figure(
+        charts.bar(month_data['label'], month_data['name'], marker_color=colors[5],
+                   customdata=month_data['month'].astype(str)),
+        height=370, title="Month Breakdown", template="plotly_dark", dragmode='select', uirevision='months')
+
+    state_fig = charts.figure(
+        charts.choropleth(state_data['state'], state_data['name'], locationmode='USA-states',
+                          colorscale=px.colors.sequential.Aggrnyl, showscale=False),
+        title_text='State Breakdown', geo_scope='usa', dragmode=False, template="plotly_dark",
+        margin={"r": 0, "t": 0, "l": 0, "b": 0})
+
+    armed_fig = charts.figure(
+        charts.pie(armed_data['armed'].str.title(), armed_data['name'], title="Armed", marker=dict(colors=colors)),
+        template="plotly_dark")
+
+    mental_fig = charts.figure(
+        charts.pie(mental_data['signs_of_mental_illness'].str.title(), mental_data['name'], title="Mental Illness",
+                   marker=dict(colors=colors)),
+        template="plotly_dark")
+
+    city_fig = charts.figure(charts.bar(city_data['city'], city_data['name'], marker_color=colors[6]),
+                             title="Top 20 Most Impacted Cities", template="plotly_dark")
+
+    race_fig = charts.figure(charts.bar(race_data['race'], race_data['name'], marker_color=colors[3]),
+                             title="Race", height=310, template="plotly_dark")
+
+    age_fig = charts.figure(charts.bar(age_data['age range'], age_data['name'], marker_color=colors[2]),
+                            title="Age", height=310, template="plotly_dark")
+
+    gender_fig = charts.figure(charts.bar(gender_data['gender'], gender_data['name'], marker_color=colors[4]),
+                               title="Gender", height=310, template="plotly_dark")
+
+    summary = [f"{format_range(months)}"] + [f"{dim.title()}: {', '.join(map(str, values))}"
+                                             for dim, values in filters.items()]
+    return month_fig, state_fig, armed_fig, mental_fig, city_fig, race_fig, age_fig, gender_fig, " | ".join(summary)
+
+
+def format_range(months):
+    if not months:
+        return "All months"
+    return " - ".join(pandas.Period(month, freq='M').strftime('%b %Y') for month in months)
 
 
 app.layout = html.Div([
@@ -124,9 +158,15 @@ app.layout = html.Div([
     ),
     html.H1('US Police Shootings', style={'paddingTop': '20px', 'textAlign': 'center', 'color': 'white',
                                           'fontSize': 40, 'font-family': 'Arial, Helvetica, sans-serif'}),
+    dcc.Store(id='filters', data={}),
     html.H4('JAN 2015 - Present', style={'marginTop': '-10px', 'textAlign': 'center', 'color': '#7BC875',
                                          'fontSize': 20, 'font-family': 'Arial, Helvetica, sans-serif',
                                          'backgroundColor': '#111111'}),
+    html.Div([
+        html.Span(id='filter_summary', style={'color': 'white', 'marginRight': '15px'}),
+        html.Button('Clear filters', id='clear_filters', n_clicks=0)
+    ], style={'textAlign': 'center', 'fontFamily': 'Arial, Helvetica, sans-serif', 'paddingBottom': '10px',
+              'backgroundColor': '#111111'}),
     dbc.Row([
         html.Div([
             html.Div([
@@ -165,5 +205,9 @@ app.layout = html.Div([
     ], style={'marginTop': -10}),
 ], style={'backgroundColor': '#111111'})
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,167 @@
+import io
+import os
+import threading
+
+import numpy
+import pandas
+
+from common.datasets import cached_frame
+from count_cube import CountCube
+
+# Columns the dashboard counts incidents by
+COUNTED = ['month', 'state', 'armed', 'signs_of_mental_illness', 'city', 'race', 'age range', 'gender']
+
+
+# Adds the derived columns with whole-column operations instead of per-row applies
+def derive_features(df):
+    df['date'] = pandas.to_datetime(df['date'])
+    df['year'] = df['date'].dt.year
+    df['month'] = df['date'].dt.to_period('M')
+
+    decade = (numpy.floor(df['age'] / 10) * 10).astype('Int64')
+    df['age range'] = (decade.astype(str) + "'s").where(decade.notna(), 'Unknown')
+    return df
+
+
+# Every complete line of the csv, parsed and derived. The byte offset the rows end at and the csv header are kept in
+# the frame attrs so a feed started from the cached frame continues tailing from the right place.
+def read_incidents(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    complete = data.rfind(b'\n') + 1
+    if complete == 0:
+        frame = pandas.DataFrame()
+        frame.attrs.update(offset=0, header=None)
+        return frame
+
+    frame = pandas.read_csv(io.BytesIO(data[:complete]), index_col=0)
+    header = ['id'] + list(frame.columns)
+    frame = derive_features(frame)
+    frame.attrs.update(offset=complete, header=header)
+    return frame
+
+
+# Incident counts per value of every counted column.
+# Counts are plain value counts, so two sets of counts merge by adding them and new rows never need a recount.
+class ShootingCounts:
+    def __init__(self):
+        self.rows = 0
+        self.counts = {column: pandas.Series(dtype='int64') for column in COUNTED}
+
+    def add(self, df):
+        self.rows += len(df)
+        for column in COUNTED:
+            self.counts[column] = self.counts[column].add(df[column].value_counts(), fill_value=0).astype('int64')
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column in COUNTED:
+            self.counts[column] = self.counts[column].add(other.counts[column], fill_value=0).astype('int64')
+        return self
+
+    # Counts of one column as a two column table, matching the old groupby().count()['name'] shape
+    def table(self, column):
+        return self.counts[column].rename('name').rename_axis(column).reset_index()
+
+
+# Follows the csv as it grows: only the bytes appended since the last read are parsed and folded into the counts.
+# If the file shrinks (rewritten or rotated) everything is read again. The first read of the whole file goes through
+# the dataset cache, so a restart against an unchanged csv skips parsing it. Callbacks refresh it from several threads;
+# one reads at a time, so the same appended rows are never counted twice.
+class ShootingsFeed:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.offset = 0
+        self.header = None
+        self.version = 0
+        self.counts = ShootingCounts()
+        self.cube = None
+        self._tables = (None, None)
+
+    def _parse(self, data):
+        frame = pandas.read_csv(io.BytesIO(data), names=self.header, header=None, index_col=0)
+        return derive_features(frame)
+
+    # Reads any complete lines appended since the last call, returns the number of new incidents
+    def refresh(self):
+        with self.lock:
+            return self._read()
+
+    # The offset is only read and moved under the lock, so a thread that waited sees the rows the other one added
+    def _read(self):
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            self.offset, self.header, self.counts, self.cube = 0, None, ShootingCounts(), None
+        if size == self.offset:
+            return 0
+
+        if self.offset == 0:
+            new_rows = cached_frame(self.path, read_incidents)
+            if len(new_rows) == 0:
+                return 0
+            self.offset, self.header = new_rows.attrs['offset'], new_rows.attrs['header']
+        else:
+            with open(self.path, 'rb') as file:
+                file.seek(self.offset)
+                data = file.read(size - self.offset)
+            complete = data.rfind(b'\n') + 1
+            if complete == 0:
+                return 0
+            new_rows = self._parse(data[:complete])
+            self.offset += complete
+
+        self.counts.add(new_rows)
+        # Same weapons the armed chart shows separately, everything else is 'other' in the cube. When new rows change
+        # that set (a new weapon, or one passing 100 incidents), the cube's 'other' slice no longer matches the chart,
+        # so the feed starts over from the whole file and builds the cube with the new groups.
+        if self.cube is not None and set(self.armed_groups()) != self.cube.armed_groups:
+            self.offset, self.header, self.counts, self.cube = 0, None, ShootingCounts(), None
+            self._read()
+            return len(new_rows)
+        if self.cube is None:
+            self.cube = CountCube(self.armed_groups())
+        self.cube.add(new_rows)
+        self.version += 1
+        return len(new_rows)
+
+    def armed_groups(self):
+        armed = self.counts.counts['armed']
+        return armed.index[armed > 100]
+
+    # Tables behind the dashboard figures, derived from the counts alone and rebuilt only after new rows arrive
+    def tables(self):
+        if self._tables[0] != self.version:
+            self._tables = (self.version, self._build_tables())
+        return self._tables[1]
+
+    def _build_tables(self):
+        counts = self.counts
+
+        month_data = counts.table('month').sort_values(by='month')
+        month_data['label'] = month_data['month'].dt.strftime('%b %Y')
+
+        # Weapons with 100 or fewer incidents are folded into one 'other' slice
+        armed = counts.counts['armed'].sort_index()
+        armed_data = pandas.concat([armed.loc[armed > 100], pandas.Series({'other': armed.loc[armed <= 100].sum()})])
+        armed_data = armed_data.rename('name').rename_axis('armed').reset_index()
+
+        mental_data = counts.table('signs_of_mental_illness')
+        mental_data['signs_of_mental_illness'] = mental_data['signs_of_mental_illness'].astype(str)
+
+        city_data = counts.table('city').sort_values(by='name', kind='stable').tail(20).sort_values(by='city')
+
+        gender_data = counts.table('gender')
+        gender_data['gender'] = numpy.where(gender_data['gender'] == 'F', 'Female', 'Male')
+
+        return {
+            'month': month_data,
+            'state': counts.table('state').sort_values(by='state'),
+            'armed': armed_data,
+            'mental': mental_data,
+            'city': city_data,
+            'race': counts.table('race').sort_values(by='race'),
+            'age': counts.table('age range').sort_values(by='age range'),
+            'gender': gender_data.groupby('gender', as_index=False)['name'].sum(),
+        }
@@ -1,71 +1,84 @@
+import os
+import sys
+import threading
 from dash import Dash, html, dcc
-import math
+import numpy
 import dash_bootstrap_components as dbc
 import pandas
-import plotly.graph_objects as go
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.assets import asset_url, self_hosted_assets
+from common import charts
+from common.datasets import cached_frame
+from common.encoding import compact_responses
+from common.figures import FigureCache, files_version
+from common.metrics import instrument
+
+from fighter_index import FighterIndex
+from loader import load_fights
+from odds import OddsAnalytics, favorite_results
+from ratings import EloRatings, calibration
+from records import add_outcomes, long_corners, fighter_records
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.LUX])
 
 server = app.server
 
 colors = ['#3399FF', '#FF3300']
+tab_style = {'backgroundColor': '#111111', 'color': 'white', 'border': 'none'}
+selected_tab_style = {'backgroundColor': '#222222', 'color': 'white', 'border': 'none', 'borderTop': '2px solid #FF3300'}
 weight_class_order = [6, 13, 7, 5, 12, 11, 8, 10, 9, 3, 4, 2, 1]
 
+
+def load_data(path):
+    df = add_outcomes(load_fights(path))
+    df['year'] = pandas.DatetimeIndex(df['date']).year
+    df['month'] = pandas.DatetimeIndex(df['date']).month
+    df['day'] = 1
+    return df
+
+
 # https://www.kaggle.com/mdabbert/ultimate-ufc-dataset?select=ufc-master.csv
-df = pandas.read_csv("ufc-master.csv")
-df['Winner_Name'] = df[['R_fighter', 'B_fighter', 'Winner']].apply(
-    lambda row: row['R_fighter'] if row['Winner'] == 'Red' else row['B_fighter'], axis=1)
-df['Loser_Name'] = df[['R_fighter', 'B_fighter', 'Winner']].apply(
-    lambda row: row['B_fighter'] if row['Winner'] == 'Red' else row['R_fighter'], axis=1)
-df['date'] = pandas.to_datetime(df['date'], format='%m/%d/%Y')
-df['year'] = pandas.DatetimeIndex(df['date']).year
-df['month'] = pandas.DatetimeIndex(df['date']).month
-df['day'] = 1
-
-# Top fighters
-top20men = df.loc[df['gender'] == 'MALE'].groupby('Winner_Name').count()['location']\
-    .sort_values().tail(20).reset_index()
-top20women = df.loc[df['gender'] == 'FEMALE'].groupby('Winner_Name').count()['location']\
-    .sort_values().tail(20).reset_index()
-
-# Fight time
-fight_times = df.loc[df['total_fight_time_secs'].notna()]
-fight_times['time_range'] = fight_times['total_fight_time_secs'].apply(lambda x: math.ceil(x / 10) * 10)
-fight_times = fight_times.groupby('time_range').count()['location'].reset_index().sort_values(by='time_range')
-fight_times = fight_times.loc[fight_times['time_range'] < 900]
-
-# Favored wins
-favored_red_wins = df.loc[df['R_odds'] < 0].groupby('Winner').count()['location'].reset_index().assign(Winner=['Lost', 'Won'])
-favored_blue_wins = df.loc[df['B_odds'] < 0].groupby('Winner').count()['location'].reset_index().assign(Winner=['Won', 'Lost'])
-
-# Weight class breakdown
-weight_classes = df.groupby('weight_class').count()['location'].reset_index()
-weight_classes['order'] = weight_class_order
-weight_classes = weight_classes.sort_values(by='order')
-weight_classes['color'] = weight_classes['weight_class'].apply(lambda word: colors[1] if 'Women' in word else colors[0])
-
-# Win & lose streaks
-red_streaks = df[['R_fighter', 'R_current_win_streak', 'R_current_lose_streak']].\
-    rename(columns={"R_fighter": "fighter", "R_current_win_streak": "wins", "R_current_lose_streak": "losses"})
-blue_streaks = df[['B_fighter', 'B_current_win_streak', 'B_current_lose_streak']].\
-    rename(columns={"B_fighter": "fighter", "B_current_win_streak": "wins", "B_current_lose_streak": "losses"})
-streaks = pandas.concat([red_streaks, blue_streaks])
-highest_win_streak = streaks[['fighter', 'wins']].groupby('fighter').max().sort_values(by='wins').tail(5).reset_index()
-highest_lose_streak = streaks[['fighter', 'losses']].groupby('fighter').max().sort_values(by='losses').tail(5).reset_index()
-
-# Month Fight Data
-fights_per_day = df.groupby(['year', 'month']).count()['location'].reset_index()
-fights_per_day['day'] = 1
-fights_per_day['label'] = pandas.to_datetime(fights_per_day[['year', 'month', 'day']]).apply(lambda x: x.strftime('%b %Y'))
-
-# Highest win average
-wins = df.groupby('Winner_Name').count()['location'].reset_index().rename(columns={"Winner_Name": "name", "location": "Wins"})
-losses = df.groupby('Loser_Name').count()['location'].reset_index().rename(columns={"Loser_Name": "name", "location": "Losses"})
-total = wins.merge(losses, on='name', how='outer')
-total['Win_Average'] = total[['Wins', 'Losses']].apply(lambda row: round(row['Wins']/(row['Wins']+row['Losses']), 2), axis=1)
-total = total.sort_values(by='Win_Average', ascending=False).head(100).sort_values(by='Wins')
-print(total)
+data_file = os.path.join(os.path.dirname(__file__), "ufc-master.csv")
+df = cached_frame(data_file, load_data)
+
+# Figures are rebuilt only when the data file changes, not on every interval tick of every client
+figure_cache = FigureCache(data_file)
+
+
+# The 20 best rated fighters and the calibration of the ratings against the betting odds
+def rating_tables(fights):
+    top = ratings.table(min_fights=5).sort_values(by='rating', kind='stable').tail(20).reset_index()
+    return top, calibration(ratings, fights)
+
+
+# Elo ratings from one chronological pass; fights added to the csv are folded in on the next interval tick
+ratings = EloRatings()
+ratings.add_fights(df)
+ratings_version = files_version([data_file])
+ratings_lock = threading.Lock()
+top_ratings, rating_calibration = rating_tables(df)
+
+
+# Rates the fights added to the csv since the last check and rebuilds the tables shown from the ratings
+def refresh_ratings():
+    global ratings_version, top_ratings, rating_calibration
+    with ratings_lock:
+        version = files_version([data_file])
+        if version == ratings_version:
+            return
+        fights = cached_frame(data_file, load_data)
+        ratings.add_fights(fights)
+        top_ratings, rating_calibration = rating_tables(fights)
+        ratings_version = version
+
+# The lookup index behind the profile page
+fights_long = long_corners(df)
+fighter_index = FighterIndex(fights_long)
+
+# Betting odds analytics
+odds_analytics = OddsAnalytics(df)
 
 
 @app.callback([Output(component_id='top_20_men', component_property='figure'),
@@ -79,76 +92,261 @@ print(total)
                Output(component_id='date_graph', component_property='figure'),
                Output(component_id='average_graph', component_property='figure')],
               [Input("my_interval", "n_intervals")])
+@figure_cache.cached(ignore=['n'])
 def update(n):
-    top_men_fig = go.Figure(data=[
-        go.Bar(x=top20men['Winner_Name'], y=top20men['location'], marker_color=colors[0])
-    ])
-    top_men_fig.update_layout(title="Top 20 Men", template="plotly_dark", yaxis_title="Wins")
-
-    top_women_fig = go.Figure(data=[
-        go.Bar(x=top20women['Winner_Name'], y=top20women['location'], marker_color=colors[1])
-    ])
-    top_women_fig.update_layout(title="Top 20 Women", template="plotly_dark", yaxis_title="Wins")
-
-    favored_red_fig = go.Figure(
-        data=[go.Pie(labels=favored_red_wins['Winner'], values=favored_red_wins['location'],
-                     title="Favored Red", marker=dict(colors=colors))])
-    favored_red_fig.update_layout(template="plotly_dark")
-
-    favored_blue_fig = go.Figure(
-        data=[go.Pie(labels=favored_blue_wins['Winner'], values=favored_blue_wins['location'],
-                     title="Favored Blue", marker=dict(colors=colors))])
-    favored_blue_fig.update_layout(template="plotly_dark")
-
-    fight_time_fig = go.Figure(data=[
-        go.Bar(x=fight_times['time_range'], y=fight_times['location'], marker_color=colors[0],
-               name="Time(seconds)")
-    ])
-    fight_time_fig.add_trace(go.Scatter(
-        x=[305, 605],
-        y=[55, 55],
-        text=["Round 1",
-              "Round 2"],
-        mode="text",
-    ))
-    fight_time_fig.update_traces(hovertemplate=None)
-    fight_time_fig.update_layout(title="Fight Times Under the 15min Maximum", template="plotly_dark", showlegend=False,
-                                 xaxis_title="Time(Seconds)", yaxis_title="# of Fights",
-                                 shapes=[
-                                    dict(type='line', yref='paper', y0=0, y1=0.925, xref='x', x0=305, x1=305),
-                                    dict(type='line', yref='paper', y0=0, y1=0.925, xref='x', x0=605, x1=605)
-                                 ])
-
-    weight_class_fig = go.Figure(data=[
-        go.Bar(x=weight_classes['weight_class'], y=weight_classes['location'], marker_color=weight_classes['color'])
-    ])
-    weight_class_fig.update_layout(title="Weight Class", template="plotly_dark", yaxis_title="# of Fights", xaxis_title="Weight Class")
-
-    highest_win_streak_fig = go.Figure(data=[
-        go.Bar(x=highest_win_streak['fighter'], y=highest_win_streak['wins'], marker_color=colors[1])
-    ])
-    highest_win_streak_fig.update_layout(title="Highest Win Streak", template="plotly_dark", yaxis_title="Win Streak", xaxis_title="Fighter")
-
-    highest_lose_streak_fig = go.Figure(data=[
-        go.Bar(x=highest_lose_streak['fighter'], y=highest_lose_streak['losses'], marker_color=colors[0])
-    ])
-    highest_lose_streak_fig.update_layout(title="Highest Lose Streak", template="plotly_dark", yaxis_title="Lose Streak", xaxis_title="Fighter")
-
-    date_fig = go.Figure(data=[
-        go.Bar(x=fights_per_day['label'], y=fights_per_day['location'], marker_color=colors[1])
-    ])
-    date_fig.update_layout(title="Fight Dates (by month)", template="plotly_dark", yaxis_title="# of Fights", xaxis_title="Date", xaxis=dict(nticks=12))
-
-    average_fig = go.Figure(data=[
-        go.Bar(name='Wins', x=total['name'], y=total['Wins'], marker_color=colors[0], hovertext=total['Win_Average']),
-        go.Bar(name='Losses', x=total['name'], y=total['Losses'], marker_color='white')
-    ])
-    average_fig.update_layout(barmode='stack', title='Top 50 Highest Win Averages', template="plotly_dark")
+    # Built from the csv as it is now: the cache calls this again once the file changes
+    fights = cached_frame(data_file, load_data)
+    records = fighter_records(long_corners(fights))
+
+    # Top fighters
+    top20men = records.loc[records['gender'] == 'MALE', 'Wins'].sort_values(kind='stable').tail(20).reset_index()
+    top20women = records.loc[records['gender'] == 'FEMALE', 'Wins'].sort_values(kind='stable').tail(20).reset_index()
+
+    # Fight time
+    fight_times = fights.loc[fights['total_fight_time_secs'].notna()]
+    fight_times = fight_times.assign(
+        time_range=(numpy.ceil(fight_times['total_fight_time_secs'] / 10) * 10).astype(int))
+    fight_times = fight_times.groupby('time_range').count()['location'].reset_index().sort_values(by='time_range')
+    fight_times = fight_times.loc[fight_times['time_range'] < 900]
+
+    # Favored wins
+    favored_red_wins = favorite_results(fights, 'Red')
+    favored_blue_wins = favorite_results(fights, 'Blue')
+
+    # Weight class breakdown
+    weight_classes = fights.groupby('weight_class').count()['location'].reset_index()
+    weight_classes['order'] = weight_class_order
+    weight_classes = weight_classes.sort_values(by='order')
+    weight_classes['color'] = weight_classes['weight_class'].apply(
+        lambda word: colors[1] if 'Women' in word else colors[0])
+
+    # Win & lose streaks
+    highest_win_streak = records['max_win_streak'].rename('wins').rename_axis('fighter')\
+        .sort_values(kind='stable').tail(5).reset_index()
+    highest_lose_streak = records['max_lose_streak'].rename('losses').rename_axis('fighter')\
+        .sort_values(kind='stable').tail(5).reset_index()
+
+    # Month Fight Data
+    fights_per_day = fights.groupby(['year', 'month']).count()['location'].reset_index()
+    fights_per_day['day'] = 1
+    fights_per_day['label'] = pandas.to_datetime(fights_per_day[['year', 'month', 'day']])\
+        .apply(lambda x: x.strftime('%b %Y'))
+
+    # Highest win average (among fighters with at least one win and one loss)
+    total = records.loc[(records['Wins'] > 0) & (records['Losses'] > 0), ['Wins', 'Losses', 'Win_Average']]\
+        .reset_index()
+    total = total.sort_values(by='Win_Average', ascending=False, kind='stable').head(100)\
+        .sort_values(by='Wins', kind='stable')
+
+    top_men_fig = charts.figure(
+        charts.bar(top20men['name'], top20men['Wins'], marker_color=colors[0]),
+        title="Top 20 Men", template="plotly_dark", yaxis_title="Wins")
+
+    top_women_fig = charts.figure(
+        charts.bar(top20women['name'], top20women['Wins'], marker_color=colors[1]),
+        title="Top 20 Women", template="plotly_dark", yaxis_title="Wins")
+
+    favored_red_fig = charts.figure(
+        charts.pie(favored_red_wins['Winner'], favored_red_wins['location'], title="Favored Red",
+                   marker=dict(colors=colors)),
+        template="plotly_dark")
+
+    favored_blue_fig = charts.figure(
+        charts.pie(favored_blue_wins['Winner'], favored_blue_wins['location'], title="Favored Blue",
+                   marker=dict(colors=colors)),
+        template="plotly_dark")
+
+    fight_time_fig = charts.figure(
+        charts.bar(fight_times['time_range'], fight_times['location'], marker_color=colors[0], name="Time(seconds)"),
+        charts.scatter([305, 605], [55, 55], text=["Round 1", "Round 2"], mode="text"),
+        title="Fight Times Under the 15min Maximum", template="plotly_dark", showlegend=False,
+        xaxis_title="Time(Seconds)", yaxis_title="# of Fights",
+        shapes=[
+            dict(type='line', yref='paper', y0=0, y1=0.925, xref='x', x0=305, x1=305),
+            dict(type='line', yref='paper', y0=0, y1=0.925, xref='x', x0=605, x1=605)
+        ])
+
+    weight_class_fig = charts.figure(
+        charts.bar(weight_classes['weight_class'], weight_classes['location'], marker_color=weight_classes['color']),
+        title="Weight Class", template="plotly_dark", yaxis_title="# of Fights", xaxis_title="Weight Class")
+
+    highest_win_streak_fig = charts.figure(
+        charts.bar(highest_win_streak['fighter'], highest_win_streak['wins'], marker_color=colors[1]),
+        title="Highest Win Streak", template="plotly_dark", yaxis_title="Win Streak", xaxis_title="Fighter")
+
+    highest_lose_streak_fig = charts.figure(
+        charts.bar(highest_lose_streak['fighter'], highest_lose_streak['losses'], marker_color=colors[0]),
+        title="Highest Lose Streak", template="plotly_dark", yaxis_title="Lose Streak", xaxis_title="Fighter")
+
+    date_fig = charts.figure(
+        charts.bar(fights_per_day['label'], fights_per_day['location'], marker_color=colors[1]),
+        title="Fight Dates (by month)", template="plotly_dark", yaxis_title="# of Fights", xaxis_title="Date",
+        xaxis=dict(nticks=12))
+
+    average_fig = charts.figure(
+        charts.bar(total['name'], total['Wins'], name='Wins', marker_color=colors[0], hovertext=total['Win_Average']),
+        charts.bar(total['name'], total['Losses'], name='Losses', marker_color='white'),
+        barmode='stack', title='Top 50 Highest Win Averages', template="plotly_dark")
 
     return top_men_fig, top_women_fig, favored_red_fig, favored_blue_fig, fight_time_fig, weight_class_fig, \
            highest_win_streak_fig, highest_lose_streak_fig, date_fig, average_fig
 
 
+# Fight rows of a fighter as a table from that fighter's point of view, oldest first
+def fighter_fights(name, rows):
+    fights = df.iloc[rows].sort_values(by='date', kind='stable')
+    red = (fights['R_fighter'] == name).to_numpy()
+    won = numpy.where(red, fights['Winner'] == 'Red', fights['Winner'] == 'Blue')
+    return pandas.DataFrame({
+        'date': fights['date'].to_numpy(),
+        'opponent': numpy.where(red, fights['B_fighter'], fights['R_fighter']),
+        'result': numpy.where(won, 'Win', 'Loss'),
+        'weight_class': fights['weight_class'].to_numpy(),
+        'finish': fights['finish'].astype(object).fillna('').to_numpy(),
+    })
+
+
+def fights_table(fights):
+    header = html.Tr([html.Th(column.replace('_', ' ').title()) for column in fights.columns])
+    rows = [html.Tr([html.Td(fight.date.strftime('%b %d, %Y')), html.Td(fight.opponent), html.Td(fight.result),
+                     html.Td(fight.weight_class), html.Td(fight.finish)])
+            for fight in fights.itertuples()]
+    return html.Table([header] + rows, style={'width': '90%', 'margin': 'auto', 'color': 'white'})
+
+
+@app.callback(Output('fighter_search', 'options'),
+              [Input('fighter_search', 'search_value')],
+              [State('fighter_search', 'value')])
+def update_fighter_options(search, selected):
+    names = fighter_index.prefix(search) if search else []
+    if selected and selected not in names:
+        names = [selected] + names
+    return [{'label': name, 'value': name} for name in names]
+
+
+# Opponents of the selected fighter; an opponent picked for the previous fighter is cleared when they never met
+@app.callback([Output('opponent_select', 'options'),
+               Output('opponent_select', 'value')],
+              [Input('fighter_search', 'value')],
+              [State('opponent_select', 'value')])
+def update_opponent_options(name, selected):
+    opponents = sorted(set(fighter_fights(name, fighter_index.fights(name))['opponent'])) if name else []
+    return [{'label': opponent, 'value': opponent} for opponent in opponents], \
+        selected if selected in opponents else None
+
+
+@app.callback([Output('timeline_graph', 'figure'),
+               Output('weight_class_record', 'figure'),
+               Output('fighter_fights', 'children'),
+               Output('head_to_head', 'children')],
+              [Input('fighter_search', 'value'),
+               Input('opponent_select', 'value')])
+def update_profile(name, opponent):
+    fights = fighter_fights(name, fighter_index.fights(name)) if name else fighter_fights('', [])
+    won = (fights['result'] == 'Win').to_numpy()
+
+    timeline_fig = charts.figure(
+        charts.scatter(fights['date'], numpy.cumsum(numpy.where(won, 1, -1)), mode='lines+markers',
+                       marker=dict(color=numpy.where(won, colors[0], colors[1]), size=10),
+                       line_color='white', hovertext=fights['result'] + ' vs ' + fights['opponent']),
+        title=f"{name or 'Fighter'} Timeline", template="plotly_dark", yaxis_title="Wins - Losses",
+        xaxis_title="Date")
+
+    by_class = fights.groupby(['weight_class', 'result']).size().unstack(fill_value=0)
+    weight_fig = charts.figure(
+        *[charts.bar(by_class.index, by_class[result], name=result, marker_color=color)
+          for result, color in zip(['Win', 'Loss'], colors) if result in by_class],
+        barmode='stack', title="Results by Weight Class", template="plotly_dark")
+
+    head_to_head = []
+    if name and opponent:
+        meetings = fighter_fights(name, fighter_index.head_to_head(name, opponent))
+        wins = int((meetings['result'] == 'Win').sum())
+        head_to_head = [html.H4(f"{name} {wins} - {len(meetings) - wins} {opponent}",
+                                style={'color': 'white', 'textAlign': 'center'}), fights_table(meetings)]
+
+    return timeline_fig, weight_fig, fights_table(fights.iloc[::-1]), head_to_head
+
+
+@app.callback(Output('rating_fighters', 'options'),
+              [Input('rating_fighters', 'search_value')],
+              [State('rating_fighters', 'value')])
+def update_rating_options(search, selected):
+    selected = selected or []
+    names = [name for name in (fighter_index.prefix(search) if search else []) if name not in selected]
+    return [{'label': name, 'value': name} for name in selected + names]
+
+
+@app.callback([Output('top_ratings_graph', 'figure'),
+               Output('rating_trajectory', 'figure'),
+               Output('calibration_graph', 'figure')],
+              [Input('rating_fighters', 'value'),
+               Input("my_interval", "n_intervals")])
+def update_ratings(names, n):
+    refresh_ratings()
+    top_fig = charts.figure(
+        charts.bar(top_ratings['name'], top_ratings['rating'], marker_color=colors[1],
+                   hovertext=top_ratings['fights'].map('{} fights'.format)),
+        title="Top 20 Elo Ratings (5+ fights)", template="plotly_dark", yaxis_title="Rating",
+        yaxis_range=[ratings.initial, top_ratings['rating'].max() + 20])
+
+    trajectory_fig = charts.figure(
+        *[charts.scatter(trajectory['date'], trajectory['rating'], mode='lines+markers', name=name)
+          for name in names or [] for trajectory in [ratings.trajectory(name)]],
+        title="Rating Trajectory", template="plotly_dark", yaxis_title="Rating", xaxis_title="Date")
+
+    calibration_fig = charts.figure(
+        charts.scatter([0, 1], [0, 1], mode='lines', line=dict(color='gray', dash='dash'), name='Perfect'),
+        *[charts.scatter(group['predicted'], group['actual'], mode='lines+markers', name=source,
+                         marker_color=color, hovertext=group['fights'].map('{} fights'.format))
+          for (source, group), color in zip(rating_calibration.groupby('source', sort=False), colors)],
+        title="Ratings vs. Betting Odds (Red Corner Win Probability)", template="plotly_dark",
+        xaxis_title="Predicted", yaxis_title="Actual")
+
+    return top_fig, trajectory_fig, calibration_fig
+
+
+@app.callback([Output('odds_calibration', 'figure'),
+               Output('upsets_weight_class', 'figure'),
+               Output('upsets_year', 'figure'),
+               Output('expected_value', 'children')],
+              [Input('odds_weight_classes', 'value'),
+               Input('odds_years', 'value')])
+def update_odds(weight_classes, years):
+    summary = odds_analytics.summary(tuple(sorted(weight_classes or [])), tuple(years or []))
+    curve = summary['calibration']
+
+    calibration_fig = charts.figure(
+        charts.scatter([0, 1], [0, 1], mode='lines', line=dict(color='gray', dash='dash'), name='Perfect'),
+        charts.scatter(curve['implied'], curve['actual'], mode='lines+markers', marker_color=colors[0],
+                       name='Fighters', hovertext=curve['fights'].map('{} fighters'.format)),
+        title="Odds Calibration", template="plotly_dark", showlegend=False,
+        xaxis_title="Implied Win Probability", yaxis_title="Actual Win Rate")
+
+    by_class = summary['upsets_by_weight_class'].sort_values(by='upset_rate')
+    weight_fig = charts.figure(
+        charts.bar(by_class['weight_class'], by_class['upset_rate'], marker_color=colors[1],
+                   hovertext=by_class['fights'].map('{} fights'.format)),
+        title="Upset Rate by Weight Class", template="plotly_dark", yaxis_tickformat='.0%')
+
+    by_year = summary['upsets_by_year']
+    year_fig = charts.figure(
+        charts.bar(by_year['year'], by_year['upset_rate'], marker_color=colors[0],
+                   hovertext=by_year['fights'].map('{} fights'.format)),
+        title="Upset Rate by Year", template="plotly_dark", yaxis_tickformat='.0%')
+
+    ev = summary['expected_value']
+    ev_table = html.Table([
+        html.Tr([html.Th(header) for header in ['Bet $100 on', 'Bets', 'Win Rate', 'Avg Return']])
+    ] + [
+        html.Tr([html.Td(row.strategy), html.Td(f"{row.bets:,}"), html.Td(f"{row.win_rate:.1%}"),
+                 html.Td(f"${row.return_per_100:,.2f}")])
+        for row in ev.itertuples()
+    ], style={'width': '60%', 'margin': 'auto', 'color': 'white', 'fontSize': 18})
+
+    return calibration_fig, weight_fig, year_fig, ev_table
+
+
 app.layout = html.Div([
     dcc.Interval(
         id='my_interval',
@@ -161,7 +359,7 @@ app.layout = html.Div([
         html.Div(style={"width": '40%'}),
         html.Div([
             html.Img(
-                src='https://upload.wikimedia.org/wikipedia/commons/thumb/0/0d/UFC_logo.svg/640px-UFC_logo.svg.png',
+                src=asset_url(app, 'images/ufc-logo.svg'),
                 style={'-webkit-filter': 'invert(100%)', 'width': 200, "position": 'relative',
                        'zIndex': 10, 'margin': "15px 0px 5px"}),
         ], style={'textAlign': 'center', 'margin': "0px 0px 10px", "width": '20%'}),
@@ -170,40 +368,110 @@ app.layout = html.Div([
     html.H4('MAR 2010 - Present', style={'marginTop': '-10px', 'textAlign': 'center', 'color': 'white',
                                          'fontSize': 20, 'font-family': 'Arial, Helvetica, sans-serif',
                                          'backgroundColor': '#111111'}),
-    dbc.Row([
-        html.Div([
-            dcc.Graph(id='top_20_men', config={'displayModeBar': False})
-        ], style={"width": '50%'}),
-        html.Div([
-            dcc.Graph(id='top_20_women', config={'displayModeBar': False})
-        ], style={"width": '50%'}),
-    ]),
-    dbc.Row([
-        html.Div([
-            dcc.Graph(id='favored_red', config={'displayModeBar': False})
-        ], style={"width": '27%'}),
-        html.Div([
-            dcc.Graph(id='favored_blue', config={'displayModeBar': False})
-        ], style={"width": '27%'}),
-        html.Div([
-            dcc.Graph(id='fight_time', config={'displayModeBar': False})
-        ], style={"width": '46%'}),
+    dcc.Tabs([
+        dcc.Tab(label='Leaderboards', children=[
+            dbc.Row([
+                html.Div([
+                    dcc.Graph(id='top_20_men', config={'displayModeBar': False})
+                ], style={"width": '50%'}),
+                html.Div([
+                    dcc.Graph(id='top_20_women', config={'displayModeBar': False})
+                ], style={"width": '50%'}),
+            ]),
+            dbc.Row([
+                html.Div([
+                    dcc.Graph(id='favored_red', config={'displayModeBar': False})
+                ], style={"width": '27%'}),
+                html.Div([
+                    dcc.Graph(id='favored_blue', config={'displayModeBar': False})
+                ], style={"width": '27%'}),
+                html.Div([
+                    dcc.Graph(id='fight_time', config={'displayModeBar': False})
+                ], style={"width": '46%'}),
+            ]),
+            dbc.Row([
+                html.Div([
+                    dcc.Graph(id='weight_class', config={'displayModeBar': False})
+                ], style={"width": '33.3%'}),
+                html.Div([
+                    dcc.Graph(id='highest_win_streak', config={'displayModeBar': False})
+                ], style={"width": '33.4%'}),
+                html.Div([
+                    dcc.Graph(id='highest_lose_streak', config={'displayModeBar': False})
+                ], style={"width": '33.3%'}),
+            ]),
+            dcc.Graph(id='date_graph', config={'displayModeBar': False}),
+            dcc.Graph(id='average_graph', config={'displayModeBar': False}),
+        ], style=tab_style, selected_style=selected_tab_style),
+        dcc.Tab(label='Fighter Profile', children=[
+            dbc.Row([
+                html.Div([
+                    dcc.Dropdown(id='fighter_search', placeholder="Search for a fighter", value='Israel Adesanya')
+                ], style={"width": '45%', 'margin': '20px 2.5%'}),
+                html.Div([
+                    dcc.Dropdown(id='opponent_select', placeholder="Head-to-head opponent")
+                ], style={"width": '45%', 'margin': '20px 2.5%'}),
+            ]),
+            html.Div(id='head_to_head'),
+            dbc.Row([
+                html.Div([
+                    dcc.Graph(id='timeline_graph', config={'displayModeBar': False})
+                ], style={"width": '60%'}),
+                html.Div([
+                    dcc.Graph(id='weight_class_record', config={'displayModeBar': False})
+                ], style={"width": '40%'}),
+            ]),
+            html.Div(id='fighter_fights', style={'marginTop': 20}),
+        ], style=tab_style, selected_style=selected_tab_style),
+        dcc.Tab(label='Odds', children=[
+            dbc.Row([
+                html.Div([
+                    dcc.Dropdown(id='odds_weight_classes', placeholder="All weight classes", multi=True,
+                                 options=[{'label': weight_class, 'value': weight_class}
+                                          for weight_class in odds_analytics.weight_classes])
+                ], style={"width": '40%', 'margin': '20px 2.5%'}),
+                html.Div([
+                    dcc.RangeSlider(id='odds_years', min=df['year'].min(), max=df['year'].max(), step=1,
+                                    value=[df['year'].min(), df['year'].max()],
+                                    marks={str(year): str(year) for year in range(df['year'].min(),
+                                                                                  df['year'].max() + 1)})
+                ], style={"width": '50%', 'margin': '25px 2.5%'}),
+            ]),
+            html.Div(id='expected_value'),
+            dbc.Row([
+                html.Div([
+                    dcc.Graph(id='odds_calibration', config={'displayModeBar': False})
+                ], style={"width": '34%'}),
+                html.Div([
+                    dcc.Graph(id='upsets_weight_class', config={'displayModeBar': False})
+                ], style={"width": '33%'}),
+                html.Div([
+                    dcc.Graph(id='upsets_year', config={'displayModeBar': False})
+                ], style={"width": '33%'}),
+            ]),
+        ], style=tab_style, selected_style=selected_tab_style),
+        dcc.Tab(label='Ratings', children=[
+            dcc.Graph(id='top_ratings_graph', config={'displayModeBar': False}),
+            html.Div([
+                dcc.Dropdown(id='rating_fighters', placeholder="Compare fighters", multi=True,
+                             value=['Jon Jones', 'Daniel Cormier'])
+            ], style={"width": '60%', 'margin': '10px auto'}),
+            dbc.Row([
+                html.Div([
+                    dcc.Graph(id='rating_trajectory', config={'displayModeBar': False})
+                ], style={"width": '55%'}),
+                html.Div([
+                    dcc.Graph(id='calibration_graph', config={'displayModeBar': False})
+                ], style={"width": '45%'}),
+            ]),
+        ], style=tab_style, selected_style=selected_tab_style),
     ]),
-    dbc.Row([
-        html.Div([
-            dcc.Graph(id='weight_class', config={'displayModeBar': False})
-        ], style={"width": '33.3%'}),
-        html.Div([
-            dcc.Graph(id='highest_win_streak', config={'displayModeBar': False})
-        ], style={"width": '33.4%'}),
-        html.Div([
-            dcc.Graph(id='highest_lose_streak', config={'displayModeBar': False})
-        ], style={"width": '33.3%'}),
-    ]),
-    dcc.Graph(id='date_graph', config={'displayModeBar': False}),
-    dcc.Graph(id='average_graph', config={'displayModeBar': False}),
     html.Div(style={'height': 100})
 ], style={'backgroundColor': '#111111'})
 
+instrument(app)
+compact_responses(app)
+self_hosted_assets(app)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
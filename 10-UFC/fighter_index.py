@@ -0,0 +1,59 @@
+from bisect import bisect_left
+
+import numpy
+
+
+# Lookup structures over the long corner table (see records.long_corners), built once at load:
+# - a name -> fighter id hash map and per-fighter fight row ids stored contiguously (CSR offsets)
+# - a sorted array of (fighter, opponent) pair keys for head-to-head lookups by binary search
+# - a sorted list of case-folded name suffixes starting at each word, for prefix search on first or last names
+class FighterIndex:
+    def __init__(self, long):
+        self.names = list(long['fighter'].cat.categories)
+        self.ids = {name: fighter_id for fighter_id, name in enumerate(self.names)}
+
+        fighter_ids = long['fighter_id'].to_numpy()
+        order = numpy.argsort(fighter_ids, kind='stable')
+        self.fight_rows = long['fight'].to_numpy()[order]
+        self.offsets = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(fighter_ids, minlength=len(self.names)))])
+
+        # Both corners are in the long table, so every fight appears under (a, b) and (b, a)
+        opponent_ids = long['opponent'].cat.codes.to_numpy().astype(numpy.int64)
+        pair_keys = fighter_ids.astype(numpy.int64) * len(self.names) + opponent_ids
+        pair_order = numpy.argsort(pair_keys, kind='stable')
+        self.pair_keys = pair_keys[pair_order]
+        self.pair_rows = long['fight'].to_numpy()[pair_order]
+
+        self.folded = sorted((folded[start:], name) for name in self.names
+                             for folded in [name.casefold()]
+                             for start in [0] + [i + 1 for i, char in enumerate(folded) if char == ' '])
+        self.folded_keys = [key for key, _ in self.folded]
+
+    # Row ids of every fight of a fighter, in load order
+    def fights(self, name):
+        fighter_id = self.ids.get(name)
+        if fighter_id is None:
+            return numpy.empty(0, dtype=numpy.intp)
+        return self.fight_rows[self.offsets[fighter_id]:self.offsets[fighter_id + 1]]
+
+    # Row ids of the fights between two fighters
+    def head_to_head(self, name, opponent):
+        if name not in self.ids or opponent not in self.ids:
+            return numpy.empty(0, dtype=numpy.intp)
+        key = self.ids[name] * len(self.names) + self.ids[opponent]
+        start, end = numpy.searchsorted(self.pair_keys, [key, key + 1])
+        return self.pair_rows[start:end]
+
+    # Fighter names with a word starting with the text (case-insensitive)
+    def prefix(self, text, limit=20):
+        text = text.casefold()
+        matches = []
+        position = bisect_left(self.folded_keys, text)
+        while position < len(self.folded) and len(matches) < limit:
+            key, name = self.folded[position]
+            if not key.startswith(text):
+                break
+            if name not in matches:
+                matches.append(name)
+            position += 1
+        return matches
@@ -0,0 +1,69 @@
+import os
+import time
+
+import pandas
+
+# Columns each part of the dashboard reads from ufc-master.csv; nothing else is parsed
+DASHBOARD_COLUMNS = {
+    'leaderboards': ['R_fighter', 'B_fighter', 'Winner', 'date', 'location', 'gender', 'weight_class',
+                     'total_fight_time_secs', 'R_odds', 'B_odds', 'R_current_win_streak', 'B_current_win_streak',
+                     'R_current_lose_streak', 'B_current_lose_streak'],
+    'profile': ['R_fighter', 'B_fighter', 'Winner', 'date', 'weight_class', 'finish'],
+    'ratings': ['R_fighter', 'B_fighter', 'Winner', 'date', 'R_odds', 'B_odds'],
+    'odds': ['R_fighter', 'B_fighter', 'Winner', 'date', 'weight_class', 'R_odds', 'B_odds', 'R_ev', 'B_ev'],
+    'location': ['location', 'country'],
+}
+
+# Repeated strings are stored once per distinct value
+CATEGORICAL = ['R_fighter', 'B_fighter', 'Winner', 'location', 'country', 'gender', 'weight_class', 'finish']
+
+
+def dashboard_columns(parts=None):
+    columns = []
+    for part in parts or DASHBOARD_COLUMNS:
+        columns += [column for column in DASHBOARD_COLUMNS[part] if column not in columns]
+    return columns
+
+
+# Loads only the declared columns with categorical strings and the smallest numeric types that hold the values
+def load_fights(path="ufc-master.csv", parts=None):
+    columns = dashboard_columns(parts)
+    df = pandas.read_csv(path, usecols=columns, dtype={column: 'category' for column in CATEGORICAL
+                                                       if column in columns})
+
+    # Red and blue corners share one set of fighter names so they compare and combine without conversion
+    if 'R_fighter' in df and 'B_fighter' in df:
+        names = df['R_fighter'].cat.categories.union(df['B_fighter'].cat.categories)
+        df['R_fighter'] = df['R_fighter'].cat.set_categories(names)
+        df['B_fighter'] = df['B_fighter'].cat.set_categories(names)
+
+    for column in df.select_dtypes('integer').columns:
+        df[column] = pandas.to_numeric(df[column], downcast='integer')
+    for column in df.select_dtypes('float').columns:
+        df[column] = pandas.to_numeric(df[column], downcast='float')
+
+    df['date'] = pandas.to_datetime(df['date'], format='%m/%d/%Y')
+    return df[columns]
+
+
+# Parse time and memory of the full csv against the projected, compact load
+def footprint_report(path="ufc-master.csv"):
+    start = time.perf_counter()
+    full = pandas.read_csv(path)
+    full_seconds = time.perf_counter() - start
+    full_bytes = full.memory_usage(deep=True).sum()
+
+    start = time.perf_counter()
+    compact = load_fights(path)
+    compact_seconds = time.perf_counter() - start
+    compact_bytes = compact.memory_usage(deep=True).sum()
+
+    return pandas.DataFrame({
+        'columns': [full.shape[1], compact.shape[1]],
+        'memory (MB)': [full_bytes / 2 ** 20, compact_bytes / 2 ** 20],
+        'parse (ms)': [full_seconds * 1000, compact_seconds * 1000],
+    }, index=['full csv', 'dashboard columns']).round(2)
+
+
+if __name__ == '__main__':
+    print(footprint_report(os.path.join(os.path.dirname(__file__), "ufc-master.csv")))
@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+
+import numpy
+import pandas
+
+from ratings import implied_probability
+
+
+# Wins and losses of the favored fighter in one corner, labelled from the actual winner rather than by position
+def favorite_results(df, corner):
+    odds = df['R_odds'] if corner == 'Red' else df['B_odds']
+    favored = df.loc[odds < 0]
+    results = pandas.Series(numpy.where(favored['Winner'] == corner, 'Won', 'Lost'))
+    return results.value_counts().reindex(['Lost', 'Won'], fill_value=0).rename_axis('Winner')\
+        .rename('location').reset_index()
+
+
+# Odds arrays prepared once at load; every breakdown is a digitize/bincount over them for a row mask.
+# Results are cached per filter combination on the instance, so switching between filters already seen costs nothing.
+class OddsAnalytics:
+    def __init__(self, df, bins=10, maxsize=256):
+        self.bins = bins
+        self.maxsize = maxsize
+        self.summaries = OrderedDict()
+        self.lock = threading.Lock()
+        self.edges = numpy.linspace(0, 1, bins + 1)
+        self.red_probability = implied_probability(df['R_odds'], df['B_odds'])
+        self.red_won = (df['Winner'] == 'Red').to_numpy()
+        self.year = df['date'].dt.year.to_numpy()
+        self.weight_code, self.weight_classes = pandas.factorize(df['weight_class'].astype(object), sort=True)
+        self.red_ev = df['R_ev'].to_numpy(dtype=float)
+        self.blue_ev = df['B_ev'].to_numpy(dtype=float)
+
+        # Fights with a clear favorite; the underdog winning is an upset
+        valid = ~numpy.isnan(self.red_probability)
+        self.has_favorite = valid & (self.red_probability != 0.5)
+        self.red_favored = self.red_probability > 0.5
+        self.upset = self.has_favorite & (self.red_favored != self.red_won)
+
+    def _mask(self, weight_classes, years):
+        mask = ~numpy.isnan(self.red_probability) & (self.weight_code >= 0)
+        if weight_classes:
+            codes = self.weight_classes.get_indexer(list(weight_classes))
+            mask &= numpy.isin(self.weight_code, codes)
+        if years:
+            mask &= (self.year >= years[0]) & (self.year <= years[1])
+        return mask
+
+    # Implied win probability against the actual win rate, counting both corners of every fight
+    def calibration(self, mask):
+        probability = numpy.concatenate([self.red_probability[mask], 1 - self.red_probability[mask]])
+        won = numpy.concatenate([self.red_won[mask], ~self.red_won[mask]]).astype(float)
+        bucket = numpy.clip(numpy.digitize(probability, self.edges) - 1, 0, self.bins - 1)
+        counts = numpy.bincount(bucket, minlength=self.bins)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            curve = pandas.DataFrame({
+                'implied': numpy.bincount(bucket, weights=probability, minlength=self.bins) / counts,
+                'actual': numpy.bincount(bucket, weights=won, minlength=self.bins) / counts,
+                'fights': counts,
+            })
+        return curve.loc[curve['fights'] > 0]
+
+    # Share of fights with a favorite that the underdog won, per group code
+    def _upset_rate(self, mask, codes, labels, name):
+        mask = mask & self.has_favorite
+        counts = numpy.bincount(codes[mask], minlength=len(labels))
+        upsets = numpy.bincount(codes[mask], weights=self.upset[mask], minlength=len(labels))
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            rates = pandas.DataFrame({name: labels, 'upset_rate': upsets / counts, 'fights': counts})
+        return rates.loc[rates['fights'] > 0]
+
+    # Average return of a $100 bet on each side (R_ev/B_ev hold the profit of a winning $100 bet)
+    def expected_value(self, mask):
+        red_return = numpy.where(self.red_won, self.red_ev, -100.0)
+        blue_return = numpy.where(self.red_won, -100.0, self.blue_ev)
+        favorite_return = numpy.where(self.red_favored, red_return, blue_return)
+        underdog_return = numpy.where(self.red_favored, blue_return, red_return)
+        favorite_won = self.red_favored == self.red_won
+
+        clear = mask & self.has_favorite
+        strategies = {
+            'Favorite': (favorite_return[clear], favorite_won[clear]),
+            'Underdog': (underdog_return[clear], ~favorite_won[clear]),
+            'Red corner': (red_return[mask], self.red_won[mask]),
+            'Blue corner': (blue_return[mask], ~self.red_won[mask]),
+        }
+        return pandas.DataFrame([
+            {'strategy': strategy, 'bets': len(returns),
+             'win_rate': won.mean() if len(won) else numpy.nan,
+             'return_per_100': numpy.nanmean(returns) if len(returns) else numpy.nan}
+            for strategy, (returns, won) in strategies.items()
+        ])
+
+    # Every breakdown for one filter combination (weight classes and years as tuples so they can be cached). Callers
+    # get copies of the cached frames, so changing them leaves the cache as it was.
+    def summary(self, weight_classes=(), years=()):
+        key = (weight_classes, years)
+        with self.lock:
+            if key in self.summaries:
+                self.summaries.move_to_end(key)
+                return {name: frame.copy() for name, frame in self.summaries[key].items()}
+
+        mask = self._mask(weight_classes, years)
+        year_codes = self.year - self.year.min()
+        year_labels = numpy.arange(self.year.min(), self.year.max() + 1)
+        summary = {
+            'calibration': self.calibration(mask),
+            'upsets_by_weight_class': self._upset_rate(mask, self.weight_code, self.weight_classes, 'weight_class'),
+            'upsets_by_year': self._upset_rate(mask, year_codes, year_labels, 'year'),
+            'expected_value': self.expected_value(mask),
+        }
+        with self.lock:
+            self.summaries[key] = summary
+            while len(self.summaries) > self.maxsize:
+                self.summaries.popitem(last=False)
+        return {name: frame.copy() for name, frame in summary.items()}
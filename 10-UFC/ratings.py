@@ -0,0 +1,196 @@
+import numpy
+import pandas
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+
+
+# Probability that the first fighter beats the second under the Elo model
+def expected_score(rating, opponent_rating):
+    return 1.0 / (1.0 + 10.0 ** ((opponent_rating - rating) / 400.0))
+
+
+# Win probability implied by American moneyline odds, with the bookmaker margin removed across both corners
+def implied_probability(red_odds, blue_odds):
+    def raw(odds):
+        odds = numpy.asarray(odds, dtype=float)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return numpy.where(odds < 0, -odds / (100.0 - odds), 100.0 / (odds + 100.0))
+
+    red, blue = raw(red_odds), raw(blue_odds)
+    return red / (red + blue)
+
+
+# Elo ratings computed in one streaming pass over chronologically ordered fights.
+# Per-fighter state is a flat rating array indexed by fighter id and every rated fight is recorded in preallocated
+# history arrays, so new events are folded in by continuing the pass instead of replaying the whole history.
+class EloRatings:
+    def __init__(self, k_factor=K_FACTOR, initial=INITIAL_RATING):
+        self.k_factor = k_factor
+        self.initial = initial
+        self.ids = {}
+        self.names = []
+        self.ratings = numpy.empty(0)
+        self.fight_counts = numpy.empty(0, dtype=numpy.int32)
+
+        self.size = 0
+        self.history = {
+            'row': numpy.empty(0, dtype=numpy.int64),
+            'date': numpy.empty(0, dtype='datetime64[ns]'),
+            'red': numpy.empty(0, dtype=numpy.int32),
+            'blue': numpy.empty(0, dtype=numpy.int32),
+            'red_before': numpy.empty(0),
+            'blue_before': numpy.empty(0),
+            'red_after': numpy.empty(0),
+            'blue_after': numpy.empty(0),
+            'red_experience': numpy.empty(0, dtype=numpy.int32),
+            'blue_experience': numpy.empty(0, dtype=numpy.int32),
+        }
+
+    def _fighter_ids(self, names):
+        for name in pandas.unique(names):
+            if name not in self.ids:
+                self.ids[name] = len(self.names)
+                self.names.append(name)
+        if len(self.names) > len(self.ratings):
+            extra = len(self.names) - len(self.ratings)
+            self.ratings = numpy.concatenate([self.ratings, numpy.full(extra, self.initial)])
+            self.fight_counts = numpy.concatenate([self.fight_counts, numpy.zeros(extra, dtype=numpy.int32)])
+        return pandas.Series(names).map(self.ids).to_numpy(dtype=numpy.int32)
+
+    def _reserve(self, count):
+        capacity = len(self.history['row'])
+        if self.size + count <= capacity:
+            return
+        capacity = max(self.size + count, 2 * capacity)
+        for key, array in self.history.items():
+            grown = numpy.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.history[key] = grown
+
+    # A number per fight packing its date and both fighter ids (for fewer than 2**20 fighters), to tell the fights
+    # already rated from new ones
+    @staticmethod
+    def _fight_keys(dates, red, blue):
+        days = numpy.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]').astype(numpy.int64)
+        return (days << 40) | (red.astype(numpy.int64) << 20) | blue.astype(numpy.int64)
+
+    # Splits chronologically ordered fights into rounds in which no fighter appears twice: all the fights of one date,
+    # or of a date in several rounds when a fighter fought more than once that day. Returns the round boundaries.
+    @staticmethod
+    def _rounds(dates, red, blue):
+        layer = numpy.full(len(dates), -1)
+        remaining = numpy.arange(len(dates))
+        current = 0
+        while len(remaining):
+            fighters = pandas.DataFrame({'date': numpy.repeat(dates[remaining], 2),
+                                         'fighter': numpy.column_stack([red[remaining], blue[remaining]]).ravel()})
+            first = ~fighters.duplicated().to_numpy().reshape(-1, 2).any(axis=1)
+            layer[remaining[first]] = current
+            remaining = remaining[~first]
+            current += 1
+        order = numpy.lexsort((layer, dates))
+        keys = numpy.column_stack([dates[order].astype(numpy.int64), layer[order]])
+        starts = numpy.flatnonzero(numpy.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+        return order, numpy.r_[starts, len(order)]
+
+    # Rates the fights of the frame not rated yet, told apart by date and fighters, so fights of a date already seen
+    # are still rated. New fights are rated after all the earlier ones, in date order among themselves.
+    # Expects the ufc-master columns R_fighter, B_fighter, Winner and a parsed date column.
+    def add_fights(self, fights):
+        if len(fights) == 0:
+            return 0
+        # Fights are rated oldest first; the csv lists newest first, so the order within a day is reversed as well
+        fights = fights.iloc[::-1].sort_values(by='date', kind='stable')
+        red = self._fighter_ids(fights['R_fighter'].to_numpy())
+        blue = self._fighter_ids(fights['B_fighter'].to_numpy())
+        dates = fights['date'].to_numpy(dtype='datetime64[ns]')
+        keys = self._fight_keys(dates, red, blue)
+        rated = self._fight_keys(self.history['date'][:self.size], self.history['red'][:self.size],
+                                 self.history['blue'][:self.size])
+        # Rated fights point at their row in the latest frame, which moves when the csv gets new rows on top
+        order = numpy.argsort(keys, kind='stable')
+        found = numpy.searchsorted(keys[order], rated).clip(max=len(keys) - 1)
+        kept = keys[order][found] == rated
+        self.history['row'][:self.size][kept] = fights.index.to_numpy()[order[found[kept]]]
+        new = ~numpy.isin(keys, rated)
+        if not new.any():
+            return 0
+        fights, red, blue, dates = fights.loc[new], red[new], blue[new], dates[new]
+        red_won = (fights['Winner'] == 'Red').to_numpy()
+        order, bounds = self._rounds(dates, red, blue)
+        fights, red, blue, dates, red_won = fights.iloc[order], red[order], blue[order], dates[order], red_won[order]
+        self._reserve(len(fights))
+
+        # Fights of one round share no fighter, so each round is rated at once on the rating arrays
+        start = self.size
+        end = start + len(fights)
+        history = {key: array[start:end] for key, array in self.history.items()}
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            r, b = red[first:last], blue[first:last]
+            red_rating, blue_rating = self.ratings[r], self.ratings[b]
+            change = self.k_factor * (red_won[first:last] - expected_score(red_rating, blue_rating))
+            self.ratings[r] = red_rating + change
+            self.ratings[b] = blue_rating - change
+            history['red_before'][first:last], history['blue_before'][first:last] = red_rating, blue_rating
+            history['red_after'][first:last] = red_rating + change
+            history['blue_after'][first:last] = blue_rating - change
+            history['red_experience'][first:last] = self.fight_counts[r]
+            history['blue_experience'][first:last] = self.fight_counts[b]
+            self.fight_counts[r] += 1
+            self.fight_counts[b] += 1
+
+        history['row'][:] = fights.index.to_numpy()
+        history['date'][:] = dates
+        history['red'][:] = red
+        history['blue'][:] = blue
+        self.size = end
+        return len(fights)
+
+    # Rated fights as a frame, oldest first
+    def fights(self):
+        return pandas.DataFrame({key: array[:self.size] for key, array in self.history.items()})
+
+    # Current ratings of fighters with at least the given number of rated fights
+    def table(self, min_fights=1):
+        table = pandas.DataFrame({'rating': self.ratings, 'fights': self.fight_counts},
+                                 index=pandas.Index(self.names, name='name'))
+        return table.loc[table['fights'] >= min_fights]
+
+    # Rating after each fight of one fighter
+    def trajectory(self, name):
+        if name not in self.ids:
+            return pandas.DataFrame({'date': [], 'rating': []})
+        fighter_id = self.ids[name]
+        history = {key: array[:self.size] for key, array in self.history.items()}
+        as_red = history['red'] == fighter_id
+        mask = as_red | (history['blue'] == fighter_id)
+        return pandas.DataFrame({'date': history['date'][mask],
+                                 'rating': numpy.where(as_red, history['red_after'], history['blue_after'])[mask]})
+
+
+# Red corner win rate against the win probability forecast by the ratings and by the betting odds, in equal-width
+# probability bins. Only fights where both fighters already had rated fights are counted.
+def calibration(ratings, df, bins=10):
+    history = ratings.fights()
+    history = history.loc[(history['red_experience'] > 0) & (history['blue_experience'] > 0)]
+    fights = df.loc[history['row']]
+
+    red_won = (fights['Winner'] == 'Red').to_numpy(dtype=float)
+    forecasts = {
+        'Elo': expected_score(history['red_before'].to_numpy(), history['blue_before'].to_numpy()),
+        'Odds': implied_probability(fights['R_odds'], fights['B_odds']),
+    }
+    edges = numpy.linspace(0, 1, bins + 1)
+    rows = []
+    for source, forecast in forecasts.items():
+        valid = ~numpy.isnan(forecast)
+        bucket = numpy.clip(numpy.digitize(forecast[valid], edges) - 1, 0, bins - 1)
+        counts = numpy.bincount(bucket, minlength=bins)
+        wins = numpy.bincount(bucket, weights=red_won[valid], minlength=bins)
+        predicted = numpy.bincount(bucket, weights=forecast[valid], minlength=bins)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            rows.append(pandas.DataFrame({'source': source, 'predicted': predicted / counts,
+                                          'actual': wins / counts, 'fights': counts}))
+    calibrated = pandas.concat(rows, ignore_index=True)
+    return calibrated.loc[calibrated['fights'] > 0]
@@ -0,0 +1,57 @@
+import numpy
+import pandas
+
+
+# Winner and loser names picked column-wise from the corner that won
+def add_outcomes(df):
+    red_won = (df['Winner'] == 'Red').to_numpy()
+    df['Winner_Name'] = numpy.where(red_won, df['R_fighter'], df['B_fighter'])
+    df['Loser_Name'] = numpy.where(red_won, df['B_fighter'], df['R_fighter'])
+    return df
+
+
+# One row per fighter per fight, built by stacking the red and blue corners once
+def long_corners(df):
+    fights = len(df)
+    red_won = (df['Winner'] == 'Red').to_numpy()
+
+    def stacked(red, blue):
+        return numpy.concatenate([df[red].to_numpy(), df[blue].to_numpy()])
+
+    # Fighter names are factorized once so every later grouping works on integer codes
+    fighter_codes, fighters = pandas.factorize(stacked('R_fighter', 'B_fighter'))
+    opponent_codes = numpy.concatenate([fighter_codes[fights:], fighter_codes[:fights]])
+
+    return pandas.DataFrame({
+        'fight': numpy.tile(numpy.arange(fights), 2),
+        'fighter_id': fighter_codes,
+        'corner': numpy.repeat(['Red', 'Blue'], fights),
+        'fighter': pandas.Categorical.from_codes(fighter_codes, fighters),
+        'opponent': pandas.Categorical.from_codes(opponent_codes, fighters),
+        'won': numpy.concatenate([red_won, ~red_won]),
+        'gender': numpy.tile(df['gender'].to_numpy(), 2),
+        'win_streak': stacked('R_current_win_streak', 'B_current_win_streak'),
+        'lose_streak': stacked('R_current_lose_streak', 'B_current_lose_streak'),
+    })
+
+
+# Wins, losses, win rate and the highest win and lose streaks per fighter, reduced over the integer fighter ids
+def fighter_records(long):
+    ids = long['fighter_id'].to_numpy()
+    names = long['fighter'].cat.categories
+    fights = numpy.bincount(ids, minlength=len(names))
+    wins = numpy.bincount(ids, weights=long['won'].to_numpy(), minlength=len(names)).astype(int)
+
+    # Ids are numbered by first appearance, so first occurrences come out in id order
+    first_rows = pandas.Series(ids).drop_duplicates().index.to_numpy()
+
+    records = pandas.DataFrame({
+        'gender': long['gender'].to_numpy()[first_rows],
+        'Wins': wins,
+        'Losses': fights - wins,
+        'Fights': fights,
+        'max_win_streak': long['win_streak'].groupby(ids).max().to_numpy(),
+        'max_lose_streak': long['lose_streak'].groupby(ids).max().to_numpy(),
+    }, index=pandas.Index(names, name='name'))
+    records['Win_Average'] = (records['Wins'] / records['Fights']).round(2)
+    return records
@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas
+from plotly.utils import PlotlyJSONEncoder
+
+from benchmarks import fixtures, providers
+from common import renderer
+from common.dashboards import ROOT, LazyDashboard, discover
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.json')
+# Timings only compare on the machine that made them, so the baseline is kept locally (not committed): record one
+# with --save-baseline before changing anything, then --check against it
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+KEY = ['dashboard', 'data', 'output', 'scale']
+POLL_SECONDS = 0.005
+
+
+# Initial value of every property set on a component with an id, keyed 'component.property'
+def layout_values(layout):
+    values = {}
+
+    def walk(node):
+        if isinstance(node, (list, tuple)):
+            for child in node:
+                walk(child)
+        elif hasattr(node, 'to_plotly_json'):
+            props = node.to_plotly_json()['props']
+            if 'id' in props:
+                values.update({f"{props['id']}.{name}": value for name, value in props.items() if name != 'id'})
+            walk(props.get('children'))
+
+    walk(layout)
+    return values
+
+
+# The /_dash-update-component request the browser would send for a callback, with the given input values. The
+# changed input is the first one with a representative value, or the first input.
+def request_body(callback, values, representative):
+    changed = [f"{item['id']}.{item['property']}" for item in callback['inputs']]
+    return renderer.request_body(callback, values, [next((key for key in changed if key in representative),
+                                                         changed[0])])
+
+
+# The response to a callback request. A background callback answers with its job, then with its result to one of
+# the polls that follow.
+def call_callback(client, payload):
+    response = client.post('/_dash-update-component', data=payload, content_type='application/json')
+    if response.status_code == 200 and 'cacheKey' in response.get_json():
+        query = renderer.job_query(response.get_json())
+        while response.status_code == 200 and 'response' not in response.get_json():
+            time.sleep(POLL_SECONDS)
+            response = client.post('/_dash-update-component' + query, data=payload, content_type='application/json')
+    return response
+
+
+# Wall time of repeat calls (the first separately, as it fills the apps' own memoization), the peak memory traced
+# during one more call and the size of the serialized response
+def measure(client, body, repeat):
+    payload = json.dumps(body, cls=PlotlyJSONEncoder)
+
+    def call():
+        return call_callback(client, payload)
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = call()
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'status': response.status_code, 'first (ms)': round(seconds[0] * 1000, 2),
+            'median (ms)': round(statistics.median(seconds[1:] or seconds) * 1000, 2),
+            'peak allocated (KB)': round(peak / 1024, 1), 'response (KB)': round(len(response.data) / 1024, 1)}
+
+
+# Loads one dashboard against its scaled fixture and local providers and measures every registered callback
+def run_dashboard(slug, scale, repeat, generated=False):
+    providers.install()
+    with tempfile.TemporaryDirectory() as destination:
+        dashboard = LazyDashboard(fixtures.scaled_copy(discover()[slug].folder, scale, destination, generated))
+        try:
+            module = dashboard.load()
+        except Exception:
+            return [{'dashboard': slug, 'scale': scale, 'status': 'failed to load',
+                     'error': dashboard.error.strip().splitlines()[-1]}]
+
+        app = module.app
+        layout = app.layout() if callable(app.layout) else app.layout
+        representative = fixtures.inputs(slug, module)
+        values = dict(layout_values(layout), **representative)
+        client = app.server.test_client()
+        rows = []
+        for callback in app._callback_list:
+            body = request_body(callback, values, representative)
+            first_output = body['outputs'][0] if isinstance(body['outputs'], list) else body['outputs']
+            row = {'dashboard': slug, 'scale': scale, 'callback': app.callback_map[callback['output']]['callback'].__name__,
+                   'output': f"{first_output['id']}.{first_output['property']}",
+                   'load (ms)': round(dashboard.load_seconds * 1000, 1)}
+            rows.append(dict(row, **measure(client, body, repeat)))
+        return rows
+
+
+# Each dashboard and scale in a fresh interpreter, so memory and module state never carry over between runs
+def run_all(slugs, scales, repeat, generated=False):
+    environment = dict(os.environ, DATASET_CACHE='off', FIGURE_CACHE='off', PYTHONPATH=ROOT)
+    rows = []
+    for slug in slugs:
+        for scale in fixtures.scales(slug, scales):
+            command = [sys.executable, '-m', 'benchmarks.callbacks', '--one', slug, str(scale), '--repeat', str(repeat)]
+            result = subprocess.run(command + ['--synthetic'] * generated, cwd=ROOT, env=environment,
+                                    capture_output=True, text=True)
+            try:
+                runs = json.loads(result.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                error = result.stderr.strip().splitlines()
+                runs = [{'dashboard': slug, 'scale': scale, 'status': 'failed',
+                         'error': error[-1] if error else f'exit code {result.returncode}'}]
+            rows.extend(dict(run, data='synthetic' if generated else 'replicated') for run in runs)
+            print(f'{slug} {scale}x done', file=sys.stderr)
+    return rows
+
+
+# Median times against the baseline runs of the same callback and scale; ratios above threshold are regressions
+def compare(results, baseline, threshold):
+    table = pandas.DataFrame(results)
+    if not baseline:
+        return table.assign(**{'baseline (ms)': None, 'ratio': None, 'regression': False})
+    base = pandas.DataFrame(baseline['results']).reindex(columns=KEY + ['median (ms)'])
+    if 'median (ms)' not in table:
+        return table.assign(**{'baseline (ms)': None, 'ratio': None, 'regression': False})
+    base = base.dropna(subset=['output', 'median (ms)']).rename(columns={'median (ms)': 'baseline (ms)'})
+    table = table.merge(base, on=KEY, how='left')
+    table['ratio'] = (table['median (ms)'] / table['baseline (ms)']).round(2)
+    table['regression'] = table['ratio'] > threshold
+    return table
+
+
+def read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_json(path, results, **extra):
+    document = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                'machine': platform.machine(), **extra, 'results': results}
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=1, default=str)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Callback latency, allocations and response size of every dashboard '
+                                                 'at several data scales')
+    parser.add_argument('dashboards', nargs='*', help='folder names in lower case, e.g. 10-ufc (default: all)')
+    parser.add_argument('--scales', type=int, nargs='*', default=fixtures.SCALES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=RESULTS)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=1.5, help='slowdown ratio reported as a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 when a callback regressed')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='generate the data files from their profiles instead of replicating them')
+    parser.add_argument('--one', nargs=2, metavar=('DASHBOARD', 'SCALE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_dashboard(args.one[0], int(args.one[1]), args.repeat, args.synthetic), default=str))
+        sys.exit()
+
+    if args.check and not args.save_baseline and read_json(args.baseline) is None:
+        parser.error(f'--check needs a baseline recorded on this machine; run with --save-baseline first '
+                     f'(no {args.baseline})')
+
+    results = run_all(args.dashboards or list(discover()), args.scales, args.repeat, args.synthetic)
+    comparison = compare(results, read_json(args.baseline), args.threshold)
+    write_json(args.output, comparison.astype(object).where(comparison.notna(), None).to_dict('records'),
+               repeat=args.repeat, threshold=args.threshold)
+    if args.save_baseline:
+        # Runs of other dashboards and data modes stay in the baseline
+        runs = {(row['dashboard'], row['data']) for row in results}
+        kept = [row for row in (read_json(args.baseline) or {'results': []})['results']
+                if (row['dashboard'], row.get('data', 'replicated')) not in runs]
+        write_json(args.baseline, kept + results, repeat=args.repeat)
+
+    columns = [column for column in ['callback', 'load (ms)', 'first (ms)', 'median (ms)', 'baseline (ms)', 'ratio',
+                                     'peak allocated (KB)', 'response (KB)', 'status', 'error'] if column in comparison]
+    print(comparison.set_index(['dashboard', 'output', 'scale'])[columns].to_string())
+    if args.check and comparison['regression'].fillna(False).any():
+        sys.exit(1)
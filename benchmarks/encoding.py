@@ -0,0 +1,170 @@
+import argparse
+import base64
+import gzip
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy
+import pandas
+from plotly.io.json import to_json_plotly
+from plotly.utils import PlotlyJSONEncoder
+
+import dash._callback
+from benchmarks import fixtures, providers
+from benchmarks.callbacks import call_callback, layout_values, request_body
+from common import encoding
+from common.dashboards import ROOT, LazyDashboard, discover
+
+RELATIVE_TOLERANCE = 1e-6
+ABSOLUTE_TOLERANCE = 1e-6
+
+
+# The response as plotly.js receives it: typed arrays decoded and template references replaced, which is what the
+# script of common.encoding does in the browser
+def expand(node, templates):
+    if isinstance(node, list):
+        return [expand(value, templates) for value in node]
+    if isinstance(node, dict):
+        if isinstance(node.get('bdata'), str) and node.get('dtype') in encoding.TYPED_ARRAY_NAMES:
+            return numpy.frombuffer(base64.b64decode(node['bdata']), dtype='<' + node['dtype']).tolist()
+        return {key: templates[value[len(encoding.TEMPLATE_PREFIX):]]
+                if key == 'template' and isinstance(value, str) and value.startswith(encoding.TEMPLATE_PREFIX)
+                else expand(value, templates) for key, value in node.items()}
+    return node
+
+
+def same_date(left, right):
+    try:
+        return pandas.Timestamp(left) == pandas.Timestamp(right)
+    except (TypeError, ValueError):
+        return False
+
+
+# First path where two decoded responses differ, or None; floats compare within the tolerance of the trimmed
+# decimals and dates by value ('2020-01-01' and '2020-01-01T00:00:00' are the same date to plotly.js)
+def difference(left, right, path='$'):
+    if isinstance(left, dict) and isinstance(right, dict):
+        if left.keys() != right.keys():
+            return f'{path}: keys {sorted(set(left) ^ set(right))}'
+        return next((found for key in left if (found := difference(left[key], right[key], f'{path}.{key}'))), None)
+    if isinstance(left, list) and isinstance(right, list):
+        if len(left) != len(right):
+            return f'{path}: length {len(left)} != {len(right)}'
+        return next((found for i, (a, b) in enumerate(zip(left, right))
+                     if (found := difference(a, b, f'{path}[{i}]'))), None)
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)) \
+            and not isinstance(left, bool) and not isinstance(right, bool):
+        if math.isclose(left, right, rel_tol=RELATIVE_TOLERANCE, abs_tol=ABSOLUTE_TOLERANCE):
+            return None
+    elif left == right or (isinstance(left, str) and isinstance(right, str) and same_date(left, right)):
+        return None
+    return f'{path}: {str(left)[:40]} != {str(right)[:40]}'
+
+
+# The last value Dash serialized, so both encoders can be timed on the very same response
+responses = []
+
+
+def captured_to_json(value):
+    responses[:] = [value]
+    return encoding.callback_to_json(value)
+
+
+def timed(encoder, value, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = encoder(value)
+        seconds.append(time.perf_counter() - start)
+    return text.encode(), statistics.median(seconds)
+
+
+# The response of every callback of one dashboard encoded both ways: sizes raw and gzipped, serialization time,
+# and whether the compact response decodes to the same figures
+def run_dashboard(slug, scale, repeat):
+    providers.install()
+    with tempfile.TemporaryDirectory() as destination:
+        dashboard = LazyDashboard(fixtures.scaled_copy(discover()[slug].folder, scale, destination))
+        try:
+            module = dashboard.load()
+        except Exception:
+            return [{'dashboard': slug, 'scale': scale, 'status': 'failed to load',
+                     'error': dashboard.error.strip().splitlines()[-1]}]
+
+        dash._callback.to_json = captured_to_json
+        app = module.app
+        templates = json.loads(encoding.to_json(encoding.templates))
+        layout = app.layout() if callable(app.layout) else app.layout
+        representative = fixtures.inputs(slug, module)
+        values = dict(layout_values(layout), **representative)
+        client = app.server.test_client()
+        rows = []
+        for callback in app._callback_list:
+            body = request_body(callback, values, representative)
+            payload = json.dumps(body, cls=PlotlyJSONEncoder)
+            first_output = body['outputs'][0] if isinstance(body['outputs'], list) else body['outputs']
+            row = {'dashboard': slug, 'scale': scale, 'output': f"{first_output['id']}.{first_output['property']}"}
+            responses.clear()
+            # Background callbacks are followed to their result, the last response serialized
+            response = call_callback(client, payload)
+            if response.status_code != 200 or not responses:
+                rows.append(dict(row, status=response.status_code))
+                continue
+            before, plotly_seconds = timed(to_json_plotly, responses[0], repeat)
+            after, compact_seconds = timed(encoding.to_json, responses[0], repeat)
+            rows.append(dict(row, **{
+                'plotly (KB)': round(len(before) / 1024, 1), 'compact (KB)': round(len(after) / 1024, 1),
+                'plotly gzip (KB)': round(len(gzip.compress(before, 6)) / 1024, 1),
+                'compact gzip (KB)': round(len(gzip.compress(after, 6)) / 1024, 1),
+                'plotly (ms)': round(plotly_seconds * 1000, 2), 'compact (ms)': round(compact_seconds * 1000, 2),
+                'difference': difference(json.loads(before), expand(json.loads(after), templates)),
+                'status': 200}))
+        return rows
+
+
+def run_all(slugs, scales, repeat):
+    environment = dict(os.environ, DATASET_CACHE='off', FIGURE_CACHE='off', FIGURE_ENCODING='compact',
+                       PYTHONPATH=ROOT)
+    rows = []
+    for slug in slugs:
+        for scale in fixtures.scales(slug, scales):
+            command = [sys.executable, '-m', 'benchmarks.encoding', '--one', slug, str(scale), '--repeat', str(repeat)]
+            result = subprocess.run(command, cwd=ROOT, env=environment, capture_output=True, text=True)
+            try:
+                rows.extend(json.loads(result.stdout.strip().splitlines()[-1]))
+            except (IndexError, ValueError):
+                error = result.stderr.strip().splitlines()
+                rows.append({'dashboard': slug, 'scale': scale, 'status': 'failed',
+                             'error': error[-1] if error else f'exit code {result.returncode}'})
+            print(f'{slug} {scale}x done', file=sys.stderr)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Callback responses of every dashboard serialized by plotly's encoder "
+                                                 "and by common.encoding: size, gzipped size, time and equivalence")
+    parser.add_argument('dashboards', nargs='*', help='folder names in lower case, e.g. 10-ufc (default: all)')
+    parser.add_argument('--scales', type=int, nargs='*', default=[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='also write the rows to this json file')
+    parser.add_argument('--one', nargs=2, metavar=('DASHBOARD', 'SCALE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_dashboard(args.one[0], int(args.one[1]), args.repeat), default=str))
+        sys.exit()
+
+    table = pandas.DataFrame(run_all(args.dashboards or list(discover()), args.scales, args.repeat))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(table.astype(object).where(table.notna(), None).to_dict('records'), file, indent=1)
+    with pandas.option_context('display.width', 250, 'display.max_colwidth', 60):
+        print(table.set_index(['dashboard', 'output', 'scale']).to_string())
+    if 'difference' in table and table['difference'].notna().any():
+        sys.exit(1)
@@ -0,0 +1,86 @@
+import os
+import shutil
+
+import pandas
+
+from benchmarks import synthetic
+
+SCALES = [1, 10, 100]
+
+# Data files of each dashboard and how a copy of them is made distinct when the file is replicated: values of the
+# unique columns get a copy number appended (more fighters, titles, teams ... rather than the same ones repeated)
+# and renumbered columns are shifted past the original ids. Dashboards without files run at 1x only; files missing
+# from the tree (06-UFOs) are generated from their built-in profile.
+DATASETS = {
+    '01-stocktracker': [('fortune_500.csv', {'unique': ['Title', 'Ticker'], 'renumber': ['Rank']})],
+    '02-weather': [],
+    '03-beecolonies': [('intro_bees.csv', {})],
+    '04-pokemon': [('pokemon.csv', {'unique': ['Name']})],
+    '05-superbowls': [('superbowl_data.csv', {'unique': ['SB', 'Winner', 'Loser', 'MVP']})],
+    '06-ufos': [('ufo_data.csv', {})],
+    '07-starwars': [(os.path.join('star_wars_data', name + '.csv'), {'unique': ['name']})
+                    for name in ['characters', 'planets', 'starships', 'vehicles']],
+    '08-videogames': [('vgsales.csv', {'unique': ['Name'], 'renumber': ['Rank']})],
+    '09-policeshootings': [('police_shootings_data.csv', {'unique': ['name'], 'renumber': ['id']})],
+    '10-ufc': [('ufc-master.csv', {'unique': ['R_fighter', 'B_fighter']})],
+}
+
+# Representative callback inputs besides the layout's initial values, keyed 'component.property'; callables get the
+# loaded app module. Inputs listed here are the ones reported as changed when a callback is invoked.
+INPUTS = {
+    '01-stocktracker': {'my_dropdown.value': lambda app: list(app.companies['Ticker'][:5]),
+                        'sector_drop.value': 'Technology'},
+    '08-videogames': {'drill_graph.clickData': {'points': [{'x': 'Action'}]},
+                      'drill_path.data': [['Genre', 'Action']]},
+    '09-policeshootings': {'us_map.clickData': {'points': [{'location': 'CA'}]},
+                           'filters.data': {'state': ['CA']}},
+    '10-ufc': {'fighter_search.search_value': 'Jo', 'rating_fighters.search_value': 'Jo',
+               'opponent_select.value': 'Robert Whittaker'},
+}
+
+
+def scales(slug, requested=SCALES):
+    return list(requested) if DATASETS.get(slug) else [1]
+
+
+def inputs(slug, module):
+    return {key: value(module) if callable(value) else value for key, value in INPUTS.get(slug, {}).items()}
+
+
+# Copy number `copy` of a data file read as text
+def distinct_copy(frame, copy, unique=(), renumber=()):
+    frame = frame.copy()
+    for column in unique:
+        frame[column] = frame[column].where(frame[column] == '', frame[column] + f' {copy + 1}')
+    for column in renumber:
+        numbers = pandas.to_numeric(frame[column])
+        frame[column] = (numbers + copy * (numbers.max() + 1)).astype(str)
+    return frame
+
+
+# The data file replicated scale times, written one copy at a time so a 100x file never sits in memory
+def write_scaled(source, target, scale, unique=(), renumber=()):
+    if scale == 1:
+        shutil.copyfile(source, target)
+        return
+    frame = pandas.read_csv(source, dtype=str, keep_default_na=False)
+    for copy in range(scale):
+        part = frame if copy == 0 else distinct_copy(frame, copy, unique, renumber)
+        part.to_csv(target, index=False, header=copy == 0, mode='w' if copy == 0 else 'a')
+
+
+# A copy of the dashboard folder in destination with its data files at the given scale, either replicated or
+# generated from the files' profiles
+def scaled_copy(folder, scale, destination, generated=False):
+    name = os.path.basename(folder)
+    target = os.path.join(destination, name)
+    shutil.copytree(folder, target, ignore=shutil.ignore_patterns('__pycache__', '.dataset-cache', '*.csv'))
+    for path, options in DATASETS.get(name.lower(), []):
+        source = os.path.join(folder, path)
+        os.makedirs(os.path.dirname(os.path.join(target, path)), exist_ok=True)
+        if generated or not os.path.exists(source):
+            profile = synthetic.profile_for(source, os.path.join(name, path))
+            synthetic.generate(profile, os.path.join(target, path), profile['rows'] * scale, processes=1)
+        else:
+            write_scaled(source, os.path.join(target, path), scale, **options)
+    return target
@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+import pandas
+
+from benchmarks import fixtures
+from common import renderer
+from common.dashboards import ROOT, discover
+
+STEPS = 10
+THINK_SECONDS = 1.0
+TIMEOUT_SECONDS = 30
+
+
+# One keep-alive HTTP/1.1 connection of a virtual browser tab. Servers that close connections (gunicorn's sync
+# workers do after every response) get a new one for the next request.
+class Connection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        for attempt in range(2):
+            reused = self.writer is not None
+            if not reused:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                return await self.exchange(method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if not reused or attempt:
+                    raise
+
+    async def exchange(self, method, path, body):
+        headers = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'Accept-Encoding: gzip',
+                   'Connection: keep-alive']
+        if body is not None:
+            headers += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + (body or b''))
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b'\r\n')
+        version, status = status_line.split(b' ', 2)[:2]
+        status = int(status)
+        fields = {}
+        while (line := await self.reader.readuntil(b'\r\n')) != b'\r\n':
+            name, _, value = line.decode('latin-1').partition(':')
+            fields[name.strip().lower()] = value.strip()
+        # 1xx, 204 and 304 responses have no body whatever their headers say (Werkzeug sends a 204 without
+        # Content-Length), so reading to the end of the stream would wait for the server to close the connection
+        if status < 200 or status in (204, 304):
+            content = b''
+        elif 'content-length' in fields:
+            content = await self.reader.readexactly(int(fields['content-length']))
+        elif fields.get('transfer-encoding', '').lower() == 'chunked':
+            content = b''
+            while size := int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16):
+                content += (await self.reader.readexactly(size + 2))[:-2]
+            await self.reader.readuntil(b'\r\n')
+        else:
+            content = await self.reader.read()
+        if fields.get('connection', '').lower() == 'close' or version == b'HTTP/1.0':
+            self.close()
+        if content and fields.get('content-encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return status, content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+# Latency and outcome of every request, by what it was for (page, layout, dependencies or a callback's first output)
+class Recorder:
+    def __init__(self):
+        self.rows = []
+        self.sessions = self.failed_sessions = 0
+
+    async def timed(self, name, connection, method, path, body=None, timeout=TIMEOUT_SECONDS):
+        start = time.perf_counter()
+        try:
+            status, content = await asyncio.wait_for(connection.request(method, path, body), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as error:
+            connection.close()
+            self.rows.append((name, time.perf_counter() - start, type(error).__name__))
+            return None, None
+        self.rows.append((name, time.perf_counter() - start, status))
+        return status, content
+
+    def report(self, seconds):
+        table = pandas.DataFrame(self.rows, columns=['request', 'seconds', 'status'])
+        table['error'] = ~table['status'].isin([200, 204])
+        grouped = table.groupby('request')
+        milliseconds = grouped['seconds']
+        return pandas.DataFrame({
+            'requests': grouped.size(),
+            'errors': grouped['error'].sum(),
+            'error rate': grouped['error'].mean().round(4),
+            'per second': (grouped.size() / seconds).round(1),
+            'p50 (ms)': milliseconds.quantile(0.5).mul(1000).round(1),
+            'p95 (ms)': milliseconds.quantile(0.95).mul(1000).round(1),
+            'p99 (ms)': milliseconds.quantile(0.99).mul(1000).round(1),
+            'max (ms)': milliseconds.max().mul(1000).round(1),
+        }).sort_values('requests', ascending=False)
+
+
+# What a browser tab does with a dashboard: load the page, layout and dependencies, run the initial callbacks and
+# the callbacks their outputs feed, then change inputs the way a visitor does with think time in between: pick
+# dropdown, checklist, radio or tab values, drag sliders (one request per point passed when the slider updates
+# while dragging), let intervals tick, and enter the representative inputs of benchmarks.fixtures.
+class Session:
+    def __init__(self, slug, base, recorder, rng, steps, think):
+        self.slug = slug
+        self.base = base
+        self.recorder = recorder
+        self.rng = rng
+        self.steps = steps
+        self.think = think
+        url = urllib.parse.urlsplit(base)
+        self.connection = Connection(url.hostname, url.port or 80)
+        self.path = url.path.rstrip('/') + '/'
+        self.values = {}
+        self.dependencies = []
+        self.components = []
+
+    async def get_json(self, name, path):
+        status, content = await self.recorder.timed(name, self.connection, 'GET', self.path + path)
+        if status != 200:
+            raise ConnectionError(f'{path} answered {status}')
+        return json.loads(content)
+
+    async def call(self, callback, changed):
+        name = renderer.output_keys(callback)[0]
+        body = json.dumps(renderer.request_body(callback, self.values, changed)).encode()
+        status, content = await self.recorder.timed(name, self.connection, 'POST',
+                                                    self.path + '_dash-update-component', body)
+        # A background callback starts a job, which the renderer polls every interval until it answers the result
+        if status == 200 and 'cacheKey' in json.loads(content):
+            path = self.path + '_dash-update-component' + renderer.job_query(json.loads(content))
+            while status == 200 and 'response' not in json.loads(content):
+                await asyncio.sleep(callback['long']['interval'] / 1000)
+                status, content = await self.recorder.timed(f'{name} (poll)', self.connection, 'POST', path, body)
+        if status != 200:
+            return []
+        updates = renderer.response_values(json.loads(content))
+        self.values.update(updates)
+        return list(updates)
+
+    # Runs the callbacks fed by changed properties, then those fed by their outputs, as the renderer does
+    async def propagate(self, changed):
+        while changed:
+            triggered = [callback for callback in self.dependencies
+                         if any(key in renderer.input_keys(callback) for key in changed)]
+            triggered_by, changed = changed, []
+            for callback in triggered:
+                changed += await self.call(callback, [key for key in renderer.input_keys(callback)
+                                                      if key in triggered_by])
+
+    async def change(self, key, value):
+        self.values[key] = value
+        await self.propagate([key])
+
+    # A component with the props callbacks have set since the layout loaded (the options of a dropdown ...)
+    def current(self, component):
+        prefix = renderer.prop_key(component['props']['id'], '')
+        props = dict(component['props'], **{key[len(prefix):]: value for key, value in self.values.items()
+                                             if key.startswith(prefix) and '.' not in key[len(prefix):]})
+        return dict(component, props=props)
+
+    def actions(self):
+        actions = []
+        for component in map(self.current, self.components):
+            key = renderer.prop_key(component['props']['id'], 'value')
+            if component['type'] == 'Interval' and not component['props'].get('disabled'):
+                actions.append(('tick', component))
+            elif component['type'] in ('Slider', 'RangeSlider') and renderer.input_variants(component, 'value'):
+                actions.append(('drag', component))
+            elif renderer.input_variants(component, 'value') and any(
+                    key in renderer.input_keys(callback) for callback in self.dependencies):
+                actions.append(('choose', component))
+        representative = {key: value for key, value in fixtures.INPUTS.get(self.slug, {}).items()
+                          if not callable(value)}
+        if representative:
+            actions.append(('representative', representative))
+        return actions
+
+    async def act(self, action, target):
+        if action == 'representative':
+            for key, value in target.items():
+                await self.change(key, value)
+            return
+        component_id = target['props']['id']
+        if action == 'tick':
+            key = renderer.prop_key(component_id, 'n_intervals')
+            await self.change(key, (self.values.get(key) or 0) + 1)
+            return
+        key = renderer.prop_key(component_id, 'value')
+        target = self.current(target)
+        variants = renderer.input_variants(target, 'value')
+        if action == 'choose':
+            await self.change(key, self.rng.choice(variants))
+            return
+        # A drag moves through the points between the current value and where the visitor lets go
+        current = variants.index(self.values[key]) if self.values.get(key) in variants else 0
+        end = self.rng.randrange(len(variants))
+        step = 1 if end >= current else -1
+        passed = variants[current + step:end + step:step] if end != current else [variants[end]]
+        if target['props'].get('updatemode') != 'drag':
+            passed = passed[-1:]
+        for value in passed:
+            await self.change(key, value)
+
+    async def run(self):
+        try:
+            await self.recorder.timed('page', self.connection, 'GET', self.path)
+            layout = await self.get_json('layout', '_dash-layout')
+            self.dependencies = await self.get_json('dependencies', '_dash-dependencies')
+            self.values = renderer.layout_values(layout)
+            self.components = [component for component in renderer.components(layout) if 'id' in component['props']]
+            changed = []
+            for callback in self.dependencies:
+                if not callback.get('prevent_initial_call'):
+                    changed += await self.call(callback, [])
+            await self.propagate(changed)
+            actions = self.actions()
+            for _ in range(self.steps if actions else 0):
+                if self.think:
+                    await asyncio.sleep(self.rng.expovariate(1 / self.think))
+                await self.act(*self.rng.choice(actions))
+        except (ConnectionError, OSError, ValueError):
+            self.recorder.failed_sessions += 1
+        finally:
+            self.recorder.sessions += 1
+            self.connection.close()
+
+
+# Starts sessions at an even pace over the ramp-up, never more than concurrency at a time
+async def load(slug, base, sessions, concurrency, ramp, steps, think, seed):
+    recorder = Recorder()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def session(index):
+        await asyncio.sleep(ramp * index / sessions)
+        async with slots:
+            await Session(slug, base, recorder, random.Random(seed * 1_000_003 + index), steps, think).run()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(index) for index in range(sessions)))
+    return recorder, time.perf_counter() - start
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+# gunicorn serving the dashboard on a free local port, copied to a temporary folder with its fixture data at the
+# given scale
+def serve(slug, scale, destination, workers, threads):
+    folder = fixtures.scaled_copy(discover()[slug].folder, scale, destination)
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn.app.wsgiapp', 'benchmarks.wsgi:server', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--threads', str(threads), '--timeout', '300', '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=ROOT, env=dict(os.environ, LOAD_DASHBOARD_FOLDER=folder, PYTHONPATH=ROOT,
+                                                          JOBS_DATABASE=os.path.join(destination, 'jobs.sqlite')))
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {server.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return server, f'http://127.0.0.1:{port}/{slug}/'
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError('gunicorn did not start listening')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Virtual browser sessions against a locally running dashboard: '
+                                                 'throughput, latency percentiles and errors per callback')
+    parser.add_argument('dashboard', help='folder name in lower case, e.g. 06-ufos')
+    parser.add_argument('--url', help='base url of a running dashboard, e.g. http://127.0.0.1:8050/06-ufos/ '
+                                      '(default: serve it here with gunicorn on its benchmark fixture data)')
+    parser.add_argument('--scale', type=int, default=1, help='data scale of the fixture when serving it here')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers when the server is started here')
+    parser.add_argument('--threads', type=int, default=1, help='threads per gunicorn worker')
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100, help='sessions open at the same time')
+    parser.add_argument('--ramp', type=float, default=10, help='seconds over which sessions start')
+    parser.add_argument('--steps', type=int, default=STEPS, help='interactions per session')
+    parser.add_argument('--think', type=float, default=THINK_SECONDS, help='mean seconds between interactions')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the report to this json file')
+    args = parser.parse_args()
+
+    if args.dashboard not in discover():
+        parser.error(f'unknown dashboard {args.dashboard}')
+    with tempfile.TemporaryDirectory() as destination:
+        server, base = (None, args.url) if args.url else \
+            serve(args.dashboard, args.scale, destination, args.workers, args.threads)
+        try:
+            recorder, seconds = asyncio.run(load(args.dashboard, base, args.sessions, args.concurrency, args.ramp,
+                                                 args.steps, args.think, args.seed))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    report = recorder.report(seconds)
+    print(f'{recorder.sessions} sessions ({recorder.failed_sessions} failed) against {base} in {seconds:.1f} s, '
+          f'{len(recorder.rows) / seconds:.1f} requests/s')
+    with pandas.option_context('display.width', 200):
+        print(report.to_string())
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'dashboard': args.dashboard, 'url': base, 'sessions': recorder.sessions,
+                       'failed sessions': recorder.failed_sessions, 'seconds': round(seconds, 2),
+                       'requests': report.reset_index().to_dict('records')}, file, indent=1, default=str)
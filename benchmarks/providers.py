@@ -0,0 +1,55 @@
+import sys
+import types
+import zlib
+
+import numpy
+import pandas
+import requests
+
+# Weatherstack /current response for Boston, the fields 02-Weather reads
+WEATHER = {
+    'request': {'type': 'City', 'query': 'Boston, United States of America', 'language': 'en', 'unit': 'm'},
+    'location': {'name': 'Boston', 'country': 'United States of America', 'region': 'Massachusetts',
+                 'lat': '42.358', 'lon': '-71.060', 'timezone_id': 'America/New_York', 'utc_offset': '-4.0'},
+    'current': {'observation_time': '04:00 PM', 'temperature': 18, 'weather_code': 116,
+                'weather_icons': ['https://assets.weatherstack.com/images/wsymbols01_png_64/wsymbol_0002_sunny_intervals.png'],
+                'weather_descriptions': ['Partly cloudy'], 'wind_speed': 15, 'wind_degree': 250, 'wind_dir': 'WSW',
+                'pressure': 1016, 'precip': 0, 'humidity': 55, 'cloudcover': 25, 'feelslike': 18, 'uv_index': 4,
+                'visibility': 16, 'is_day': 'yes'},
+}
+
+
+# Daily prices in the shape of pandas_datareader's yahoo reader: a random walk per ticker, the same on every call
+def price_history(name, data_source=None, start=None, end=None, **kwargs):
+    index = pandas.bdate_range(start, end, name='Date')
+    random = numpy.random.default_rng(zlib.crc32(str(name).encode()))
+    close = 100 * numpy.exp(numpy.cumsum(random.normal(0, 0.02, len(index))))
+    open_ = close * (1 + random.normal(0, 0.005, len(index)))
+    spread = numpy.abs(random.normal(0, 0.01, len(index))) * close
+    return pandas.DataFrame({'High': numpy.maximum(open_, close) + spread, 'Low': numpy.minimum(open_, close) - spread,
+                             'Open': open_, 'Close': close, 'Volume': random.integers(10 ** 5, 10 ** 7, len(index)),
+                             'Adj Close': close}, index=index)
+
+
+class LocalResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def get(url, *args, **kwargs):
+    if 'weatherstack.com' in url:
+        return LocalResponse(WEATHER)
+    raise requests.ConnectionError(f'No local provider for {url}')
+
+
+# Replaces the network providers of 01-StockTracker and 02-Weather for this process; call before loading them
+def install():
+    datareader = types.ModuleType('pandas_datareader')
+    datareader.DataReader = price_history
+    sys.modules['pandas_datareader'] = datareader
+    requests.get = get
@@ -0,0 +1,268 @@
+import argparse
+import glob
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy
+import pandas
+
+from common.dashboards import ROOT
+
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%m/%d/%Y %H:%M', '%Y-%m-%d %H:%M:%S']
+QUANTILES = 1001
+CATEGORY_LIMIT = 50
+# Cells generated per chunk; a chunk is built, written and dropped before the next, which bounds a process's memory
+CHUNK_CELLS = 2_000_000
+
+US_STATES = ('ca wa fl tx ny il az pa oh mi nc or mo co in va nj ma ga wi tn mn sc ct ky md nv ok nm ia ut ar al ks '
+             'la me id nh ms mt wv hi ak ne vt ri sd wy nd de dc on bc ab').split()
+US_WEIGHTS = [120, 60, 60, 50, 40, 35, 35, 35, 30, 25, 25, 25, 20, 20, 20, 20, 20, 15, 20, 15, 15, 15, 15, 10, 10, 10,
+              10, 10, 10, 10, 10, 8, 8, 8, 8, 7, 6, 6, 5, 5, 5, 4, 4, 5, 3, 3, 2, 2, 2, 2, 1, 10, 8, 4]
+SHAPES = ('light triangle circle fireball other unknown sphere disk oval formation cigar changing flash rectangle '
+          'cylinder diamond chevron egg teardrop cone cross').split() + ['']
+SHAPE_WEIGHTS = [210, 100, 95, 78, 70, 70, 67, 65, 47, 30, 25, 24, 17, 16, 16, 15, 12, 9, 9, 4, 3, 24]
+
+
+def epoch(*dates):
+    return [pandas.Timestamp(date).timestamp() for date in dates]
+
+
+# Profile of the UFO sightings file 06-UFOs reads (NUFORC reports, 1949-2014), which is not checked in. Quantiles
+# are at equally spaced probabilities, like the profiles measured from the shipped files.
+UFO_PROFILE = {'rows': 80332, 'bytes per row': 175, 'columns': [
+    {'name': 'datetime', 'kind': 'date', 'format': '%m/%d/%Y %H:%M', 'missing': 0,
+     'quantiles': epoch('1949-10-10', '1980-01-01', '1993-06-01', '1998-01-01', '2000-06-01', '2002-06-01', '2004-01-01',
+                        '2005-06-01', '2006-09-01', '2007-10-01', '2008-09-01', '2009-06-01', '2010-03-01', '2010-11-01',
+                        '2011-06-01', '2012-01-01', '2012-06-01', '2012-10-01', '2013-03-01', '2013-08-01',
+                        '2014-05-08 23:59')},
+    {'name': 'city', 'kind': 'text', 'unique': False, 'cardinality': 0.25, 'missing': 0,
+     'values': ['seattle', 'phoenix', 'portland', 'las vegas', 'los angeles', 'san diego', 'houston', 'chicago',
+                'tucson', 'miami', 'orlando', 'austin', 'denver', 'sacramento', 'san jose', 'springfield',
+                'columbus', 'albuquerque', 'new york city', 'toronto (canada)', 'london (uk/england)']},
+    {'name': 'state', 'kind': 'category', 'values': US_STATES + [''], 'weights': US_WEIGHTS + [70]},
+    {'name': 'country', 'kind': 'category', 'values': ['us', '', 'ca', 'gb', 'au', 'de'],
+     'weights': [810, 120, 40, 23, 7, 1.3]},
+    {'name': 'shape', 'kind': 'category', 'values': SHAPES, 'weights': SHAPE_WEIGHTS},
+    {'name': 'duration (seconds)', 'kind': 'number', 'integer': False, 'decimals': 1, 'missing': 0,
+     'quantiles': [0.01, 3, 10, 30, 60, 60, 120, 120, 180, 300, 300, 300, 600, 600, 900, 1200, 1800, 2700, 3600, 7200,
+                   604800]},
+    {'name': 'duration (hours/min)', 'kind': 'category',
+     'values': ['5 minutes', '2 minutes', '10 minutes', '1 minute', '3 minutes', '30 seconds', '15 minutes',
+                '1 hour', '20 minutes', 'few seconds', '5 seconds', '30 minutes', '2 hours', 'seconds'],
+     'weights': [55, 38, 38, 30, 28, 24, 24, 16, 15, 12, 10, 10, 5, 5]},
+    {'name': 'comments', 'kind': 'text', 'unique': False, 'cardinality': 0.99, 'missing': 0.0002,
+     'values': ['Bright light moving across the sky', 'Three lights in a triangle formation hovering silently',
+                'Orange fireball moving slowly then disappeared', 'Strange blinking object in the western sky',
+                'Disk shaped craft seen above the trees', 'Several orange lights moving in formation',
+                'Very bright white light stationary for several minutes', 'Large silent craft with red lights']},
+    {'name': 'date posted', 'kind': 'date', 'format': '%m/%d/%Y', 'missing': 0,
+     'quantiles': epoch('1998-03-07', '2002-01-11', '2004-03-17', '2005-05-24', '2006-10-30', '2008-01-21',
+                        '2009-01-10', '2010-11-21', '2012-01-12', '2012-12-20', '2014-05-08')},
+    {'name': 'latitude', 'kind': 'number', 'integer': False, 'decimals': 7, 'missing': 0,
+     'quantiles': [-46.2, 27.9, 29.8, 32.2, 33.4, 33.9, 34.1, 35.0, 36.2, 37.4, 38.6, 39.3, 39.9, 40.7, 41.3, 41.8,
+                   42.3, 43.1, 44.9, 47.6, 72.7]},
+    {'name': 'longitude', 'kind': 'number', 'integer': False, 'decimals': 7, 'missing': 0,
+     'quantiles': [-176.7, -122.4, -121.9, -118.4, -117.9, -117.1, -112.1, -111.9, -104.9, -97.7, -95.4, -90.2,
+                   -88.0, -85.0, -83.0, -81.4, -80.1, -77.0, -74.0, -71.4, 178.4]},
+]}
+
+# Data files that are not in the tree, generated from a written profile instead of a measured one
+BUILT_IN = {os.path.join('06-UFOs', 'ufo_data.csv'): UFO_PROFILE}
+
+
+# Whether every value is a date in this format, checked strictly on a sample first (pandas also accepts partial
+# dates such as a bare year for ISO formats)
+def is_date(values, date_format):
+    try:
+        for value in values.head(100):
+            datetime.strptime(value, date_format)
+    except ValueError:
+        return False
+    return len(values) > 0 and pandas.to_datetime(values, format=date_format, errors='coerce').notna().all()
+
+
+def decimals(values):
+    fractions = values.str.partition('.')[2].str.len()
+    return int(min(fractions.max(), 10)) if len(fractions) else 0
+
+
+# Column names, kinds and value distributions of a csv, read as text so the generated file writes values back in
+# the same spellings. Columns with a few distinct values keep their frequencies; numbers and dates keep their
+# quantiles; mostly distinct text (names, titles) keeps sample values and its ratio of distinct values to rows;
+# ascending unique integers (ids, ranks) keep their start and step.
+def profile(path):
+    frame = pandas.read_csv(path, dtype=str, keep_default_na=False)
+    rows = len(frame)
+    columns = []
+    for name in frame.columns:
+        values = frame[name]
+        present = values[values != '']
+        missing = round(1 - len(present) / rows, 6) if rows else 0
+        distinct = present.nunique()
+        numbers = pandas.to_numeric(present, errors='coerce')
+        column = {'name': name, 'missing': missing}
+
+        date_format = next((f for f in DATE_FORMATS if is_date(present, f)), None)
+        if date_format and distinct > 1:
+            dates = pandas.to_datetime(present, format=date_format)
+            column.update(kind='date', format=date_format,
+                          quantiles=list(numpy.quantile(dates.astype('int64') / 1e9, numpy.linspace(0, 1, QUANTILES))))
+        elif len(present) and numbers.notna().all() and distinct > CATEGORY_LIMIT:
+            integer = not present.str.contains(r'[.eE]').any()
+            if integer and distinct == rows and numbers.is_monotonic_increasing:
+                column.update(kind='sequence', start=int(numbers.iloc[0]),
+                              step=float((numbers.iloc[-1] - numbers.iloc[0]) / max(rows - 1, 1)))
+            else:
+                column.update(kind='number', integer=integer, decimals=0 if integer else decimals(present),
+                              quantiles=list(numpy.quantile(numbers, numpy.linspace(0, 1, QUANTILES))))
+        elif distinct > CATEGORY_LIMIT and distinct > 0.2 * rows:
+            column.update(kind='text', unique=distinct == rows, cardinality=distinct / len(present),
+                          values=list(present.drop_duplicates()))
+        else:
+            counts = values.value_counts()
+            column = {'name': name, 'kind': 'category', 'values': list(counts.index), 'weights': list(counts)}
+        columns.append(column)
+    return {'rows': rows, 'bytes per row': os.path.getsize(path) / max(rows, 1), 'columns': columns}
+
+
+def profile_for(path, relative=None):
+    if os.path.exists(path):
+        return profile(path)
+    if relative in BUILT_IN:
+        return BUILT_IN[relative]
+    raise FileNotFoundError(path)
+
+
+def sample_quantiles(quantiles, random, rows):
+    return numpy.interp(random.random(rows), numpy.linspace(0, 1, len(quantiles)), quantiles)
+
+
+def with_missing(values, fraction, random, blank):
+    if fraction:
+        values = numpy.where(random.random(len(values)) < fraction, blank, values)
+    return values
+
+
+# Rows start .. start + rows of the generated file, as written to csv. Every chunk draws from its own seeded
+# generator, so a file is the same whatever the number of processes.
+def column_values(column, start, rows, total, random):
+    kind = column['kind']
+    if kind == 'category':
+        weights = numpy.asarray(column['weights'], dtype=float)
+        return numpy.asarray(column['values'], dtype=object)[random.choice(len(weights), rows, p=weights / weights.sum())]
+    if kind == 'sequence':
+        return column['start'] + numpy.round(numpy.arange(start, start + rows) * column['step']).astype('int64')
+    if kind == 'number':
+        values = with_missing(sample_quantiles(column['quantiles'], random, rows), column['missing'], random, numpy.nan)
+        if column['integer']:
+            return pandas.Series(numpy.round(values)).astype('Int64').to_numpy()
+        return numpy.round(values, column['decimals'])
+    if kind == 'date':
+        seconds = sample_quantiles(column['quantiles'], random, rows)
+        dates = pandas.to_datetime(seconds.astype('int64'), unit='s').strftime(column['format']).to_numpy(dtype=object)
+        return with_missing(dates, column['missing'], random, '')
+    # text: ids over as many distinct values as the original ratio gives at this size, spelled as an original
+    # value followed by a copy number once the originals run out
+    values = numpy.asarray(column['values'], dtype=object)
+    if column['unique']:
+        ids = numpy.arange(start, start + rows)
+    else:
+        ids = random.integers(0, max(1, round(column['cardinality'] * total)), rows)
+    copies = ids // len(values)
+    text = numpy.where(copies == 0, values[ids % len(values)],
+                       values[ids % len(values)] + ' ' + copies.astype(str).astype(object))
+    return with_missing(text, column['missing'], random, '')
+
+
+chunk_profile = None
+
+
+def set_profile(profile):
+    global chunk_profile
+    chunk_profile = profile
+
+
+def write_chunk(index, start, rows, total, seed, path):
+    random = numpy.random.default_rng([seed, index])
+    frame = pandas.DataFrame({column['name']: column_values(column, start, rows, total, random)
+                              for column in chunk_profile['columns']})
+    frame.to_csv(path, header=False, index=False)
+    return path
+
+
+# Writes rows synthetic rows following the profile to path. Chunks are generated by a pool of processes into part
+# files that are appended to the output in order as they finish, so memory stays at a few chunks per process
+# however large the file.
+def generate(profile, path, rows, processes=None, seed=0, chunk_rows=None):
+    chunk_rows = chunk_rows or max(1000, CHUNK_CELLS // len(profile['columns']))
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    pandas.DataFrame(columns=[column['name'] for column in profile['columns']]).to_csv(path, index=False)
+
+    parts = tempfile.mkdtemp(dir=folder, prefix='.parts-')
+    jobs = [(index, start, min(chunk_rows, rows - start), rows, seed, os.path.join(parts, f'{index}.csv'))
+            for index, start in enumerate(range(0, rows, chunk_rows))]
+    processes = min(processes or os.cpu_count() or 1, max(len(jobs), 1))
+    try:
+        with open(path, 'ab') as output:
+            if processes == 1:
+                set_profile(profile)
+                finished = (write_chunk(*job) for job in jobs)
+                append(finished, output)
+            else:
+                with ProcessPoolExecutor(processes, initializer=set_profile, initargs=(profile,)) as pool:
+                    append(pool.map(write_chunk, *zip(*jobs)), output)
+    finally:
+        shutil.rmtree(parts, ignore_errors=True)
+    return path
+
+
+def append(parts, output):
+    for part in parts:
+        with open(part, 'rb') as chunk:
+            shutil.copyfileobj(chunk, output)
+        os.remove(part)
+
+
+def parse_size(text):
+    match = re.fullmatch(r'([\d.]+)\s*([KMGT]?)B?', text.strip().upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f'Not a size: {text}')
+    return float(match.group(1)) * 1024 ** 'BKMGT'.index(match.group(2) or 'B')
+
+
+# Every csv under the dashboard folders plus the built-in profiles of files that are missing, relative to ROOT
+def data_files(names=()):
+    files = sorted(set(os.path.relpath(path, ROOT) for path in glob.glob(os.path.join(ROOT, '[0-9][0-9]-*', '**', '*.csv'),
+                                                                         recursive=True)) | set(BUILT_IN))
+    names = [name.lower() for name in names]
+    return [path for path in files if not names or any(path.lower().startswith(name) for name in names)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Synthetic copies of the dashboards' data files at any size, "
+                                                 "following the column distributions of the shipped files")
+    parser.add_argument('dashboards', nargs='*', help='folder names or prefixes, e.g. 10-ufc (default: all)')
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--scale', type=float, default=10, help='rows as a multiple of the original file (default 10)')
+    size.add_argument('--rows', type=int, help='rows per file')
+    size.add_argument('--size', type=parse_size, help='approximate size per file, e.g. 500M or 10G')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'synthetic-data'),
+                        help='folder receiving NN-App/<file> copies (default: synthetic-data)')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per cpu)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for relative in data_files(args.dashboards):
+        start = time.perf_counter()
+        shape = profile_for(os.path.join(ROOT, relative), relative)
+        rows = args.rows or round(args.size / shape['bytes per row'] if args.size else shape['rows'] * args.scale)
+        target = generate(shape, os.path.join(args.output, relative), rows, args.processes, args.seed)
+        print(f'{relative}: {rows} rows, {os.path.getsize(target) / 2 ** 20:.1f} MB '
+              f'in {time.perf_counter() - start:.1f} s', file=sys.stderr)
@@ -0,0 +1,14 @@
+import os
+
+from werkzeug.exceptions import NotFound
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+from benchmarks import providers
+from common.dashboards import LazyDashboard
+
+# What the load generator serves with gunicorn: the dashboard copied with its fixture data to LOAD_DASHBOARD_FOLDER,
+# under the same url prefix as on the host, with the local providers in place of yahoo and weatherstack
+providers.install()
+dashboard = LazyDashboard(os.environ['LOAD_DASHBOARD_FOLDER'])
+dashboard.load()
+server = DispatcherMiddleware(NotFound(), {dashboard.prefix: dashboard})
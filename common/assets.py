@@ -0,0 +1,191 @@
+import argparse
+import base64
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import urllib.parse
+import urllib.request
+
+import dash_bootstrap_components as dbc
+import flask
+
+from common.dashboards import ROOT
+
+# The shared assets/ folder, served by every dashboard at <prefix>_assets/ under names carrying a hash of their
+# content and cached by browsers for a year, so a returning visitor requests none of them again. Images up to
+# ASSET_INLINE_BYTES are written into the page as data: URIs instead (0, the default, inlines none).
+FOLDER = os.path.join(ROOT, 'assets')
+ROUTE = '_assets/'
+CACHE_SECONDS = 365 * 24 * 3600
+INLINE_BYTES = int(os.environ.get('ASSET_INLINE_BYTES', '0'))
+# plotly.js builds the names of its topojson files itself (usa_110m.json), so the hash goes on their folder
+PINNED_FOLDERS = ['topojson']
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+# Font services answer with the formats the browser asking supports; a current browser gets woff2
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Safari/537.36'
+
+# Third-party files `python -m common.assets` downloads into assets/, by the path it saves them under. Until the LUX
+# stylesheet is downloaded the dashboards are styled by the bundled SUBSTITUTES, and until the map outlines are
+# plotly.js reads them from its own CDN, as it does by default. ASSET_REMOTE_FALLBACK=1 loads files not downloaded
+# from their remote URLs instead of their substitutes.
+REMOTE = {
+    'bootstrap-lux.min.css': dbc.themes.LUX,
+    'topojson/usa_110m.json': 'https://cdn.plot.ly/usa_110m.json',
+    'topojson/world_110m.json': 'https://cdn.plot.ly/world_110m.json',
+}
+SUBSTITUTES = {'bootstrap-lux.min.css': 'dashboards.css'}
+REMOTE_FALLBACK = os.environ.get('ASSET_REMOTE_FALLBACK', '0') not in ('', '0', 'off')
+
+
+def hashed_name(name, content):
+    stem, extension = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+
+
+def read_folder(folder):
+    contents = {}
+    for path, folders, names in os.walk(folder):
+        folders[:] = sorted(name for name in folders if not name.startswith('.'))
+        for name in sorted(names):
+            if not name.startswith('.'):
+                with open(os.path.join(path, name), 'rb') as file:
+                    contents[os.path.relpath(os.path.join(path, name), folder).replace(os.sep, '/')] = file.read()
+    return contents
+
+
+# The path each file of the folder is served under, and the content served there. Stylesheets refer to the files
+# next to them by their served paths, so their own hash changes with those files.
+def catalog(folder=FOLDER):
+    contents = read_folder(folder)
+    served = {}
+    for pinned in PINNED_FOLDERS:
+        members = [name for name in contents if name.startswith(pinned + '/')]
+        if members:
+            digest = hashlib.sha256(b''.join(name.encode() + contents[name] for name in members)).hexdigest()[:12]
+            served.update({name: f'{pinned}.{digest}/{name[len(pinned) + 1:]}' for name in members})
+
+    def reference(match, stylesheet):
+        directory = posixpath.dirname(stylesheet)
+        path = match.group(2).split('#')[0].split('?')[0]
+        target = posixpath.normpath(posixpath.join(directory, path))
+        # Absolute and data: URLs stay, and so does a stylesheet referring back to one being resolved
+        if urllib.parse.urlsplit(path).scheme or path.startswith('/') or target not in contents \
+                or (target in served and served[target] is None):
+            return match.group(0)
+        return f'url({match.group(1)}{posixpath.relpath(resolve(target), directory or ".")}{match.group(1)})'
+
+    def resolve(name):
+        if name not in served:
+            if name.endswith('.css'):
+                served[name] = None
+                contents[name] = CSS_URL.sub(lambda match: reference(match, name),
+                                             contents[name].decode('utf-8')).encode('utf-8')
+            served[name] = hashed_name(name, contents[name])
+        return served[name]
+
+    for name in contents:
+        resolve(name)
+    return served, {served[name]: contents[name] for name in contents}
+
+
+served, files = catalog()
+
+
+# The URL of a file of assets/ for this app, or its data: URI when it is a small enough image. A third-party file
+# not downloaded yet is served as its substitute, or from its remote URL with ASSET_REMOTE_FALLBACK=1.
+def asset_url(app, name):
+    if name not in served:
+        if REMOTE_FALLBACK and name in REMOTE:
+            return REMOTE[name]
+        if name not in SUBSTITUTES:
+            raise KeyError(f'assets/{name} is missing (python -m common.assets downloads the third-party files)')
+        name = SUBSTITUTES[name]
+    content = files[served[name]]
+    kind = mimetypes.guess_type(name)[0] or ''
+    if kind.startswith('image/') and len(content) <= INLINE_BYTES:
+        return f'data:{kind};base64,{base64.b64encode(content).decode()}'
+    return app.get_relative_path('/' + ROUTE + served[name])
+
+
+def asset_response(name):
+    content = files.get(name)
+    if content is None:
+        flask.abort(404)
+    response = flask.Response(content, mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_SECONDS
+    response.cache_control.immutable = True
+    return response
+
+
+def with_topojson(layout, url):
+    for component in [layout, *layout._traverse()]:
+        if getattr(component, '_type', None) == 'Graph':
+            component.config = dict({'topojsonURL': url}, **(getattr(component, 'config', None) or {}))
+    return layout
+
+
+# Serves assets/ from a Dash app, loads the vendored stylesheets (or their substitutes) instead of their remote URLs
+# and has plotly.js read the vendored maps of the layout's graphs. Call once the layout is set.
+def self_hosted_assets(app):
+    app.server.add_url_rule('/' + ROUTE + '<path:name>', 'shared_assets', asset_response)
+    remote = {url: name for name, url in REMOTE.items()}
+    app.config.external_stylesheets[:] = [asset_url(app, remote[item]) if isinstance(item, str) and item in remote
+                                          else item for item in app.config.external_stylesheets]
+    topojson = sorted(name for name in served if name.startswith('topojson/'))
+    if topojson:
+        url = app.get_relative_path('/' + ROUTE + posixpath.dirname(served[topojson[0]]) + '/')
+        layout = app.layout
+        app.layout = (lambda: with_topojson(layout(), url)) if callable(layout) else with_topojson(layout, url)
+
+
+def download(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read()
+
+
+# A downloaded stylesheet with the files it refers to (fonts, the stylesheets it imports) downloaded next to it, in
+# a folder named after it, and referred to by their relative path
+def localized_css(name, url, content):
+    directory = posixpath.dirname(name)
+
+    def local(match):
+        target = urllib.parse.urljoin(url, match.group(2))
+        if urllib.parse.urlsplit(target).scheme not in ('http', 'https'):
+            return match.group(0)
+        extension = posixpath.splitext(urllib.parse.urlsplit(target).path)[1] or '.css'
+        local_name = f'{posixpath.splitext(name)[0]}-files/{hashlib.sha256(target.encode()).hexdigest()[:12]}'
+        local_name += extension
+        save(local_name, target)
+        return f'url({match.group(1)}{posixpath.relpath(local_name, directory or ".")}{match.group(1)})'
+
+    return CSS_URL.sub(local, content.decode('utf-8')).encode('utf-8')
+
+
+def save(name, url):
+    content = download(url)
+    if name.endswith('.css'):
+        content = localized_css(name, url, content)
+    path = os.path.join(FOLDER, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+    return len(content)
+
+
+# Downloads the remote files into assets/ (those already there are kept unless --refresh); commit them so the
+# dashboards serve them themselves
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Download the third-party files of the dashboards into assets/')
+    parser.add_argument('--refresh', action='store_true', help='download the files already in assets/ again')
+    args = parser.parse_args()
+
+    for name, url in REMOTE.items():
+        if args.refresh or not os.path.exists(os.path.join(FOLDER, *name.split('/'))):
+            try:
+                print(f'{name}: {save(name, url) / 1024:.1f} KB from {url}')
+            except OSError as error:
+                print(f'{name}: failed to download {url} ({error})')
@@ -0,0 +1,118 @@
+import functools
+import os
+
+import flask
+import pandas
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.colors import make_colorscale
+
+# FIGURE_VALIDATE=1 checks figures against plotly's schema and 0 never does; by default they are checked while the
+# Flask app runs in debug mode
+VALIDATE = os.environ.get('FIGURE_VALIDATE', '')
+# Properties whose name holds an underscore; in every other keyword an underscore nests (marker_color is
+# marker.color), as in plotly's own constructors
+UNDERSCORED = {'error_x', 'error_y', 'error_z'}
+
+validated = set()
+
+
+# A figure as the dict plotly.js reads. Dash sends it like a go.Figure, and common.encoding encodes its arrays and
+# template the same way.
+class Figure(dict):
+    pass
+
+
+# Named templates resolved once; every figure using one shares the same dict
+@functools.lru_cache(maxsize=None)
+def resolved_template(name):
+    return pio.templates[name].to_plotly_json()
+
+
+def plain(item):
+    if isinstance(item, (pandas.Series, pandas.Index)):
+        return item.to_numpy()
+    if isinstance(item, dict):
+        return {key: plain(nested) for key, nested in item.items()}
+    return item
+
+
+# Keyword properties as nested dicts: {'marker_color': 'red', 'xaxis': {'nticks': 12}, 'xaxis_title': 'Date'} gives
+# {'marker': {'color': 'red'}, 'xaxis': {'nticks': 12, 'title': {'text': 'Date'}}}. Titles given as a string are
+# wrapped in {'text': ...} as plotly does; None values are left out.
+def properties(props):
+    result = {}
+    for name, item in props.items():
+        if item is None:
+            continue
+        path = [name] if name in UNDERSCORED else name.split('_')
+        node = result
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        item = plain(item)
+        if path[-1] == 'title' and isinstance(item, str):
+            item = {'text': item}
+        if isinstance(item, dict) and isinstance(node.get(path[-1]), dict):
+            node[path[-1]] = {**node[path[-1]], **item}
+        else:
+            node[path[-1]] = item
+    return result
+
+
+def trace(kind, **props):
+    return dict(properties(props), type=kind)
+
+
+def bar(x, y, **props):
+    return trace('bar', x=x, y=y, **props)
+
+
+def scatter(x, y, **props):
+    return trace('scatter', x=x, y=y, **props)
+
+
+def pie(labels, values, **props):
+    return trace('pie', labels=labels, values=values, **props)
+
+
+# Colorscales given as a list of colors (px.colors.sequential.*) become the [[position, color], ...] pairs
+# plotly.js expects
+def choropleth(locations, z, colorscale=None, **props):
+    if isinstance(colorscale, (list, tuple)) and colorscale and isinstance(colorscale[0], str):
+        colorscale = [list(pair) for pair in make_colorscale(list(colorscale))]
+    return trace('choropleth', locations=locations, z=z, colorscale=colorscale, **props)
+
+
+def validation_enabled():
+    if VALIDATE:
+        return VALIDATE not in ('0', 'off')
+    return flask.has_app_context() and flask.current_app.debug
+
+
+def shape(node):
+    if isinstance(node, dict):
+        return tuple((key, shape(item)) for key, item in sorted(node.items()) if key != 'template')
+    if isinstance(node, list) and node and isinstance(node[0], dict):
+        return tuple(shape(item) for item in node)
+    return None
+
+
+# Builds each figure with plotly's validators the first time a figure of its structure (trace types and property
+# names) is made, so a misspelt property fails the way go.Figure would; later figures of that structure are not
+# checked again
+def validate(figure):
+    key = shape(figure)
+    if key not in validated:
+        go.Figure(figure)
+        validated.add(key)
+
+
+# A figure of the given traces, with layout properties written as keywords the way update_layout takes them
+def figure(*traces, template=None, **layout):
+    layout = properties(layout)
+    if template is not None:
+        layout['template'] = resolved_template(template) if isinstance(template, str) else template
+    result = Figure(data=list(traces), layout=layout)
+    if validation_enabled():
+        validate(result)
+    return result
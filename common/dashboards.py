@@ -0,0 +1,143 @@
+import glob
+import importlib.util
+import os
+import sys
+import threading
+import time
+import traceback
+
+import pandas
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dashboards whose data comes from a web service (Yahoo prices, weatherstack) rather than from files in the repository.
+# 'files' warms up every other one: loading these before a fork would hold the gunicorn master up on the network and
+# hand every worker the same connection pool.
+NETWORK = {'01-stocktracker', '02-weather'}
+
+
+# Resident memory of this process in bytes
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# One NN-*/app.py dashboard, imported on the first request under its url prefix.
+# The app module builds its Dash instance at import, so the prefix it should serve from is handed over through
+# Dash's DASH_*_PATHNAME_PREFIX environment variables while it loads. Helper modules next to app.py are imported
+# by their plain names, exactly as when the app is run from its own folder, and are then moved under the app's
+# module name (dashboard_10_ufc.loader), so another dashboard importing a helper of the same name gets its own.
+class LazyDashboard:
+    load_lock = threading.RLock()
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.name = os.path.basename(folder)
+        self.slug = self.name.lower()
+        self.prefix = '/' + self.slug
+        self.network = self.slug in NETWORK
+        self.module = None
+        self.error = None
+        self.load_seconds = None
+        self.memory_bytes = None
+        self.loaded_at = None
+
+    @property
+    def loaded(self):
+        return self.module is not None
+
+    def load(self):
+        if self.module is not None:
+            return self.module
+        with LazyDashboard.load_lock:
+            if self.module is not None:
+                return self.module
+            overrides = {'DASH_ROUTES_PATHNAME_PREFIX': '/', 'DASH_REQUESTS_PATHNAME_PREFIX': self.prefix + '/'}
+            previous = {key: os.environ.get(key) for key in overrides}
+            os.environ.update(overrides)
+            sys.path.insert(0, self.folder)
+
+            module_name = 'dashboard_' + self.slug.replace('-', '_')
+            spec = importlib.util.spec_from_file_location(module_name, os.path.join(self.folder, 'app.py'))
+            module = importlib.util.module_from_spec(spec)
+            memory = rss_bytes()
+            start = time.perf_counter()
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except Exception:
+                del sys.modules[module_name]
+                self.error = traceback.format_exc()
+                raise
+            finally:
+                for key, value in previous.items():
+                    if value is None:
+                        os.environ.pop(key, None)
+                    else:
+                        os.environ[key] = value
+                sys.path.remove(self.folder)
+                self.qualify_helpers(module_name)
+
+            self.load_seconds = time.perf_counter() - start
+            self.memory_bytes = rss_bytes() - memory
+            self.loaded_at = time.time()
+            self.error = None
+            self.module = module
+            return module
+
+    # The app holds its helper modules already; they leave the plain names for the next dashboard's helpers
+    def qualify_helpers(self, module_name):
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, '__file__', None)
+            if path and name != module_name and os.path.dirname(os.path.abspath(path)) == self.folder:
+                sys.modules[f'{module_name}.{name}'] = sys.modules.pop(name)
+
+    # WSGI entry point; a dashboard that fails to load answers 503 and is retried on the next request
+    def __call__(self, environ, start_response):
+        try:
+            module = self.load()
+        except Exception:
+            start_response('503 Service Unavailable', [('Content-Type', 'text/plain; charset=utf-8')])
+            return [f'{self.name} failed to load:\n\n{self.error}'.encode()]
+        return module.server.wsgi_app(environ, start_response)
+
+
+# Every NN-*/app.py under the repository root, in folder order
+def discover(root=ROOT):
+    folders = sorted(os.path.dirname(path) for path in glob.glob(os.path.join(root, '[0-9][0-9]-*', 'app.py')))
+    return {dashboard.slug: dashboard for dashboard in map(LazyDashboard, folders)}
+
+
+# Loads the named dashboards ('all' for every one, 'files' for every one not in NETWORK); failures are recorded in
+# the report rather than raised
+def warm_up(dashboards, names):
+    names = [name.lower() for name in names]
+    if 'all' in names:
+        names = list(dashboards)
+    elif 'files' in names:
+        names = [name for name in names if name != 'files'] + \
+                [slug for slug, dashboard in dashboards.items() if not dashboard.network]
+    for name in names:
+        dashboard = dashboards.get(name) or next((d for d in dashboards.values() if d.slug.startswith(name)), None)
+        if dashboard is None:
+            print(f"Unknown dashboard '{name}', expected one of: {', '.join(dashboards)}")
+            continue
+        try:
+            dashboard.load()
+        except Exception:
+            pass
+
+
+# Load time and memory added by each dashboard loaded so far
+def load_report(dashboards):
+    return pandas.DataFrame([{
+        'dashboard': dashboard.name,
+        'path': dashboard.prefix + '/',
+        'status': 'loaded' if dashboard.loaded else 'failed' if dashboard.error else 'not loaded',
+        'load (ms)': None if dashboard.load_seconds is None else round(dashboard.load_seconds * 1000, 1),
+        'memory (MB)': None if dashboard.memory_bytes is None else round(dashboard.memory_bytes / 2 ** 20, 1),
+    } for dashboard in dashboards.values()]).set_index('dashboard')
@@ -0,0 +1,301 @@
+import hashlib
+import inspect
+import json
+import mmap
+import os
+import pickle
+import shutil
+import sys
+import time
+
+import numpy
+import pandas
+
+# Bumped whenever the on-disk layout below changes, so older caches are rebuilt instead of misread
+FORMAT_VERSION = 2
+
+# DATASET_CACHE=off reads the sources every time; any other value is the folder caches are written to.
+# By default each cache sits in a .dataset-cache folder next to its first source file.
+CACHE_SETTING = os.environ.get('DATASET_CACHE', '')
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(2 ** 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_state(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+            'sha256': file_hash(path)}
+
+
+# Names a code object loads, including those of the functions and comprehensions defined inside it
+def code_names(code):
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if inspect.iscode(constant):
+            names |= code_names(constant)
+    return names
+
+
+def namespace(value):
+    if inspect.ismodule(value):
+        return vars(value)
+    if inspect.isfunction(value):
+        return value.__globals__
+    if inspect.isclass(value):
+        methods = [member for member in vars(value).values() if inspect.isfunction(member)]
+        return methods[0].__globals__ if methods else {}
+    return {}
+
+
+# Contents of the source files next to build's own that its code runs: the modules, functions and classes it uses
+# from there (a dashboard's helper modules such as loader or records), then whatever those files use from there in
+# turn. A change to any of them rebuilds the cache just like a change to build itself.
+def helper_sources(build):
+    try:
+        folder = os.path.dirname(os.path.abspath(inspect.getsourcefile(build)))
+    except TypeError:
+        return []
+    globals_ = build.__globals__
+    pending = [globals_[name] for name in code_names(build.__code__) if name in globals_]
+    sources = {}
+    while pending:
+        value = pending.pop()
+        try:
+            path = os.path.abspath(inspect.getsourcefile(value))
+        except (TypeError, OSError):
+            continue
+        if os.path.dirname(path) != folder or path in sources:
+            continue
+        with open(path, 'rb') as file:
+            sources[path] = hashlib.sha256(file.read()).hexdigest()
+        pending.extend(namespace(value).values())
+    return [f'{os.path.basename(path)} {digest}' for path, digest in sorted(sources.items())]
+
+
+# Identifies what produced the frame besides the source files: the build function's code and that of the helper
+# modules it uses, or the library version for a library function such as pandas.read_csv, and its arguments
+def build_key(build, kwargs):
+    package = sys.modules.get((getattr(build, '__module__', None) or '').split('.')[0])
+    version = getattr(package, '__version__', None)
+    if version is not None:
+        code = f'{build.__module__}.{build.__qualname__} {version}'
+    else:
+        try:
+            code = '\n'.join([inspect.getsource(build), *helper_sources(build)])
+        except (OSError, TypeError):
+            code = build.__qualname__
+    return hashlib.sha256(f'{FORMAT_VERSION}\n{code}\n{sorted(kwargs.items())!r}'.encode()).hexdigest()
+
+
+# Appends column data to the cache's single data file, each section aligned so numpy can view it in place
+class DataWriter:
+    def __init__(self, file):
+        self.file = file
+        self.size = 0
+
+    def add(self, data):
+        padding = -self.size % 64
+        self.file.write(b'\0' * padding)
+        self.file.write(data)
+        offset = self.size + padding
+        self.size = offset + len(data)
+        return {'offset': offset, 'bytes': len(data)}
+
+    def array(self, values):
+        values = numpy.ascontiguousarray(values)
+        return dict(self.add(values.tobytes()), dtype=values.dtype.str, count=len(values))
+
+    # Distinct strings as one utf-8 buffer plus character offsets; decoding the buffer once and slicing it is much
+    # faster than decoding every value on its own
+    def strings(self, strings):
+        offsets = numpy.zeros(len(strings) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(value) for value in strings], out=offsets[1:])
+        return {'text': self.add(''.join(strings).encode()), 'offsets': self.array(offsets)}
+
+
+# Views into a memory-mapped data file. The map is copy-on-write, so the frames built on it stay writable without
+# ever changing the file.
+class DataReader:
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY) if size else bytearray()
+
+    def array(self, spec):
+        return numpy.frombuffer(self.buffer, dtype=spec['dtype'], count=spec['count'], offset=spec['offset'])
+
+    def bytes(self, spec):
+        return self.buffer[spec['offset']:spec['offset'] + spec['bytes']]
+
+    def strings(self, spec):
+        text = self.bytes(spec['text']).decode()
+        offsets = self.array(spec['offsets']).tolist()
+        strings = numpy.empty(len(offsets) - 1, dtype=object)
+        strings[:] = [text[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        return strings
+
+
+# Strings are stored as codes into their distinct values, categoricals as codes plus their categories, periods as
+# ordinals and anything else that numpy cannot hold natively is pickled
+def _write_column(data, values):
+    if isinstance(values.dtype, pandas.CategoricalDtype):
+        return {'kind': 'category', 'ordered': bool(values.cat.ordered),
+                'codes': _write_column(data, pandas.Series(values.cat.codes.to_numpy())),
+                'categories': _write_column(data, pandas.Series(values.cat.categories))}
+    if isinstance(values.dtype, pandas.PeriodDtype):
+        return {'kind': 'period', 'data': data.array(values.array.asi8), 'freq': values.dtype.freq.freqstr}
+    if values.dtype.kind in 'biufcmM' and not isinstance(values.dtype, pandas.DatetimeTZDtype):
+        return {'kind': 'numpy', 'data': data.array(values.to_numpy())}
+
+    array = values.to_numpy(dtype=object)
+    missing = pandas.isna(array)
+    if all(isinstance(value, str) for value in array[~missing]):
+        codes, uniques = pandas.factorize(array)
+        return {'kind': 'string', 'codes': data.array(codes.astype(numpy.int32)), 'values': data.strings(uniques)}
+    return {'kind': 'pickle', 'data': data.add(pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL))}
+
+
+def _read_column(data, spec):
+    if spec['kind'] == 'category':
+        return pandas.Categorical.from_codes(_read_column(data, spec['codes']),
+                                             categories=_read_column(data, spec['categories']),
+                                             ordered=spec['ordered'])
+    if spec['kind'] == 'period':
+        return pandas.arrays.PeriodArray(data.array(spec['data']), freq=spec['freq'])
+    if spec['kind'] == 'numpy':
+        return data.array(spec['data'])
+    if spec['kind'] == 'string':
+        # Missing values have code -1, which picks the nan appended after the distinct strings
+        return numpy.append(data.strings(spec['values']), numpy.nan)[data.array(spec['codes'])]
+    return pickle.loads(data.bytes(spec['data']))
+
+
+def _write_index(data, index):
+    if isinstance(index, pandas.RangeIndex):
+        return {'kind': 'range', 'start': index.start, 'stop': index.stop, 'step': index.step, 'name': index.name}
+    if isinstance(index, pandas.MultiIndex):
+        return {'kind': 'pickle', 'data': data.add(pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))}
+    return {'kind': 'column', 'column': _write_column(data, pandas.Series(index)), 'name': index.name}
+
+
+def _read_index(data, spec):
+    if spec['kind'] == 'range':
+        return pandas.RangeIndex(spec['start'], spec['stop'], spec['step'], name=spec['name'])
+    if spec['kind'] == 'pickle':
+        return pickle.loads(data.bytes(spec['data']))
+    return pandas.Index(_read_column(data, spec['column']), name=spec['name'])
+
+
+# A cache is a folder holding meta.json (sources, build key and column layout) and columns.bin with the column data
+def write_frame(folder, frame, meta):
+    temporary = f'{folder}.{os.getpid()}.tmp'
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    with open(os.path.join(temporary, 'columns.bin'), 'wb') as file:
+        data = DataWriter(file)
+        meta = dict(meta, rows=len(frame), attrs=frame.attrs, index=_write_index(data, frame.index),
+                    columns=[{'name': name, **_write_column(data, frame.iloc[:, i])}
+                             for i, name in enumerate(frame.columns)])
+    with open(os.path.join(temporary, 'meta.json'), 'w') as file:
+        json.dump(meta, file, indent=1, default=str)
+
+    # Swapped in with renames so a concurrent reader sees either the old cache or the new one
+    previous = f'{folder}.{os.getpid()}.old'
+    if os.path.exists(folder):
+        os.replace(folder, previous)
+    os.replace(temporary, folder)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def read_frame(folder, meta):
+    data = DataReader(os.path.join(folder, 'columns.bin'))
+    columns = {i: _read_column(data, spec) for i, spec in enumerate(meta['columns'])}
+    frame = pandas.DataFrame(columns, index=_read_index(data, meta['index']), copy=False)
+    frame.columns = pandas.Index([spec['name'] for spec in meta['columns']])
+    frame.attrs.update(meta['attrs'])
+    return frame
+
+
+def read_meta(folder):
+    try:
+        with open(os.path.join(folder, 'meta.json')) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+# True if the cached sources still match the files: same mtime and size, or, when only the mtime moved
+# (a copy or a touch), the same content hash. Meta is refreshed in that case so the next check is cheap again.
+def is_fresh(folder, meta, sources, key):
+    if meta is None or meta.get('key') != key or len(meta['sources']) != len(sources):
+        return False
+    touched = False
+    for cached, path in zip(meta['sources'], sources):
+        if not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        if stat.st_size != cached['size']:
+            return False
+        if stat.st_mtime_ns != cached['mtime_ns']:
+            if file_hash(path) != cached['sha256']:
+                return False
+            cached['mtime_ns'] = stat.st_mtime_ns
+            touched = True
+    if touched:
+        with open(os.path.join(folder, 'meta.json'), 'w') as file:
+            json.dump(meta, file, indent=1, default=str)
+    return True
+
+
+def cache_folder(sources, build):
+    first = os.path.abspath(sources[0])
+    root = CACHE_SETTING or os.path.join(os.path.dirname(first), '.dataset-cache')
+    return os.path.join(root, f'{build.__name__}-{os.path.basename(first)}')
+
+
+# Every cached_frame call in this process: the cache name, where the frame came from and how long it took
+loads = []
+
+
+def _record(folder, source, start):
+    loads.append({'dataset': os.path.basename(folder), 'source': source, 'seconds': time.perf_counter() - start})
+
+
+# Returns build(*sources, **kwargs), persisted as a binary columnar cache after the first call.
+# Later calls (and later processes) memory-map the cached columns instead of parsing the sources again, until a
+# source file's content or the build function's code changes.
+def cached_frame(sources, build, **kwargs):
+    start = time.perf_counter()
+    sources = [sources] if isinstance(sources, (str, os.PathLike)) else list(sources)
+    folder = cache_folder(sources, build)
+    if CACHE_SETTING.lower() == 'off':
+        frame = build(*sources, **kwargs)
+        _record(folder, 'parsed', start)
+        return frame
+
+    key = build_key(build, kwargs)
+    meta = read_meta(folder)
+    if is_fresh(folder, meta, sources, key):
+        try:
+            frame = read_frame(folder, meta)
+            _record(folder, 'cache', start)
+            return frame
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError):
+            pass
+
+    states = [source_state(path) for path in sources]
+    frame = build(*sources, **kwargs)
+    try:
+        write_frame(folder, frame, {'format': FORMAT_VERSION, 'key': key, 'build': build.__qualname__,
+                                    'sources': states})
+    except OSError:
+        # A read-only deployment still serves, it just parses on every start
+        pass
+    _record(folder, 'built', start)
+    return frame
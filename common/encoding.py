@@ -0,0 +1,316 @@
+import base64
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import secrets
+
+import dash._callback
+import flask
+import numpy
+import orjson
+import pandas
+import plotly
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.basedatatypes import BaseFigure
+from plotly.io.json import to_json_plotly
+
+from common.charts import Figure
+from common.figures import Encoded
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# FIGURE_ENCODING=plotly restores Dash's own serialization of callback responses
+ENABLED = os.environ.get('FIGURE_ENCODING', 'compact') != 'plotly'
+# Decimals kept in float trace data ('full' keeps every digit of float64)
+DECIMALS = os.environ.get('FIGURE_DECIMALS', '6')
+# Numeric arrays at least this long are sent as base64 typed arrays
+TYPED_ARRAY_MIN = int(os.environ.get('FIGURE_TYPED_ARRAY_MIN', '32'))
+# gzip, br (when the brotli package is installed), or off
+COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'br' if brotli else 'gzip')
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_LEVEL = int(os.environ.get('RESPONSE_COMPRESSION_LEVEL', '6'))
+COMPRESSED_TYPES = ('application/json', 'text/html', 'text/css', 'application/javascript', 'text/plain')
+
+TEMPLATE_PREFIX = '@template:'
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_SUBCLASS
+INTEGER_TYPES = [numpy.dtype(name) for name in ['u1', 'i1', 'u2', 'i2', 'u4', 'i4']]
+
+# Named plotly templates, sent once to the browser in the script below and referenced by name in the figures.
+# Figures carry their template as a full copy (plotly_dark alone is about 10 KB), so a template matching one of
+# these is replaced by '@template:<name>'.
+templates = {name: pio.templates[name].to_plotly_json() for name in pio.templates if name != 'none'}
+templates_by_background = {}
+for template_name, template in templates.items():
+    templates_by_background.setdefault(template.get('layout', {}).get('paper_bgcolor'), []).append(template_name)
+
+
+def template_reference(template):
+    if not isinstance(template, dict):
+        return template
+    for name in templates_by_background.get(template.get('layout', {}).get('paper_bgcolor'), []):
+        if template == templates[name]:
+            return TEMPLATE_PREFIX + name
+    return template
+
+
+def smallest_integer_type(values):
+    if not len(values):
+        return None
+    low, high = values.min(), values.max()
+    return next((dtype for dtype in INTEGER_TYPES
+                 if numpy.iinfo(dtype).min <= low and high <= numpy.iinfo(dtype).max), None)
+
+
+def typed_array(values, dtype):
+    data = values.astype(dtype.newbyteorder('<')).tobytes()
+    return {'dtype': dtype.str[1:], 'bdata': base64.b64encode(data).decode()}
+
+
+# Trace data arrays in their most compact form: integers (and floats holding only whole numbers) as base64 typed
+# arrays of the smallest integer type, other floats rounded to DECIMALS, dates as ISO strings only as long as the
+# values need
+def compact_array(values):
+    if values.ndim == 1 and values.dtype.kind in 'iu' and len(values) >= TYPED_ARRAY_MIN:
+        dtype = smallest_integer_type(values.astype('int64'))
+        if dtype is not None:
+            return typed_array(values, dtype)
+    if values.dtype.kind == 'f':
+        finite = numpy.isfinite(values)
+        if values.ndim == 1 and len(values) >= TYPED_ARRAY_MIN and finite.all() and \
+                (values == numpy.round(values)).all():
+            dtype = smallest_integer_type(values)
+            if dtype is not None:
+                return typed_array(values, dtype)
+        return values if DECIMALS == 'full' else numpy.round(values, int(DECIMALS))
+    if values.dtype.kind == 'M' or (values.dtype == object and len(values) and
+                                    isinstance(values[0], datetime.datetime) and values[0].tzinfo is None):
+        try:
+            dates = values.astype('datetime64[ns]')
+        except (TypeError, ValueError):
+            return values
+        text = numpy.datetime_as_string(dates, unit='auto')
+        missing = numpy.isnat(dates)
+        return text if not missing.any() else numpy.where(missing, None, text.astype(object))
+    return values
+
+
+def compact(node):
+    if isinstance(node, dict):
+        return {key: compact(value) for key, value in node.items()}
+    if isinstance(node, (list, tuple)) and node and isinstance(node[0], (dict, list, tuple)):
+        return [compact(value) for value in node]
+    if isinstance(node, numpy.ndarray):
+        return compact_array(node)
+    return node
+
+
+# A figure without plotly's deep copy (to_dict copies every array): traces go through compact() into new dicts
+# and the layout is copied one level down to swap its template for a reference
+def figure_json(data, layout):
+    layout = dict(layout)
+    if 'template' in layout:
+        layout['template'] = template_reference(layout['template'])
+    return {'data': [compact(trace) for trace in data], 'layout': compact(layout)}
+
+
+def default(value):
+    if isinstance(value, BaseFigure):
+        return figure_json(value._data, value._layout)
+    # Subclasses of dict, list, str and int come here too (OPT_PASSTHROUGH_SUBCLASS)
+    if isinstance(value, Figure):
+        return figure_json(value['data'], value['layout'])
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, int):
+        return int(value)
+    if hasattr(value, 'to_plotly_json'):
+        return value.to_plotly_json()
+    # Arrays orjson leaves to this function: object arrays and arrays that are not contiguous
+    if isinstance(value, numpy.ndarray):
+        result = compact_array(value)
+        return result.tolist() if isinstance(result, numpy.ndarray) else result
+    if isinstance(value, (pandas.Series, pandas.Index)):
+        return default(value.to_numpy())
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, numpy.generic):
+        return value.item()
+    if value is pandas.NaT or value is pandas.NA:
+        return None
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def to_json(value):
+    return orjson.dumps(value, default=default, option=OPTIONS).decode()
+
+
+# Stands in for an Encoded output while the rest of the response is serialized; random, so no data matches it
+SPLICE_PREFIX = '@encoded-' + secrets.token_hex(8) + ':'
+
+
+# Serializes a callback response ({'multi': True, 'response': {id: {property: value}}}) with the outputs cached by
+# common.figures as their JSON text from an earlier response, encoded only the first time
+def encode_response(value, encoder):
+    spliced = {}
+    for outputs in value.get('response', {}).values() if isinstance(value, dict) else []:
+        for prop, output in outputs.items():
+            if isinstance(output, Encoded):
+                token = SPLICE_PREFIX + str(len(spliced))
+                spliced[json.dumps(token)] = output.encode(encoder)
+                outputs[prop] = token
+    text = encoder(value)
+    for token, output in spliced.items():
+        text = text.replace(token, output, 1)
+    return text
+
+
+# Dash serializes every callback response with the to_json of its _callback module. The replacement encodes with
+# orjson and the compact forms above for the apps that opted in through compact_responses, and with plotly's
+# encoder for any other app in the process.
+def callback_to_json(value):
+    if flask.has_app_context() and flask.current_app.config.get('COMPACT_FIGURES'):
+        return encode_response(value, to_json)
+    return encode_response(value, to_json_plotly)
+
+
+TYPED_ARRAY_NAMES = {'i1': 'Int8Array', 'u1': 'Uint8Array', 'i2': 'Int16Array', 'u2': 'Uint16Array',
+                     'i4': 'Int32Array', 'u4': 'Uint32Array', 'f4': 'Float32Array', 'f8': 'Float64Array'}
+
+# Runs before the Dash renderer and expands callback responses as they arrive: typed arrays back into arrays and
+# template references into the templates
+CLIENT_SCRIPT = '''(function () {
+    var templates = %(templates)s;
+    var types = %(types)s;
+    var prefix = %(prefix)s;
+
+    function decode(node) {
+        var binary = atob(node.bdata), bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return Array.prototype.slice.call(new window[types[node.dtype]](bytes.buffer));
+    }
+
+    function expand(node) {
+        if (Array.isArray(node)) {
+            for (var i = 0; i < node.length; i++) {
+                node[i] = expand(node[i]);
+            }
+        } else if (node && typeof node === 'object') {
+            if (typeof node.bdata === 'string' && types[node.dtype]) {
+                return decode(node);
+            }
+            for (var key in node) {
+                var value = node[key];
+                if (key === 'template' && typeof value === 'string' && value.indexOf(prefix) === 0) {
+                    node[key] = JSON.parse(JSON.stringify(templates[value.slice(prefix.length)]));
+                } else {
+                    node[key] = expand(value);
+                }
+            }
+        }
+        return node;
+    }
+
+    var fetch = window.fetch;
+    window.fetch = function (input) {
+        return fetch.apply(this, arguments).then(function (response) {
+            var url = typeof input === 'string' ? input : input && input.url;
+            if (url && url.indexOf('_dash-update-component') !== -1 && response.status === 200) {
+                var json = response.json.bind(response);
+                response.json = function () {
+                    return json().then(expand);
+                };
+            }
+            return response;
+        });
+    };
+})();
+'''
+client_script = CLIENT_SCRIPT % {'templates': to_json(templates), 'types': json.dumps(TYPED_ARRAY_NAMES),
+                                 'prefix': json.dumps(TEMPLATE_PREFIX)}
+client_version = hashlib.sha1(client_script.encode()).hexdigest()[:12]
+
+
+def accepted_encoding():
+    accepted = flask.request.headers.get('Accept-Encoding', '')
+    if COMPRESSION == 'br' and brotli and 'br' in accepted:
+        return 'br'
+    if COMPRESSION in ('br', 'gzip') and 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    if response.direct_passthrough or response.status_code != 200 or 'Content-Encoding' in response.headers \
+            or response.mimetype not in COMPRESSED_TYPES:
+        return response
+    encoding = accepted_encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < COMPRESSION_MIN_BYTES:
+        return response
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=min(COMPRESSION_LEVEL, 11)))
+    else:
+        response.set_data(gzip.compress(data, COMPRESSION_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def client_script_response():
+    response = flask.Response(client_script, mimetype='application/javascript')
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    return response
+
+
+# The encoding relies on names private to Dash and plotly: Dash encodes callback responses with
+# dash._callback.to_json, replaced below, and plotly figures are read through their _data and _layout without the
+# deep copy of to_dict. Both libraries are pinned in requirements.txt; a version without these names stops the app
+# at startup instead of serving responses the browser cannot read.
+def check_private_names():
+    missing = [] if callable(getattr(dash._callback, 'to_json', None)) else ['dash._callback.to_json']
+    figure = go.Figure()
+    if not isinstance(getattr(figure, '_data', None), list):
+        missing.append('BaseFigure._data')
+    if not isinstance(getattr(figure, '_layout', None), dict):
+        missing.append('BaseFigure._layout')
+    if missing:
+        raise RuntimeError(f"Compact responses need {', '.join(missing)}, not found in dash {dash.__version__} and "
+                           f"plotly {plotly.__version__}; install the versions in requirements.txt or set "
+                           f"FIGURE_ENCODING=plotly")
+
+
+# Compact callback responses for a Dash app: orjson encoding with typed arrays, trimmed decimals and shared
+# templates (expanded in the browser by the script it adds to the page), and compression of its Flask responses.
+# Call before the app serves its first page.
+def compact_responses(app):
+    if COMPRESSION != 'off':
+        app.server.after_request(compress_response)
+    if not ENABLED:
+        return
+    check_private_names()
+    dash._callback.to_json = callback_to_json
+    app.server.config['COMPACT_FIGURES'] = True
+    app.server.add_url_rule('/_compact-figures.js', 'compact_figures', client_script_response)
+    app.config.external_scripts.insert(0, app.get_relative_path('/_compact-figures.js') + '?v=' + client_version)
+
+
+# Back to plotly's encoding for an app set up by compact_responses, without the script that decodes the compact one
+# (for a consumer of the responses other than the browser, such as the static export)
+def plain_responses(app):
+    app.server.config['COMPACT_FIGURES'] = False
+    script = app.get_relative_path('/_compact-figures.js')
+    app.config.external_scripts[:] = [url for url in app.config.external_scripts
+                                      if not (isinstance(url, str) and url.startswith(script))]
@@ -0,0 +1,96 @@
+import functools
+import inspect
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from dash import no_update
+
+# FIGURE_CACHE=off makes every call rebuild its figures (benchmarks measure the callbacks themselves)
+CACHE_ENABLED = os.environ.get('FIGURE_CACHE', '').lower() != 'off'
+
+
+# Identity of the data files: inode, size and modification time of each. It changes whenever a file is rewritten,
+# appended to or replaced, and costs one stat per file to check.
+def files_version(paths):
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+# A cached callback output along with its JSON text per encoder. The response encoder (common.encoding) splices the
+# text in instead of serializing the figure again; other encoders read the value through to_plotly_json.
+class Encoded:
+    def __init__(self, value):
+        self.value = value
+        self.text = {}
+
+    def to_plotly_json(self):
+        return self.value
+
+    def encode(self, encoder):
+        text = self.text.get(encoder)
+        if text is None:
+            text = self.text[encoder] = encoder(self.value)
+        return text
+
+
+# Each output of a callback result as Encoded: the items of a tuple (a callback with several outputs), else the
+# whole result. no_update is left as it is for Dash to see.
+def encoded(result):
+    if isinstance(result, tuple):
+        return tuple(value if value is no_update else Encoded(value) for value in result)
+    return result if result is no_update else Encoded(result)
+
+
+# Remembers callback results per (inputs, data version). Interval ticks of a dashboard whose files have not changed
+# get the figures already built, and already encoded, instead of rebuilding them, however many clients are polling;
+# the first call after a file changes rebuilds them.
+class FigureCache:
+    def __init__(self, *paths, maxsize=256):
+        self.paths = paths
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def version(self):
+        return files_version(self.paths)
+
+    # Decorates a callback (below @app.callback); arguments named in ignore, such as the interval's n_intervals,
+    # are left out of the key
+    def cached(self, ignore=()):
+        def decorator(function):
+            if not CACHE_ENABLED:
+                return function
+            parameters = list(inspect.signature(function).parameters)
+            kept = [i for i, name in enumerate(parameters) if name not in ignore]
+            entries = OrderedDict()
+
+            @functools.wraps(function)
+            def wrapper(*args):
+                inputs = json.dumps([args[i] for i in kept if i < len(args)], sort_keys=True, default=str)
+                key = (inputs, self.version())
+                with self.lock:
+                    if key in entries:
+                        entries.move_to_end(key)
+                        self.hits += 1
+                        return entries[key]
+                    self.misses += 1
+
+                result = encoded(function(*args))
+                with self.lock:
+                    entries[key] = result
+                    while len(entries) > self.maxsize:
+                        entries.popitem(last=False)
+                return result
+
+            return wrapper
+
+        return decorator
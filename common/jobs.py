@@ -0,0 +1,194 @@
+import contextvars
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import flask
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+from dash.exceptions import PreventUpdate
+from dash.long_callback.managers import BaseLongCallbackManager
+
+# Background callbacks (@app.callback(..., background=True)) run on a pool of JOB_WORKERS threads in the process that
+# received the request, and their state lives in the SQLite file JOBS_DATABASE, shared by every gunicorn worker: the
+# browser polls for the result every `interval` ms and the poll may reach any worker. Jobs not touched for JOB_EXPIRE
+# seconds are deleted.
+DATABASE = os.environ.get('JOBS_DATABASE', os.path.join(tempfile.gettempdir(), 'dash-jobs.sqlite'))
+WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+EXPIRE_SECONDS = int(os.environ.get('JOB_EXPIRE', '600'))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    function TEXT NOT NULL,
+    arguments BLOB NOT NULL,
+    state TEXT NOT NULL,
+    owner INTEGER NOT NULL,
+    progress BLOB,
+    result BLOB,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key);
+'''
+
+
+class Cancelled(Exception):
+    pass
+
+
+# The job a poll asks about. Dash hands get_progress and result_ready the cache key alone, which two sessions with
+# the same inputs share; the poll's query string also names its job, so each session follows its own.
+def polled_job():
+    job = flask.request.args.get('job') if flask.has_request_context() else None
+    return int(job) if job and job.isdigit() else None
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# A job goes from queued to running to done, or to cancelled when Dash terminates it: the browser sends the old job
+# with the next request of the same callback when its inputs changed mid-fetch, and cancel= inputs do the same. A
+# thread cannot be stopped, so a cancelled job stops at its next set_progress call (or finishes its current fetch)
+# and its result is dropped; a queued job that was cancelled never starts.
+class JobManager(BaseLongCallbackManager):
+    def __init__(self, path=DATABASE, workers=WORKERS, expire=EXPIRE_SECONDS):
+        self.path = path
+        self.workers = workers
+        self.expire = expire
+        self.registered = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pool_pid = None
+        self.connection().executescript(SCHEMA)
+        super().__init__(cache_by=None)
+
+    # One connection per thread, reopened in forked processes; WAL lets the polls read while a job writes
+    def connection(self):
+        if getattr(self.local, 'pid', None) != os.getpid():
+            self.local.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self.local.connection.execute('PRAGMA journal_mode=WAL')
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    def execute(self, statement, *parameters):
+        return self.connection().execute(statement, parameters)
+
+    # The pool is created on the first job of each process, so gunicorn workers forked from a preloaded master never
+    # inherit its (thread-less) copy
+    def executor(self):
+        with self.lock:
+            if self.pool_pid != os.getpid():
+                self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix='dash-job')
+                self.pool_pid = os.getpid()
+        return self.pool
+
+    def make_job_fn(self, fn, progress, key=None):
+        self.registered[key] = (fn, progress)
+        return key
+
+    def call_job_fn(self, key, job_fn, args, context):
+        now = time.time()
+        self.execute('DELETE FROM jobs WHERE updated < ?', now - self.expire)
+        job = self.execute("INSERT INTO jobs (key, function, arguments, state, owner, updated) "
+                           "VALUES (?, ?, ?, 'queued', ?, ?)",
+                           key, job_fn, pickle.dumps((args, dict(context))), os.getpid(), now).lastrowid
+        self.executor().submit(self.run, job)
+        return job
+
+    def run(self, job):
+        claimed = self.execute("UPDATE jobs SET state = 'running', updated = ? WHERE id = ? AND state = 'queued'",
+                               time.time(), job)
+        if not claimed.rowcount:
+            return
+        function, arguments = self.execute('SELECT function, arguments FROM jobs WHERE id = ?', job).fetchone()
+        fn, progress = self.registered[function]
+        args, context = pickle.loads(arguments)
+
+        def set_progress(value):
+            value = list(value) if isinstance(value, (list, tuple)) else [value]
+            updated = self.execute("UPDATE jobs SET progress = ?, updated = ? WHERE id = ? AND state = 'running'",
+                                   pickle.dumps(value), time.time(), job)
+            if not updated.rowcount:
+                raise Cancelled
+
+        def call():
+            context_value.set(AttributeDict(context, ignore_register_page=False))
+            arguments = [set_progress] if progress else []
+            if isinstance(args, dict):
+                return fn(*arguments, **args)
+            return fn(*arguments, *args) if isinstance(args, (list, tuple)) else fn(*arguments, args)
+
+        try:
+            result = contextvars.copy_context().run(call)
+        except Cancelled:
+            return
+        except PreventUpdate:
+            result = {'_dash_no_update': '_dash_no_update'}
+        except Exception as error:
+            result = {'long_callback_error': {'msg': str(error), 'tb': traceback.format_exc()}}
+        self.execute("UPDATE jobs SET state = 'done', result = ?, updated = ? WHERE id = ? AND state = 'running'",
+                     pickle.dumps(result), time.time(), job)
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        self.execute("UPDATE jobs SET state = 'cancelled', updated = ? WHERE id = ? AND state IN ('queued', 'running')",
+                     time.time(), int(job))
+
+    # Jobs whose process died (a gunicorn worker restarted mid-job) never finish; they count as not running
+    def job_running(self, job):
+        row = self.execute('SELECT state, owner FROM jobs WHERE id = ?', int(job)).fetchone() if job else None
+        return row is not None and row[0] in ('queued', 'running') and process_alive(row[1])
+
+    def terminate_unhealthy_job(self, job):
+        if job and not self.job_running(job):
+            self.terminate_job(job)
+            return True
+        return False
+
+    # Progress is read once: the poll that gets it clears it. Outside a poll naming its job, the newest job for the
+    # key is read, and sessions sharing that key may take each other's progress.
+    def get_progress(self, key):
+        job = polled_job()
+        if job is not None:
+            row = self.execute("SELECT id, progress FROM jobs WHERE id = ? AND state = 'running' "
+                               "AND progress IS NOT NULL", job).fetchone()
+        else:
+            row = self.execute("SELECT id, progress FROM jobs WHERE key = ? AND state = 'running' "
+                               "AND progress IS NOT NULL ORDER BY id DESC LIMIT 1", key).fetchone()
+        if row is None:
+            return None
+        self.execute('UPDATE jobs SET progress = NULL WHERE id = ?', row[0])
+        return pickle.loads(row[1])
+
+    def result_ready(self, key):
+        job = polled_job()
+        if job is not None:
+            return self.execute("SELECT 1 FROM jobs WHERE id = ? AND state = 'done'", job).fetchone() is not None
+        return self.execute("SELECT 1 FROM jobs WHERE key = ? AND state = 'done'", key).fetchone() is not None
+
+    # The result of the job (or, without one, the latest job for these arguments), deleted once read
+    def get_result(self, key, job):
+        if job:
+            row = self.execute("SELECT id, result FROM jobs WHERE id = ? AND state = 'done'", int(job)).fetchone()
+        else:
+            row = self.execute("SELECT id, result FROM jobs WHERE key = ? AND state = 'done' ORDER BY id DESC LIMIT 1",
+                               key).fetchone()
+        if row is None:
+            return self.UNDEFINED
+        self.execute('DELETE FROM jobs WHERE id = ?', row[0])
+        return pickle.loads(row[1])
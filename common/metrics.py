@@ -0,0 +1,178 @@
+import bisect
+import functools
+import os
+import sys
+import time
+
+import flask
+from dash.exceptions import PreventUpdate
+
+from common.profiling import profile_routes, profiled
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+DESCRIPTIONS = {
+    'dash_callback_duration_seconds': ('histogram', 'Time spent in a callback, serializing its response included'),
+    'dash_callback_response_bytes': ('histogram', 'Size of the serialized callback response'),
+    'dash_callback_errors_total': ('counter', 'Callbacks that raised an exception (PreventUpdate excluded)'),
+    'dash_interval_ticks_total': ('counter', 'Callback requests triggered by a dcc.Interval tick'),
+    'http_request_duration_seconds': ('histogram', 'Time to answer an HTTP request, by Flask endpoint'),
+    'http_responses_total': ('counter', 'HTTP responses by status code'),
+    'upstream_request_duration_seconds': ('histogram', 'Time spent in calls to an external data provider'),
+    'upstream_errors_total': ('counter', 'Calls to an external data provider that raised an exception'),
+}
+
+
+# Counts per bucket in a list allocated up front, so recording a value is a bisect and two increments. Updates are
+# plain increments with no lock: the GIL makes each one safe, and the rare increment lost to a thread switch in the
+# middle of one does not matter to a monitoring histogram.
+class Histogram:
+    def __init__(self, buckets):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self):
+        self.value += 1
+
+
+# Every series of the process by (metric name, labels); created once with dict.setdefault, which is atomic, and
+# afterwards only read. With several gunicorn workers each worker reports its own series.
+series = {}
+
+
+def metric(name, kind, **labels):
+    key = (name, tuple(labels.items()))
+    return series.get(key) or series.setdefault(key, kind())
+
+
+def histogram(name, buckets=LATENCY_BUCKETS, **labels):
+    return metric(name, functools.partial(Histogram, buckets), **labels)
+
+
+def counter(name, **labels):
+    return metric(name, Counter, **labels)
+
+
+def label_text(labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}' if labels else ''
+
+
+# The Prometheus text format of the series of one app (with the upstream series, which have no app label), or of
+# every app
+def render(app=None):
+    lines = []
+    for name, (kind, description) in DESCRIPTIONS.items():
+        selected = [(labels, value) for (metric_name, labels), value in list(series.items()) if metric_name == name
+                    and (app is None or dict(labels).get('app', app) == app)]
+        if not selected:
+            continue
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        for labels, value in selected:
+            if kind == 'counter':
+                lines.append(f'{name}{label_text(labels)} {value.value}')
+                continue
+            total = 0
+            for bound, count in zip(value.bounds + ('+Inf',), value.counts):
+                total += count
+                lines.append(f'{name}_bucket{label_text(labels + (("le", bound),))} {total}')
+            lines.append(f'{name}_sum{label_text(labels)} {value.sum}')
+            lines.append(f'{name}_count{label_text(labels)} {total}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_response(app=None):
+    return flask.Response(render(app), mimetype='text/plain; version=0.0.4')
+
+
+# Wraps a call to an external data provider (yahoo prices, weatherstack) with a latency histogram and error count
+def upstream(provider, function):
+    duration = histogram('upstream_request_duration_seconds', provider=provider)
+    errors = counter('upstream_errors_total', provider=provider)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+# Dash stores each callback as a function returning the serialized response, so timing it covers the callback and
+# its serialization, and the length of what it returns is the payload size
+def timed_callback(function, app, output):
+    labels = {'app': app, 'callback': function.__name__, 'output': output.strip('.').split('...')[0]}
+    duration = histogram('dash_callback_duration_seconds', **labels)
+    size = histogram('dash_callback_response_bytes', SIZE_BUCKETS, **labels)
+    errors = counter('dash_callback_errors_total', **labels)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        body = flask.request.get_json(silent=True) if flask.has_request_context() else None
+        for prop in (body or {}).get('changedPropIds', []):
+            if prop.endswith('.n_intervals'):
+                counter('dash_interval_ticks_total', app=app, interval=prop.rsplit('.', 1)[0]).inc()
+        start = time.perf_counter()
+        try:
+            response = function(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - start)
+        size.observe(len(response))
+        return response
+
+    return wrapper
+
+
+def app_name(app):
+    module = sys.modules.get(app.config.name)
+    path = getattr(module, '__file__', None)
+    return os.path.basename(os.path.dirname(os.path.abspath(path))) if path else app.config.name
+
+
+def instrument_server(server, app=None):
+    @server.before_request
+    def start_timer():
+        flask.g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        start = flask.g.pop('metrics_start', None)
+        if start is not None:
+            histogram('http_request_duration_seconds', app=app or 'host',
+                      endpoint=flask.request.endpoint or 'none').observe(time.perf_counter() - start)
+        counter('http_responses_total', app=app or 'host', status=response.status_code).inc()
+        return response
+
+    server.add_url_rule('/metrics', 'metrics', lambda: metrics_response(app))
+    profile_routes(server, app)
+
+
+# Records every callback of a Dash app and every request to its Flask server, serves the app's series at /metrics
+# and profiles slow callbacks when profiling is on (browse them at /profiles). Call after the last callback is
+# registered.
+def instrument(app, name=None):
+    name = name or app_name(app)
+    for output, entry in app.callback_map.items():
+        entry['callback'] = timed_callback(profiled(entry['callback'], name, output), name, output)
+    instrument_server(app.server, name)
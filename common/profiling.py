@@ -0,0 +1,179 @@
+import collections
+import functools
+import glob
+import html
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import flask
+
+from common.dashboards import ROOT
+
+# DASH_PROFILE=1 profiles every callback; DASH_PROFILE=header only requests carrying an X-Profile header, and a number
+# in the header replaces the threshold for that request (X-Profile: 0 captures every callback it triggers). Without
+# DASH_PROFILE the header is only honoured, and the captures only listed at /profiles, when Flask runs in debug mode,
+# so visitors of a deployed dashboard can neither profile it nor read its stacks.
+SETTING = os.environ.get('DASH_PROFILE', '0').lower()
+ENABLED = SETTING not in ('', '0', 'off', 'header')
+ON_DEMAND = ENABLED or SETTING == 'header'
+THRESHOLD_MS = float(os.environ.get('DASH_PROFILE_THRESHOLD_MS', '500'))
+INTERVAL_MS = float(os.environ.get('DASH_PROFILE_INTERVAL_MS', '5'))
+FOLDER = os.environ.get('DASH_PROFILE_DIR', os.path.join(ROOT, '.profiles'))
+KEEP = int(os.environ.get('DASH_PROFILE_KEEP', '200'))
+HEADER = 'X-Profile'
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f'{getattr(code, "co_qualname", code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+# Samples the stack of one thread from a second thread at a fixed interval and counts each distinct stack, from the
+# callback's frame down, the way collapsed-stack flamegraph tools expect them
+class Sampler(threading.Thread):
+    def __init__(self, thread_id, root, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if self.finished.is_set():
+                break
+            names = []
+            while frame is not None and frame is not self.root:
+                names.append(frame_name(frame).replace(';', ','))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+        return self.stacks
+
+
+def available():
+    return ON_DEMAND or (flask.has_app_context() and flask.current_app.debug)
+
+
+def requested_threshold():
+    if not flask.has_request_context():
+        return THRESHOLD_MS if ENABLED else None
+    header = flask.request.headers.get(HEADER)
+    if header is None or not available():
+        return THRESHOLD_MS if ENABLED else None
+    try:
+        return float(header)
+    except ValueError:
+        return THRESHOLD_MS
+
+
+def request_inputs():
+    body = flask.request.get_json(silent=True) if flask.has_request_context() else None
+    return [{'id': str(item.get('id')), 'property': item.get('property'), 'value': repr(item.get('value'))[:200]}
+            for item in (body or {}).get('inputs', []) if isinstance(item, dict)]
+
+
+# Writes a capture as <name>.folded (one 'frame;frame;frame count' line per stack, readable by flamegraph.pl,
+# speedscope or inferno) with a <name>.json of its tags, and drops the oldest captures beyond KEEP
+def save(stacks, tags):
+    os.makedirs(FOLDER, exist_ok=True)
+    name = time.strftime('%Y%m%d-%H%M%S') + f'-{time.time_ns() % 10 ** 9:09d}-' + \
+        re.sub(r'[^\w.-]+', '_', f"{tags['app']}-{tags['callback']}")
+    with open(os.path.join(FOLDER, name + '.folded'), 'w') as folded:
+        folded.writelines(f'{stack} {count}\n' for stack, count in stacks.most_common())
+    with open(os.path.join(FOLDER, name + '.json'), 'w') as file:
+        json.dump(dict(tags, name=name), file)
+    for old in sorted(glob.glob(os.path.join(FOLDER, '*.json')))[:-KEEP]:
+        for path in (old, old[:-len('.json')] + '.folded'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return name
+
+
+# Wraps a callback so that, when profiling is on, a sampler follows it and the profile is kept if the call took
+# longer than the threshold. With profiling off the cost is a header lookup.
+def profiled(function, app, output):
+    callback_id = output.strip('.').split('...')[0]
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        threshold = requested_threshold()
+        if threshold is None:
+            return function(*args, **kwargs)
+        sampler = Sampler(threading.get_ident(), sys._getframe(), INTERVAL_MS / 1000)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            milliseconds = (time.perf_counter() - start) * 1000
+            stacks = sampler.stop()
+            if milliseconds >= threshold:
+                try:
+                    save(stacks, {'app': app, 'callback': function.__name__, 'output': callback_id,
+                                  'inputs': request_inputs(), 'duration (ms)': round(milliseconds, 1),
+                                  'samples': sum(stacks.values()), 'interval (ms)': INTERVAL_MS,
+                                  'created': time.strftime('%Y-%m-%d %H:%M:%S')})
+                except OSError as error:
+                    print(f'Profile of {callback_id} not saved: {error}', file=sys.stderr)
+
+    return wrapper
+
+
+def captures(app=None):
+    tags = []
+    for path in sorted(glob.glob(os.path.join(FOLDER, '*.json')), reverse=True):
+        try:
+            with open(path) as file:
+                capture = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if app is None or capture.get('app') == app:
+            tags.append(capture)
+    return tags
+
+
+def inputs_text(inputs):
+    return '<br>'.join(html.escape(f"{item['id']}.{item['property']} = {item['value']}") for item in inputs)
+
+
+def index_page(app=None):
+    if not available():
+        flask.abort(404)
+    rows = ''.join(
+        f'<tr><td>{html.escape(c["created"])}</td><td>{html.escape(c["app"])}</td>'
+        f'<td>{html.escape(c["callback"])}<br><small>{html.escape(c["output"])}</small></td>'
+        f'<td>{c["duration (ms)"]}</td><td>{c["samples"]}</td>'
+        f'<td><small>{inputs_text(c["inputs"])}</small></td>'
+        f'<td><a href="profiles/{c["name"]}.folded">folded</a></td></tr>'
+        for c in captures(app))
+    state = 'on for every callback' if ENABLED else f'on for requests with an {HEADER} header'
+    return f'<html><head><title>Profiles</title></head><body><h1>Callback profiles</h1>' \
+           f'<p>Profiling is {state}; callbacks slower than {THRESHOLD_MS:g} ms are kept, sampled every ' \
+           f'{INTERVAL_MS:g} ms. Open the folded stacks in speedscope or flamegraph.pl.</p>' \
+           f'<table border="1" cellpadding="4"><tr><th>Captured</th><th>Dashboard</th><th>Callback</th>' \
+           f'<th>ms</th><th>Samples</th><th>Inputs</th><th>Profile</th></tr>{rows}</table></body></html>'
+
+
+def folded_file(name):
+    if not available() or not re.fullmatch(r'[\w.-]+\.folded', name):
+        flask.abort(404)
+    return flask.send_from_directory(FOLDER, name, mimetype='text/plain')
+
+
+# /profiles (the recent captures of this app, or of every app on the host) and /profiles/<name>.folded
+def profile_routes(server, app=None):
+    server.add_url_rule('/profiles', 'profiles', lambda: index_page(app))
+    server.add_url_rule('/profiles/<name>', 'profile_file', folded_file)
@@ -0,0 +1,94 @@
+import itertools
+import json
+import urllib.parse
+
+# What the Dash renderer does with a layout and its callbacks in the browser, for the tools that talk to a
+# dashboard the way a browser would (the static export and the load generator). Layouts and dependencies are in
+# their JSON form, as /_dash-layout and /_dash-dependencies return them.
+
+
+# Every component of a layout, with its id ('component.property' keys index its props)
+def components(node):
+    if isinstance(node, list):
+        for item in node:
+            yield from components(item)
+    elif isinstance(node, dict):
+        if 'props' in node and 'type' in node:
+            yield node
+            for value in node['props'].values():
+                yield from components(value)
+
+
+def prop_key(component_id, prop):
+    return f"{json.dumps(component_id, sort_keys=True) if isinstance(component_id, dict) else component_id}.{prop}"
+
+
+# Initial value of every property set on a component with an id, keyed 'component.property'
+def layout_values(layout):
+    return {prop_key(component['props']['id'], prop): value
+            for component in components(layout) if 'id' in component['props']
+            for prop, value in component['props'].items()}
+
+
+def input_keys(callback):
+    return [prop_key(item['id'], item['property']) for item in callback['inputs']]
+
+
+def output_keys(callback):
+    return callback['output'].strip('.').split('...')
+
+
+# The /_dash-update-component body the renderer sends for a callback, with inputs and state read from values
+def request_body(callback, values, changed):
+    def dependencies(items):
+        return [dict(item, value=values.get(prop_key(item['id'], item['property']))) for item in items]
+
+    outputs = [dict(zip(['id', 'property'], key.rsplit('.', 1))) for key in output_keys(callback)]
+    return {'output': callback['output'], 'outputs': outputs if callback['output'].startswith('..') else outputs[0],
+            'inputs': dependencies(callback['inputs']), 'state': dependencies(callback.get('state', [])),
+            'changedPropIds': list(changed)}
+
+
+# The query string of the requests polling a background callback (background=True) for its result, from the response
+# that started its job
+def job_query(started):
+    return '?' + urllib.parse.urlencode({'cacheKey': started['cacheKey'], 'job': started['job']})
+
+
+# The properties a callback response sets, keyed 'component.property'
+def response_values(response):
+    return {prop_key(component_id, prop): value
+            for component_id, props in response.get('response', {}).items() for prop, value in props.items()}
+
+
+def option_values(options):
+    if isinstance(options, dict):
+        return list(options)
+    return [option['value'] if isinstance(option, dict) else option for option in options or []]
+
+
+def slider_points(props, limit):
+    if props.get('marks'):
+        return sorted(float(mark) if '.' in mark else int(mark) for mark in props['marks'])
+    low, high, step = props.get('min'), props.get('max'), props.get('step') or 1
+    if low is None or high is None or (high - low) / step > limit:
+        return []
+    return [low + step * i for i in range(int((high - low) / step) + 1)]
+
+
+# The values an input can take in the browser, when they are a known finite set: the options of a dropdown,
+# checklist or radio items, the points of a slider, the pairs of a range slider and the tabs of a Tabs
+def input_variants(component, prop, limit=100):
+    props, kind = component['props'], component['type']
+    if prop != 'value':
+        return []
+    if kind in ('Dropdown', 'Checklist', 'RadioItems') and 'options' in props:
+        choices = option_values(props['options'])
+        return [[choice] for choice in choices] if kind == 'Checklist' or props.get('multi') else choices
+    if kind == 'Slider':
+        return slider_points(props, limit)
+    if kind == 'RangeSlider':
+        return [[low, high] for low, high in itertools.combinations_with_replacement(slider_points(props, limit), 2)]
+    if kind == 'Tabs':
+        return [tab['props'].get('value') for tab in components(props.get('children')) if tab['type'] == 'Tab']
+    return []
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas
+
+from common.dashboards import ROOT, discover
+
+# Loads one dashboard in the current process and prints its load time and the part spent on datasets as json
+LOAD_ONE = '''
+import json, sys
+from common import datasets
+from common.dashboards import discover
+dashboard = discover()[sys.argv[1]]
+try:
+    dashboard.load()
+except Exception:
+    pass
+print(json.dumps({'seconds': dashboard.load_seconds, 'data': sum(load['seconds'] for load in datasets.loads)}))
+'''
+
+
+def timed_load(slug, cache):
+    environment = dict(os.environ, DATASET_CACHE=cache, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-c', LOAD_ONE, slug], cwd=ROOT, env=environment,
+                            capture_output=True, text=True)
+    try:
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {'seconds': None, 'data': None}
+
+
+# Startup time of every dashboard, each in a fresh process: parsing the csv files (cache off), the first start that
+# writes the cache, and a warm start that memory-maps it. The data columns are the part of the start spent in
+# cached_frame; the rest is imports, figures and the apps' own indexes. Dashboards that fail to load are left empty.
+def startup_comparison(slugs=None):
+    rows = []
+    with tempfile.TemporaryDirectory() as cache:
+        for slug in slugs or discover():
+            row = {'dashboard': slug}
+            for mode, setting in [('csv', 'off'), ('cold', cache), ('warm', cache)]:
+                load = timed_load(slug, setting)
+                if load['seconds'] is not None:
+                    row[f'{mode} start (ms)'] = round(load['seconds'] * 1000, 1)
+                    row[f'{mode} data (ms)'] = round(load['data'] * 1000, 1)
+            rows.append(row)
+    table = pandas.DataFrame(rows).set_index('dashboard')
+    if 'csv data (ms)' in table:
+        table['data speedup'] = (table['csv data (ms)'] / table['warm data (ms)']).round(1)
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare dashboard startup with and without the dataset cache')
+    parser.add_argument('dashboards', nargs='*', help='folder names in lower case, e.g. 10-ufc (default: all)')
+    args = parser.parse_args()
+    print(startup_comparison(args.dashboards).to_string())
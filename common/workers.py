@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pandas
+
+from common.dashboards import ROOT
+
+# The gunicorn console script, run with this interpreter
+GUNICORN = 'from gunicorn.app.wsgiapp import run; run()'
+
+
+# Proportional set size: shared pages are split between the processes sharing them, so the sum over the master and
+# its workers is the memory the deployment really uses (plain RSS counts every shared page once per process)
+def memory_kb(pid):
+    totals = {'Rss': 0, 'Pss': 0}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            for line in smaps:
+                key, _, value = line.partition(':')
+                if key in totals:
+                    totals[key] += int(value.split()[0])
+    except OSError:
+        pass
+    return totals
+
+
+def children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as file:
+            return [int(child) for child in file.read().split()]
+    except OSError:
+        return []
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def layout_paths(address, app):
+    if not app.startswith('host:'):
+        return ['/_dash-layout']
+    with urllib.request.urlopen(f'http://{address}/load-report', timeout=30) as response:
+        return [row['path'] + '_dash-layout' for row in json.load(response) if row['status'] == 'loaded']
+
+
+# Starts gunicorn with the repository config, waits for every worker to report ready and measures the processes
+def measure(workers, share, app='host:server', requests=0, timeout=300):
+    address = f'127.0.0.1:{free_port()}'
+    environment = dict(os.environ, WORKERS=str(workers), SHARE_DATA='1' if share else '0', BIND=address)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', GUNICORN, '-c', 'gunicorn.conf.py', app], cwd=ROOT,
+                               env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    boots = []
+    try:
+        while len(boots) < workers and time.perf_counter() - start < timeout:
+            line = process.stderr.readline()
+            if not line:
+                break
+            ready = re.search(r'Worker \d+ ready in (\d+) ms', line)
+            if ready:
+                boots.append(int(ready.group(1)))
+        ready_seconds = time.perf_counter() - start
+        # Serving touches the shared objects (reference counts), so memory is measured after some traffic as well
+        for _ in range(requests):
+            for path in layout_paths(address, app):
+                try:
+                    urllib.request.urlopen(f'http://{address}{path}', timeout=30).read()
+                except OSError:
+                    pass
+        pids = [process.pid] + children(process.pid)
+        memory = [memory_kb(pid) for pid in pids]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait()
+
+    return {'workers': workers, 'shared data': share, 'ready (s)': round(ready_seconds, 2),
+            'worker boot (ms)': round(sum(boots) / len(boots)) if boots else None,
+            'rss (MB)': round(sum(m['Rss'] for m in memory) / 1024), 'pss (MB)': round(sum(m['Pss'] for m in memory) / 1024)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Memory and worker boot time of gunicorn with and without shared data')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4, 8])
+    parser.add_argument('--app', default='host:server')
+    parser.add_argument('--requests', type=int, default=20, help='layout requests per dashboard before measuring')
+    args = parser.parse_args()
+
+    rows = [measure(count, share, args.app, args.requests) for share in (False, True) for count in args.workers]
+    print(pandas.DataFrame(rows).set_index(['shared data', 'workers']).to_string())
@@ -0,0 +1,264 @@
+import argparse
+import hashlib
+import json
+import os
+import pkgutil
+import re
+import shutil
+import sys
+import time
+
+from dash.fingerprint import check_fingerprint
+
+from common import assets
+from common.dashboards import discover
+from common.encoding import plain_responses
+from common.renderer import (components, input_keys, input_variants, layout_values, output_keys, prop_key,
+                             request_body, response_values)
+
+# Dashboards computed entirely from files shipped with them, so every visitor sees the same figures
+STATIC = ['05-superbowls', '09-policeshootings', '10-ufc']
+OUTPUT = 'static-site'
+MAX_VARIANTS = 100
+
+# Runs before the Dash renderer and answers its requests from the bundle: the layout and dependencies from their
+# files and callback requests from the responses computed at export. A callback request with inputs the export
+# did not compute (a free text search, a click on a chart) gets 204, which Dash treats as no update.
+CLIENT_SCRIPT = '''(function () {
+    var files = %(files)s;
+    var fetch = window.fetch;
+    var responses = null;
+
+    function values(items) {
+        return (items || []).map(function (item) {
+            return item.value === undefined ? null : item.value;
+        });
+    }
+
+    window.fetch = function (input, init) {
+        var url = typeof input === 'string' ? input : input && input.url;
+        if (url && /_dash-layout$/.test(url)) {
+            return fetch(files.layout);
+        }
+        if (url && /_dash-dependencies$/.test(url)) {
+            return fetch(files.dependencies);
+        }
+        if (url && /_dash-update-component$/.test(url)) {
+            var body = JSON.parse(init.body);
+            var key = JSON.stringify([body.output, values(body.inputs), values(body.state)]);
+            responses = responses || fetch(files.responses).then(function (response) {
+                return response.json();
+            });
+            return responses.then(function (index) {
+                return index[key] ? fetch(index[key]) : new Response(null, {status: 204});
+            });
+        }
+        return fetch.apply(this, arguments);
+    };
+})();
+'''
+
+
+# Writes content under a name carrying its hash and returns that name relative to the bundle
+def write_hashed(bundle, folder, name, content):
+    relative = os.path.join(folder, assets.hashed_name(name, content))
+    os.makedirs(os.path.join(bundle, folder), exist_ok=True)
+    with open(os.path.join(bundle, relative), 'wb') as file:
+        file.write(content)
+    return relative.replace(os.sep, '/')
+
+
+# Integral floats as ints, so the keys written here read the same as JSON.stringify writes them in the browser
+def normalized(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, list):
+        return [normalized(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalized(item) for key, item in value.items()}
+    return value
+
+
+def request_key(callback, values):
+    return json.dumps([callback['output'], [normalized(values.get(key)) for key in callback['input_keys']],
+                       [normalized(values.get(key)) for key in callback['state_keys']]],
+                      separators=(',', ':'), ensure_ascii=False)
+
+
+class Exporter:
+    def __init__(self, dashboard, bundle):
+        self.dashboard = dashboard
+        self.bundle = bundle
+        self.app = dashboard.load().app
+        plain_responses(self.app)
+        self.client = self.app.server.test_client()
+        self.layout = self.client.get('/_dash-layout').get_json()
+        self.dependencies = self.client.get('/_dash-dependencies').get_json()
+        self.responses = {}
+        self.components = {json.dumps(component['props']['id'], sort_keys=True): component
+                           for component in components(self.layout) if 'id' in component['props']}
+        for callback in self.dependencies:
+            if any(isinstance(item['id'], dict) for item in callback['inputs'] + callback['state']):
+                raise ValueError(f"{dashboard.name}: pattern-matching callback {callback['output']} "
+                                 f"cannot be exported")
+            callback['input_keys'] = input_keys(callback)
+            callback['state_keys'] = [prop_key(item['id'], item['property']) for item in callback['state']]
+
+    def component(self, component_id):
+        return self.components.get(json.dumps(component_id, sort_keys=True))
+
+    # Calls a callback with these values and keeps its response; the response updates a copy of the values
+    def call(self, callback, values, changed):
+        key = request_key(callback, values)
+        if key in self.responses:
+            return None
+        response = self.client.post('/_dash-update-component', json=request_body(callback, values, changed))
+        if response.status_code == 204:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"{self.dashboard.name}: {callback['output']} answered {response.status_code}")
+        content = self.relocated(response.get_data())
+        self.responses[key] = write_hashed(self.bundle, 'data', 'response.json', content)
+        return dict(values, **response_values(json.loads(content)))
+
+    # The shared assets are copied to the bundle's _assets/ folder, so the layout and responses refer to them
+    # relative to the page
+    def relocated(self, content):
+        return content.replace(f'"{self.app.config.requests_pathname_prefix}{assets.ROUTE}'.encode(),
+                               f'"{assets.ROUTE}'.encode())
+
+    # Initial callbacks in the order the renderer runs them (a callback after those producing its inputs), with
+    # their outputs written into the layout so the page needs no callback request to show its figures
+    def prerender(self):
+        values = layout_values(self.layout)
+        produced = {}
+        for callback in self.dependencies:
+            for output in output_keys(callback):
+                produced.setdefault(output, []).append(callback)
+        pending = [callback for callback in self.dependencies if not callback.get('prevent_initial_call')]
+        while pending:
+            ready = [callback for callback in pending if not any(
+                producer in pending and producer is not callback
+                for key in callback['input_keys'] for producer in produced.get(key, []))] or pending[:1]
+            for callback in ready:
+                pending.remove(callback)
+                updated = self.call(callback, values, [])
+                if updated is not None:
+                    values = updated
+                    callback['prevent_initial_call'] = True
+        for key, value in values.items():
+            component_id, prop = key.rsplit('.', 1)
+            component = self.component(json.loads(component_id) if component_id.startswith('{') else component_id)
+            if component is not None:
+                component['props'][prop] = value
+        # Nothing changes between ticks of an interval in a static bundle
+        for component in self.components.values():
+            if component['type'] == 'Interval':
+                component['props']['disabled'] = True
+        return values
+
+    # Responses for each input changed on its own to each value it can take, and for the callbacks fed by the
+    # outputs of those responses
+    def variants(self, values):
+        for callback in self.dependencies:
+            for item, key in zip(callback['inputs'], callback['input_keys']):
+                component = self.component(item['id'])
+                if component is None:
+                    continue
+                for value in input_variants(component, item['property'], MAX_VARIANTS)[:MAX_VARIANTS]:
+                    self.cascade(callback, dict(values, **{key: value}), [key], depth=3)
+
+    def cascade(self, callback, values, changed, depth):
+        updated = self.call(callback, values, changed)
+        if updated is None or depth == 0:
+            return
+        changed_keys = [key for key in updated if updated[key] != values.get(key)]
+        for follower in self.dependencies:
+            triggered = [key for key in changed_keys if key in follower['input_keys']]
+            if triggered and follower is not callback:
+                self.cascade(follower, updated, triggered, depth - 1)
+
+    # Scripts and styles the page loads from the app, rewritten to bundle paths. Component suites keep their
+    # relative layout inside a folder named after the hash of all their files, as webpack loads the chunks of a
+    # suite (dcc's async-graph.js ...) relative to its main script. The shared assets keep their hashed paths.
+    def page(self, script):
+        prefix = self.app.config.requests_pathname_prefix
+        suites = {}
+        for package, paths in sorted(self.app.registered_paths.items()):
+            for path in sorted(paths):
+                if not path.endswith('.map'):
+                    suites[f'{package}/{path}'] = pkgutil.get_data(package, path)
+        digest = hashlib.sha256(b''.join(name.encode() + content for name, content in suites.items()))
+        suites_folder = f'static/suites.{digest.hexdigest()[:12]}'
+        for name, content in suites.items():
+            os.makedirs(os.path.dirname(os.path.join(self.bundle, suites_folder, name)), exist_ok=True)
+            with open(os.path.join(self.bundle, suites_folder, name), 'wb') as file:
+                file.write(content)
+
+        def local(match):
+            attribute, url = match.group(1), match.group(2)
+            if not url.startswith(prefix):
+                return match.group(0)
+            path = url[len(prefix):].split('?')[0]
+            if path.startswith(assets.ROUTE):
+                target = path
+            elif path.startswith('_dash-component-suites/'):
+                target = f"{suites_folder}/{check_fingerprint(path[len('_dash-component-suites/'):])[0]}"
+            else:
+                target = write_hashed(self.bundle, 'static', os.path.basename(path),
+                                      self.client.get('/' + path).get_data())
+            return f'{attribute}="{target}"'
+
+        for name, content in assets.files.items():
+            os.makedirs(os.path.dirname(os.path.join(self.bundle, assets.ROUTE, name)), exist_ok=True)
+            with open(os.path.join(self.bundle, assets.ROUTE, name), 'wb') as file:
+                file.write(content)
+
+        html = self.client.get('/').get_data(as_text=True)
+        html = re.sub(r'(src|href)="([^"]+)"', local, html)
+        html = re.sub(r'("requests_pathname_prefix":)"[^"]*"', r'\1"./"', html)
+        return html.replace('<footer>', f'<footer>\n            <script src="{script}"></script>', 1)
+
+    def export(self):
+        values = self.prerender()
+        self.variants(values)
+        files = {
+            'layout': write_hashed(self.bundle, 'data', 'layout.json',
+                                   self.relocated(json.dumps(self.layout).encode())),
+            'dependencies': write_hashed(self.bundle, 'data', 'dependencies.json', json.dumps(
+                [{key: value for key, value in callback.items() if not key.endswith('_keys')}
+                 for callback in self.dependencies]).encode()),
+            'responses': write_hashed(self.bundle, 'data', 'responses.json',
+                                      json.dumps(self.responses, ensure_ascii=False).encode()),
+        }
+        script = write_hashed(self.bundle, 'static', 'static-dash.js',
+                              (CLIENT_SCRIPT % {'files': json.dumps(files)}).encode())
+        with open(os.path.join(self.bundle, 'index.html'), 'w') as file:
+            file.write(self.page(script))
+
+
+def size(folder):
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(folder) for name in names)
+
+
+# Writes <output>/<dashboard>/index.html with its data/, static/ and _assets/ files; every file but index.html has its
+# content hash in its path and can be cached for good
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export dashboards as static bundles servable by any file server')
+    parser.add_argument('dashboards', nargs='*', default=STATIC,
+                        help=f"folder names in lower case (default: {' '.join(STATIC)})")
+    parser.add_argument('--output', default=OUTPUT)
+    parser.add_argument('--max-variants', type=int, default=MAX_VARIANTS,
+                        help='values computed per dropdown, slider or tabs input')
+    args = parser.parse_args()
+    MAX_VARIANTS = args.max_variants
+
+    dashboards = discover()
+    for name in args.dashboards:
+        start = time.perf_counter()
+        bundle = os.path.join(args.output, name)
+        shutil.rmtree(bundle, ignore_errors=True)
+        exporter = Exporter(dashboards[name], bundle)
+        exporter.export()
+        print(f'{name}: {len(exporter.responses)} responses, {size(bundle) / 2 ** 20:.1f} MB in {bundle} '
+              f'({time.perf_counter() - start:.1f} s)', file=sys.stderr)
@@ -0,0 +1,36 @@
+import gc
+import os
+import time
+
+# gunicorn -c gunicorn.conf.py host:server from the repository root, or gunicorn -c ../gunicorn.conf.py app:server
+# from an app folder
+#
+# With SHARE_DATA on (the default) the master imports the app and, for the host, loads every dashboard that reads only
+# files before forking. Workers start as copies of that process, so the frames, cubes and indexes sit in memory pages
+# shared by all workers instead of one private copy each, and a worker is ready as soon as it is forked. The dashboards
+# fetching from a web service (01 and 02) still load in each worker on their first visit, so the master never waits
+# on the network and no worker inherits another's connections. SHARE_DATA=0 restores the old
+# behaviour of every worker importing on its own, and of dashboards loading on their first visit unless
+# DASHBOARD_WARMUP names them: warming every dashboard up in each worker would only multiply the memory.
+bind = os.environ.get('BIND', '0.0.0.0:' + os.environ.get('PORT', '8050'))
+workers = int(os.environ.get('WORKERS', '2'))
+preload_app = os.environ.get('SHARE_DATA', '1') != '0'
+if preload_app:
+    os.environ.setdefault('DASHBOARD_WARMUP', 'files')
+
+
+# Objects created while loading are moved out of the garbage collector's reach before the first fork, so collections
+# in a worker never write to (and so never copy) the pages holding them
+def when_ready(server):
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+        server.log.info("Datasets loaded in the master, %d objects shared with workers", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    worker.log.info("Worker %s ready in %.0f ms", worker.pid, (time.perf_counter() - worker.forked_at) * 1000)
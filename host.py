@@ -0,0 +1,64 @@
+import argparse
+import os
+import time
+
+import flask
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+from common.dashboards import discover, load_report, rss_bytes, warm_up
+from common.encoding import compress_response
+from common.metrics import instrument_server
+
+# Every dashboard is mounted under its folder name (e.g. /08-videogames/) on one Flask server and only imports its
+# data and callbacks on the first visit. Run with `python host.py` or `gunicorn host:server`; dashboards listed in
+# DASHBOARD_WARMUP (comma separated, 'files' for those reading only files, or 'all') are loaded before the first
+# request. Each dashboard also runs on its own with `python app.py` from its folder.
+start = time.perf_counter()
+dashboards = discover()
+
+server = flask.Flask(__name__)
+server.wsgi_app = DispatcherMiddleware(server.wsgi_app, {dashboard.prefix: dashboard
+                                                         for dashboard in dashboards.values()})
+# /metrics and /profiles here cover every loaded dashboard; /<dashboard>/metrics and /<dashboard>/profiles one
+instrument_server(server)
+server.after_request(compress_response)
+
+
+@server.route('/')
+def index():
+    links = ''.join(f'<li><a href="{dashboard.prefix}/">{dashboard.name}</a> '
+                    f'<small>{"loaded" if dashboard.loaded else "loads on first visit"}</small></li>'
+                    for dashboard in dashboards.values())
+    return f'<html><head><title>Dashboards</title></head><body><h1>Dashboards</h1><ul>{links}</ul>' \
+           f'<p><a href="/load-report">Load report</a> - <a href="/metrics">Metrics</a> - ' \
+           f'<a href="/profiles">Profiles</a></p></body></html>'
+
+
+@server.route('/load-report')
+def report():
+    table = load_report(dashboards).reset_index().astype(object)
+    return flask.jsonify(table.where(table.notna(), None).to_dict('records'))
+
+
+def startup_report(warm):
+    warm_up(dashboards, warm)
+    print(f"Host ready in {(time.perf_counter() - start) * 1000:.0f} ms, {rss_bytes() / 2 ** 20:.0f} MB resident")
+    print(load_report(dashboards))
+
+
+warmup = [name for name in os.environ.get('DASHBOARD_WARMUP', '').split(',') if name]
+if __name__ != '__main__' and warmup:
+    startup_report(warmup)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve every dashboard from one Flask server')
+    parser.add_argument('--warm', nargs='*', default=warmup,
+                        help="dashboards to load before serving, by folder name or number ('files' for those "
+                             "reading only files, 'all' for every one)")
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--debug', action='store_true')
+    args = parser.parse_args()
+
+    startup_report(args.warm)
+    server.run(port=args.port, debug=args.debug, use_reloader=False)